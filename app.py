@@ -1,658 +1,785 @@
-import streamlit as st
-import pandas as pd
-import datetime
-import time
-import gspread
-import json
-import uuid
-import calendar
-from oauth2client.service_account import ServiceAccountCredentials
-try:
-    from streamlit_autorefresh import st_autorefresh
-except ImportError:
-    def st_autorefresh(interval, key): pass
-
-# ---------------------------------------------------------
-# 1. 앱 기본 설정 & 상수
-# ---------------------------------------------------------
-st.set_page_config(page_title="아르칸(Arkan) V2", page_icon="🔥", layout="wide")
-
-PROJECT_CATEGORIES = ["CTA 공부", "업무/사업", "건강/운동", "기타/생활"]
-CATEGORY_COLORS = {"CTA 공부": "blue", "업무/사업": "orange", "건강/운동": "green", "기타/생활": "gray"}
-NON_STUDY_CATEGORIES = ["건강/운동", "기타/생활"] 
-
-# ---------------------------------------------------------
-# 2. DB 연결 및 CRUD 함수
-# ---------------------------------------------------------
-@st.cache_resource(ttl=3600)
-def get_client():
-    if "gcp_service_account" not in st.secrets: return None
-    scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(dict(st.secrets["gcp_service_account"]), scope)
-    return gspread.authorize(creds)
-
-def get_sheet(sheet_name):
-    client = get_client()
-    if not client: return None
-    try: return client.open("CTA_Study_Data").worksheet(sheet_name)
-    except: return None 
-
-# --- Settings ---
-def load_settings():
-    defaults = {
-        "telegram_id": "",
-        "project_goals": [{"category": "CTA 공부", "name": "1차 시험", "date": str(datetime.date(2026, 4, 25))}],
-        "inbox_items": [] 
-    }
-    sh = get_sheet("Settings")
-    if not sh: return defaults
-    try:
-        records = sh.get_all_records()
-        for r in records:
-            k, v = r.get("Key"), r.get("Value")
-            if k in defaults and v:
-                defaults[k] = json.loads(v)
-        return defaults
-    except: return defaults
-
-def save_setting(key, value):
-    sh = get_sheet("Settings")
-    if not sh: return
-    try:
-        val_str = json.dumps(value, ensure_ascii=False)
-        cell = sh.find(key)
-        if cell: sh.update_cell(cell.row, 2, val_str)
-        else: sh.append_row([key, val_str])
-    except: pass
-
-# --- Daily Task ---
-def load_day_data(target_date):
-    date_str = target_date.strftime("%Y-%m-%d")
-    data = {"tasks": [], "master": {"wakeup": False, "reflection": "", "total_time": 0}}
-    client = get_client()
-    if not client: return data
-
-    try:
-        sh_master = client.open("CTA_Study_Data").worksheet("Daily_Master")
-        masters = sh_master.get_all_records()
-        day_m = next((item for item in masters if str(item["날짜"]) == date_str), None)
-        if day_m:
-            data["master"]["wakeup"] = (str(day_m.get("기상성공")).upper() == "TRUE")
-            data["master"]["reflection"] = day_m.get("한줄평", "")
-            data["master"]["total_time"] = float(day_m.get("총집중시간(초)", 0))
-
-        sh_detail = client.open("CTA_Study_Data").worksheet("Task_Details")
-        details = sh_detail.get_all_records()
-        data["tasks"] = [d for d in details if str(d["날짜"]) == date_str]
-        
-        for t in data["tasks"]:
-            t['is_running'] = False
-            t['last_start'] = None
-            t['accumulated'] = float(t.get('소요시간(초)', 0))
-        return data
-    except: return data
-
-def save_day_data(target_date, tasks, master_data):
-    date_str = target_date.strftime("%Y-%m-%d")
-    client = get_client()
-    if not client: return False
-    try:
-        doc = client.open("CTA_Study_Data")
-        sh_m = doc.worksheet("Daily_Master")
-        cell = None
-        try: cell = sh_m.find(date_str)
-        except: pass
-        row_data = [date_str, "TRUE" if master_data['wakeup'] else "FALSE", master_data['total_time'], master_data['reflection']]
-        if cell: sh_m.update(range_name=f"A{cell.row}:D{cell.row}", values=[row_data])
-        else: sh_m.append_row(row_data)
-            
-        sh_d = doc.worksheet("Task_Details")
-        all_records = sh_d.get_all_records()
-        kept_records = [r for r in all_records if str(r.get("날짜")) != date_str]
-        
-        sh_d.clear()
-        sh_d.append_row(["ID", "날짜", "시간", "카테고리", "할일_Main", "할일_Sub", "상태", "소요시간(초)", "참고자료"])
-        
-        rows_to_add = []
-        for r in kept_records: rows_to_add.append(list(r.values()))
-        
-        for t in tasks:
-            curr_acc = t['accumulated']
-            if t.get('is_running'): curr_acc += (time.time() - t['last_start'])
-            rows_to_add.append([
-                str(t.get('ID', uuid.uuid4())), date_str, t.get('시간', '00:00'),
-                t.get('카테고리', '기타'), t.get('할일_Main', ''), t.get('할일_Sub', ''),
-                t.get('상태', '진행중'), round(curr_acc, 2), t.get('참고자료', '')
-            ])
-        if rows_to_add: sh_d.append_rows(rows_to_add)
-        return True
-    except Exception as e:
-        st.error(f"저장 오류: {e}")
-        return False
-
-# --- Templates ---
-def get_templates():
-    sh = get_sheet("Templates")
-    if not sh: return []
-    try: return sh.get_all_records()
-    except: return []
-
-def add_template_row(name, time_str, cat, main, sub):
-    sh = get_sheet("Templates")
-    if not sh: return
-    try: sh.append_row([name, time_str, cat, main, sub])
-    except: pass
-
-def delete_template_row(row_idx):
-    sh = get_sheet("Templates")
-    if not sh: return
-    try: sh.delete_rows(row_idx)
-    except: pass
-
-# --- Context Saver ---
-def get_last_work_context():
-    sh = get_sheet("Task_Details")
-    if not sh: return None
-    try:
-        records = sh.get_all_records()
-        today_str = datetime.date.today().strftime("%Y-%m-%d")
-        for r in reversed(records):
-            if r.get("카테고리") == "업무/사업" and r.get("날짜") != today_str:
-                return r
-        return None
-    except: return None
-
-# --- AI Suggestion ---
-def generate_ai_suggestion(category, main_input):
-    suggestions = []
-    if category == "CTA 공부":
-        if "세법" in main_input: suggestions = ["- 법인세 3강 수강", "- 익금/손금 암기", "- 기출 10문제"]
-        else: suggestions = ["- 진도 3강 수강", "- 백지 복습 20분", "- 핵심 키워드 정리"]
-    elif category == "업무/사업":
-        if "앱" in main_input: suggestions = ["- UI/UX 스케치", "- DB 설계 점검", "- 버그 수정"]
-        else: suggestions = ["- 메일 회신", "- 주간 우선순위 설정", "- 뉴스 스크랩"]
-    elif category == "건강/운동":
-        suggestions = ["- 스트레칭 10분", "- 유산소 30분", "- 스쿼트 3세트"]
-    else: suggestions = ["- 책상 정리", "- 내일 계획", "- 명상"]
-    return "\n".join(suggestions)
-
-# ---------------------------------------------------------
-# 3. 초기화
-# ---------------------------------------------------------
-if 'init' not in st.session_state:
-    settings = load_settings()
-    st.session_state.telegram_id = settings.get('telegram_id', '')
-    st.session_state.project_goals = settings.get('project_goals', [])
-    st.session_state.inbox_items = settings.get('inbox_items', [])
-    st.session_state.tasks = []
-    st.session_state.master = {"wakeup": False, "reflection": "", "total_time": 0}
-    st.session_state.view_mode = "Daily View"
-    st.session_state.selected_date = datetime.date.today()
-    st.session_state.loaded_date = None
-    st.session_state.ai_suggestion_temp = ""
-    st.session_state.edit_target_id = None # 수정 중인 할 일 ID
-    st.session_state.init = True
-
-# ---------------------------------------------------------
-# 4. 팝업 UI (Dialogs)
-# ---------------------------------------------------------
-@st.dialog("📝 템플릿 관리", width="large")
-def manage_templates_modal():
-    st.caption("자주 사용하는 루틴을 세트로 만드세요.")
-    with st.form("new_temp", clear_on_submit=True):
-        c1, c2 = st.columns([1.5, 1])
-        t_name = c1.text_input("템플릿명 (예: 평일, 업무기본)")
-        t_time = c2.time_input("시간", datetime.time(9,0))
-        c3, c4 = st.columns([1, 2])
-        t_cat = c3.selectbox("카테고리", PROJECT_CATEGORIES)
-        t_main = c4.text_input("할 일")
-        if st.form_submit_button("추가"):
-            if t_name and t_main:
-                add_template_row(t_name, t_time.strftime("%H:%M"), t_cat, t_main, "")
-                st.rerun()
-            else: st.warning("내용 필수")
-    st.divider()
-    st.write("###### 📋 목록")
-    templates = get_templates()
-    if templates:
-        for i, t in enumerate(templates):
-            c1, c2, c3, c4 = st.columns([1.5, 3, 1, 0.5], vertical_alignment="center")
-            c1.caption(f"[{t['템플릿명']}] {t['시간']}")
-            c2.write(f"**{t['할일_Main']}**")
-            c3.caption(t['카테고리'])
-            if c4.button("x", key=f"del_tm_{i}"):
-                delete_template_row(i + 2)
-                st.rerun()
-    else: st.info("없음")
-
-@st.dialog("💼 업무 루틴 가져오기", width="large")
-def manage_work_template_modal():
-    st.caption("오늘 처리할 업무를 선택하세요.")
-    last_work = get_last_work_context()
-    if last_work:
-        st.markdown("##### 🔔 어제 하던 일 (Context)")
-        with st.container(border=True):
-            c1, c2 = st.columns([0.1, 0.9])
-            resume = c1.checkbox("resume", label_visibility="collapsed", value=True, key="ctx_chk")
-            c2.markdown(f"**[{last_work['카테고리']}] {last_work['할일_Main']}**")
-            if last_work.get('할일_Sub'): c2.caption(f"└ {last_work['할일_Sub']}")
-    st.markdown("---")
-    st.markdown("##### 📋 업무 리스트 (선택)")
-    templates = get_templates()
-    work_templates = [t for t in templates if t['카테고리'] == '업무/사업']
-    selected_works = []
-    if work_templates:
-        cols = st.columns(2)
-        for i, t in enumerate(work_templates):
-            with cols[i % 2]:
-                if st.checkbox(f"[{t['시간']}] {t['할일_Main']}", key=f"wk_{i}"):
-                    selected_works.append(t)
-    else: st.info("등록된 업무 템플릿이 없습니다.")
-    st.markdown("---")
-    if st.button("선택 항목 추가하기", type="primary", use_container_width=True):
-        if last_work and st.session_state.get("ctx_chk"):
-            st.session_state.tasks.append({
-                "ID": str(uuid.uuid4()), "시간": datetime.datetime.now().strftime("%H:%M"), 
-                "카테고리": last_work['카테고리'], "할일_Main": f"{last_work['할일_Main']} (이어서)",
-                "할일_Sub": last_work['할일_Sub'], "상태": "예정", "소요시간(초)": 0, "참고자료": last_work['참고자료'],
-                "accumulated": 0, "is_running": False
-            })
-        for wt in selected_works:
-            st.session_state.tasks.append({
-                "ID": str(uuid.uuid4()), "시간": wt['시간'], "카테고리": wt['카테고리'],
-                "할일_Main": wt['할일_Main'], "할일_Sub": wt.get('할일_Sub', ''),
-                "상태": "예정", "소요시간(초)": 0, "참고자료": "",
-                "accumulated": 0, "is_running": False
-            })
-        st.rerun()
-
-@st.dialog("🎯 목표 관리")
-def goal_manager():
-    if st.session_state.project_goals:
-        for i, g in enumerate(st.session_state.project_goals):
-            c1, c2, c3 = st.columns([2, 2, 1])
-            c1.markdown(f"**[{g['category']}]**")
-            c2.write(f"{g['name']} ({g['date']})")
-            if c3.button("삭제", key=f"del_gl_{i}"):
-                del st.session_state.project_goals[i]
-                save_setting("project_goals", st.session_state.project_goals)
-                st.rerun()
-    with st.form("new_gl"):
-        c1, c2 = st.columns(2)
-        cat = c1.selectbox("카테고리", PROJECT_CATEGORIES)
-        nm = c2.text_input("목표명")
-        dt = st.date_input("날짜")
-        if st.form_submit_button("추가"):
-            st.session_state.project_goals.append({"category": cat, "name": nm, "date": str(dt)})
-            st.session_state.project_goals.sort(key=lambda x: x['date'])
-            save_setting("project_goals", st.session_state.project_goals)
-            st.rerun()
-
-@st.dialog("📥 Inbox 관리", width="large")
-def manage_inbox_modal():
-    if st.session_state.inbox_items:
-        for i, item in enumerate(st.session_state.inbox_items):
-            c1, c2, c3 = st.columns([1, 4, 1], vertical_alignment="center")
-            c1.caption(f"[{item['category']}]")
-            c2.write(f"**{item['task']}**")
-            if c3.button("삭제", key=f"rm_ib_{i}"):
-                 del st.session_state.inbox_items[i]
-                 save_setting("inbox_items", st.session_state.inbox_items)
-                 st.rerun()
-            st.divider()
-    with st.form("inb_add"):
-        c1, c2 = st.columns([1, 2])
-        cat = c1.selectbox("카테고리", PROJECT_CATEGORIES)
-        task = c2.text_input("할 일")
-        if st.form_submit_button("저장"):
-            st.session_state.inbox_items.append({"category": cat, "task": task, "created_at": str(datetime.datetime.now())})
-            save_setting("inbox_items", st.session_state.inbox_items)
-            st.rerun()
-
-# ---------------------------------------------------------
-# 5. 메인 로직 (View)
-# ---------------------------------------------------------
-def format_time(seconds):
-    m, s = divmod(int(seconds), 60)
-    h, m = divmod(m, 60)
-    return f"{h:02d}:{m:02d}:{s:02d}"
-
-def render_daily_view():
-    if any(t.get('is_running') for t in st.session_state.tasks):
-        st_autorefresh(interval=1000, key="tick")
-
-    sel_date = st.session_state.selected_date
-    if st.session_state.loaded_date != sel_date:
-        data = load_day_data(sel_date)
-        st.session_state.tasks = data['tasks']
-        st.session_state.master = data['master']
-        st.session_state.loaded_date = sel_date
-
-    today = datetime.date.today()
-    future = [g for g in st.session_state.project_goals if g['date'] >= str(today)]
-    suffix = ""
-    if future:
-        pg = min(future, key=lambda x: x['date'])
-        d_obj = datetime.datetime.strptime(pg['date'], '%Y-%m-%d').date()
-        delta = (d_obj - sel_date).days
-        d_str = f"D-{delta}" if delta >= 0 else f"D+{-delta}"
-        suffix = f"({pg['name']} {d_str})"
-    
-    st.title(f"📝 {sel_date.strftime('%Y-%m-%d')} {suffix}")
-
-    c1, c2 = st.columns([1, 2], vertical_alignment="center")
-    with c1:
-        st.session_state.master['wakeup'] = st.checkbox("☀️ 7시 기상 성공!", value=st.session_state.master['wakeup'])
-    with c2:
-        templates = get_templates()
-        if templates:
-            study_templates = [t for t in templates if t['카테고리'] != '업무/사업']
-            t_names = sorted(list(set([t['템플릿명'] for t in study_templates])))
-            c_sel, c_btn = st.columns([3, 1])
-            sel_temp = c_sel.selectbox("📚 학습 루틴", ["선택하세요"] + t_names, label_visibility="collapsed")
-            if c_btn.button("적용", use_container_width=True):
-                if sel_temp != "선택하세요":
-                    new_tasks = [t for t in templates if t['템플릿명'] == sel_temp]
-                    for nt in new_tasks:
-                        # 중복 시간 체크
-                        existing = [k['시간'] for k in st.session_state.tasks]
-                        if nt['시간'] not in existing:
-                            st.session_state.tasks.append({
-                                "ID": str(uuid.uuid4()), "시간": nt['시간'], "카테고리": nt['카테고리'],
-                                "할일_Main": nt['할일_Main'], "할일_Sub": nt.get('할일_Sub', ''),
-                                "상태": "예정", "소요시간(초)": 0, "참고자료": "",
-                                "accumulated": 0, "is_running": False
-                            })
-                    st.rerun()
-        else: st.caption("👈 템플릿 관리에서 루틴 생성")
-    
-    st.divider()
-
-    # -----------------------------------------------
-    # [수정된 할 일 입력 섹션] (No st.form to allow interaction)
-    # -----------------------------------------------
-    with st.expander("➕ 할 일 추가 / ✨ AI Copilot", expanded=True):
-        # 1. 입력 필드 (Form 아님, 즉시 반영)
-        c1, c2 = st.columns([1, 1])
-        i_time = c1.time_input("시작 시간", datetime.time(9,0))
-        # key를 주어 리런 시에도 값 유지
-        i_cat = c2.selectbox("카테고리", PROJECT_CATEGORIES, key="new_task_cat")
-        
-        i_main = st.text_input("메인 목표 (Task)", key="new_task_main")
-        
-        # 2. 업무용 추가 필드 (체크박스로 활성화)
-        i_due = None
-        i_prio = ""
-        
-        if i_cat == "업무/사업":
-            st.caption("💼 업무 옵션")
-            c3, c4 = st.columns(2)
-            use_due = c3.checkbox("마감 시간 설정")
-            use_prio = c4.checkbox("중요도 설정")
-            
-            if use_due:
-                i_due = c3.time_input("마감 시간", datetime.time(18,0))
-            if use_prio:
-                i_prio = c4.selectbox("중요도", ["🔥 높음", "⚡ 보통", "☕ 낮음"], index=1)
-
-        # 3. AI 제안 버튼 (일반 버튼)
-        if st.button("✨ AI 제안 받기"):
-            st.session_state.ai_suggestion_temp = generate_ai_suggestion(i_cat, i_main)
-        
-        # AI 제안 결과 표시
-        if st.session_state.ai_suggestion_temp:
-            st.info(f"💡 AI 추천:\n{st.session_state.ai_suggestion_temp}")
-            
-        def_sub = st.session_state.get("ai_suggestion_temp", "")
-        i_sub = st.text_area("세부 목표", value=def_sub, height=100, key="new_task_sub")
-        i_link = st.text_input("참고 링크", key="new_task_link")
-        
-        # 4. 등록 버튼 (로직 검증 포함)
-        if st.button("등록", type="primary"):
-            # A. 중복 시간 체크
-            t_str = i_time.strftime("%H:%M")
-            existing_times = [t['시간'] for t in st.session_state.tasks]
-            
-            if t_str in existing_times:
-                st.error(f"⚠️ {t_str}에 이미 일정이 있습니다. 시간을 변경하세요.")
-            
-            # B. 마감 시간 검증 (같은 날이라고 가정)
-            elif i_due and i_due <= i_time:
-                st.error("⚠️ 마감 시간은 시작 시간보다 늦어야 합니다.")
-                
-            else:
-                # C. 정상 등록
-                new_task = {
-                    "ID": str(uuid.uuid4()), "시간": t_str, "카테고리": i_cat,
-                    "할일_Main": i_main, "할일_Sub": i_sub, "상태": "예정",
-                    "소요시간(초)": 0, "참고자료": i_link, "accumulated": 0, "is_running": False
-                }
-                if i_cat == "업무/사업":
-                    new_task["마감시간"] = i_due.strftime("%H:%M") if i_due else ""
-                    new_task["중요도"] = i_prio
-                
-                st.session_state.tasks.append(new_task)
-                st.session_state.ai_suggestion_temp = "" # 초기화
-                st.rerun()
-
-    # -----------------------------------------------
-    # [할 일 리스트 & 수정 기능]
-    # -----------------------------------------------
-    total_focus_sec = 0
-    cat_stats = {cat: 0 for cat in PROJECT_CATEGORIES}
-
-    if not st.session_state.tasks:
-        st.info("등록된 일정이 없습니다.")
-    else:
-        st.session_state.tasks.sort(key=lambda x: x['시간'])
-        
-        for i, t in enumerate(st.session_state.tasks):
-            # 수정 모드인지 확인
-            is_editing = (st.session_state.edit_target_id == t['ID'])
-            
-            with st.container(border=True):
-                # ================= [수정 모드 UI] =================
-                if is_editing:
-                    st.caption(f"✏️ 수정 중: {t['시간']}")
-                    with st.form(f"edit_form_{i}"):
-                        e_cat = st.selectbox("카테고리", PROJECT_CATEGORIES, index=PROJECT_CATEGORIES.index(t['카테고리']))
-                        e_main = st.text_input("메인 목표", value=t['할일_Main'])
-                        e_sub = st.text_area("세부 목표", value=t['할일_Sub'])
-                        
-                        c_save, c_cancel = st.columns(2)
-                        if c_save.form_submit_button("저장", type="primary"):
-                            t['카테고리'] = e_cat
-                            t['할일_Main'] = e_main
-                            t['할일_Sub'] = e_sub
-                            st.session_state.edit_target_id = None # 수정 종료
-                            st.rerun()
-                        if c_cancel.form_submit_button("취소"):
-                            st.session_state.edit_target_id = None
-                            st.rerun()
-
-                # ================= [일반 조회 UI] =================
-                else:
-                    cat_color = CATEGORY_COLORS.get(t['카테고리'], "gray")
-                    is_done = (t.get('상태') == '완료')
-                    
-                    # 레이아웃: 체크 | 시간 | 카테고리 | 내용 | 타이머 | 버튼 | 수정 | 삭제
-                    c0, c1, c2, c3, c4, c5, c6, c7 = st.columns([0.5, 1, 1.2, 3.5, 1.2, 1.5, 0.5, 0.5], vertical_alignment="center")
-                    
-                    # [Check]
-                    if c0.checkbox("done", value=is_done, key=f"chk_{i}", label_visibility="collapsed"):
-                        if t.get('상태') != '완료':
-                            t['상태'] = '완료'
-                            if t.get('is_running'): t['is_running'] = False
-                            st.rerun()
-                    elif t.get('상태') == '완료':
-                        t['상태'] = '예정'; st.rerun()
-
-                    # [Time]
-                    time_disp = t['시간']
-                    if t.get('마감시간'): time_disp += f"~{t['마감시간']}"
-                    c1.text(time_disp)
-                    
-                    # [Cat]
-                    c2.markdown(f":{cat_color}[**{t['카테고리']}**]")
-                    
-                    # [Content]
-                    main_txt = t['할일_Main']
-                    if is_done: c3.markdown(f"~~{main_txt}~~")
-                    else:
-                        prio = f"`{t['중요도']}` " if t.get('중요도') else ""
-                        c3.markdown(f"{prio}**{main_txt}**")
-                    
-                    # [Timer]
-                    if is_done: c4.write("-"); c5.write("🎉")
-                    else:
-                        curr = t['accumulated']
-                        if t.get('is_running'): curr += (time.time() - t['last_start'])
-                        c4.markdown(f"⏱️ `{format_time(curr)}`")
-                        
-                        if sel_date == datetime.date.today():
-                            if t.get('is_running'):
-                                if c5.button("⏹️", key=f"stp_{i}", use_container_width=True):
-                                    t['accumulated'] += (time.time() - t['last_start'])
-                                    t['is_running'] = False; st.rerun()
-                            else:
-                                lbl = "🔥" if t['카테고리']=="업무/사업" else "▶️"
-                                if c5.button(lbl, key=f"str_{i}", use_container_width=True, type="primary"):
-                                    t['is_running'] = True; t['last_start'] = time.time(); st.rerun()
-                        else: c5.caption("-")
-                    
-                    # [Edit] 수정 버튼 (시작 전인 경우만)
-                    if not is_done and not t.get('is_running') and t['accumulated'] == 0:
-                        if c6.button("✏️", key=f"edt_{i}"):
-                            st.session_state.edit_target_id = t['ID']
-                            st.rerun()
-                    else: c6.write("")
-
-                    # [Delete]
-                    if c7.button("🗑️", key=f"del_{i}"):
-                        del st.session_state.tasks[i]; st.rerun()
-
-                    # [Detail Expander]
-                    has_dt = bool(t['할일_Sub'] or t['참고자료'])
-                    exp_lbl = "🔽 세부 내용" if has_dt else "🔽 추가"
-                    with st.expander(exp_lbl):
-                        n_sub = st.text_area("세부 목표", value=t['할일_Sub'], key=f"sb_{i}")
-                        n_lnk = st.text_input("링크", value=t['참고자료'], key=f"lk_{i}")
-                        if n_sub != t['할일_Sub'] or n_lnk != t['참고자료']:
-                            t['할일_Sub'] = n_sub; t['참고자료'] = n_lnk
-
-            # 통계 집계
-            if t['카테고리'] not in NON_STUDY_CATEGORIES:
-                add_time = t['accumulated']
-                if t.get('is_running'): add_time += (time.time() - t['last_start'])
-                total_focus_sec += add_time
-                cat_stats[t['카테고리']] = cat_stats.get(t['카테고리'], 0) + add_time
-
-    st.markdown("---")
-    st.subheader("📊 Daily Report")
-    st.session_state.master['total_time'] = total_focus_sec
-    hours = total_focus_sec / 3600
-    
-    k1, k2 = st.columns(2)
-    k1.metric("총 집중 시간", format_time(total_focus_sec))
-    k2.metric("평가", "Good" if hours >= 8 else "Fighting")
-    
-    if total_focus_sec > 0:
-        for cat, sec in cat_stats.items():
-            if sec > 0:
-                ratio = sec / total_focus_sec
-                st.progress(ratio, text=f"{cat} ({int(ratio*100)}%)")
-
-    st.session_state.master['reflection'] = st.text_area("✍️ 회고", value=st.session_state.master['reflection'])
-    
-    if st.button("💾 저장하기 (Save)", type="primary", use_container_width=True):
-        if save_day_data(sel_date, st.session_state.tasks, st.session_state.master):
-            st.success("✅ 저장되었습니다!")
-        else: st.error("❌ 저장 실패")
-
-# ---------------------------------------------------------
-# 6. 실행부 (Router)
-# ---------------------------------------------------------
-with st.sidebar:
-    st.title("🗂️ 메뉴")
-    if st.button("📝 Daily Planner", use_container_width=True): 
-        st.session_state.view_mode = "Daily View"; st.rerun()
-    if st.button("📊 Dashboard", use_container_width=True): 
-        st.session_state.view_mode = "Dashboard"; st.rerun()
-    
-    st.markdown("---")
-    st.subheader("🎯 목표")
-    if st.session_state.project_goals:
-        today = datetime.date.today()
-        for g in st.session_state.project_goals:
-            delta = (datetime.datetime.strptime(g['date'], '%Y-%m-%d').date() - today).days
-            d_str = f"D-{delta}" if delta >= 0 else f"D+{-delta}"
-            st.caption(f"**{g['name']}** ({d_str})")
-    if st.button("목표 설정"): goal_manager()
-    
-    st.markdown("---")
-    if st.button(f"📥 Inbox ({len(st.session_state.inbox_items)})", use_container_width=True): manage_inbox_modal()
-    if st.button("💼 업무 템플릿", use_container_width=True): manage_work_template_modal()
-    if st.button("💾 템플릿 관리", use_container_width=True): manage_templates_modal()
-
-    st.markdown("---")
-    with st.expander("⚙️ 설정"):
-        tel_id = st.text_input("텔레그램 ID", value=st.session_state.telegram_id)
-        if st.button("ID 저장"):
-            st.session_state.telegram_id = tel_id
-            save_setting("telegram_id", tel_id)
-
-main_col, chat_col = st.columns([2.2, 1])
-
-with main_col:
-    if st.session_state.view_mode == "Daily View":
-        render_daily_view()
-    elif st.session_state.view_mode == "Dashboard":
-        st.title("📊 대시보드")
-        client = get_client()
-        if client:
-            try:
-                df = pd.DataFrame(client.open("CTA_Study_Data").worksheet("Daily_Master").get_all_records())
-                if not df.empty:
-                    st.subheader("📅 집중 시간 추이")
-                    st.line_chart(df, x="날짜", y="총집중시간(초)")
-                else: st.info("데이터 없음")
-            except: st.error("데이터 로드 실패")
-
-with chat_col:
-    st.header("💬 AI Coach")
-    st.caption("비즈니스 인사이트 & 건강 코칭")
-    if "messages" not in st.session_state: 
-        st.session_state.messages = [{"role": "assistant", "content": "안녕하세요! 무엇을 도와드릴까요?"}]
-
-    with st.container(height=600, border=True):
-        for msg in st.session_state.messages:
-            with st.chat_message(msg["role"]):
-                st.markdown(msg["content"])
-                if "video_url" in msg: st.video(msg["video_url"])
-                if "news_data" in msg:
-                    for n in msg["news_data"]: st.info(f"**{n['title']}**\n{n['summary']}")
-
-    if prompt := st.chat_input("질문 입력..."):
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        with st.chat_message("user"): st.markdown(prompt)
-        
-        with st.chat_message("assistant"):
-            resp = ""
-            media = {}
-            if "스트레칭" in prompt:
-                resp = "거북목 교정 스트레칭 영상입니다! 🐢"
-                media["video_url"] = "https://www.youtube.com/watch?v=M5J2aaw3YBc"
-            elif "뉴스" in prompt:
-                resp = "오늘의 주요 뉴스입니다."
-                media["news_data"] = [{"title": "금리 인하 전망", "summary": "내년 하반기 금리 인하 가능성..."}]
-            else:
-                resp = f"입력하신 내용: {prompt}\n(아직은 시뮬레이션입니다)"
-            
-            st.markdown(resp)
-            if "video_url" in media: st.video(media["video_url"])
-            if "news_data" in media:
-                for n in media["news_data"]: st.info(f"**{n['title']}**\n{n['summary']}")
-            
-            ai_msg = {"role": "assistant", "content": resp}
-            ai_msg.update(media)
-            st.session_state.messages.append(ai_msg)
+import streamlit as st
+import datetime
+import time
+import uuid
+import copy
+import calendar
+import io
+from arkan_core import * # noqa: F403 (상수·저장소·동기화 — 데이터 계층은 arkan_core.py)
+from arkan_core import _change_log, _chat_store, _local, _pool, _reminders, _time_key
+
+# ---------------------------------------------------------
+# 1. 앱 기본 설정
+# ---------------------------------------------------------
+st.set_page_config(page_title="아르칸(Arkan) V2", page_icon="🔥", layout="wide")
+
+# ---------------------------------------------------------
+# 2. 첫 화면 자리표시 (데이터 함수는 arkan_core.py)
+# ---------------------------------------------------------
+@st.fragment(run_every=0.5)
+def boot_panel():
+    """warm_start 가 끝날 때까지의 자리표시. 끝나면 앱 전체를 다시 실행해 패널을 채움"""
+    if not warm_pending(): st.rerun()
+    st.info("⏳ 설정 · 목표 · 오늘 할 일을 불러오는 중...")
+
+# ---------------------------------------------------------
+# 3. 초기화
+# ---------------------------------------------------------
+perf_begin()
+if 'init' not in st.session_state:
+    # 데이터는 스레드 풀에서 받고, 메뉴와 자리표시를 먼저 그림 (boot_panel 이 다 받으면 다시 실행)
+    st.session_state.warm = {"futures": warm_start(datetime.date.today()), "started": time.perf_counter(), "paint": None}
+    for k, v in SETTING_DEFAULTS.items(): st.session_state[k] = copy.deepcopy(v)
+    st.session_state.settings_versions = {} # 세션이 마지막으로 받은 설정 키별 version
+    st.session_state.project_goals, st.session_state.goals_version = [], None
+    st.session_state.inbox_page = 0
+    st.session_state.tasks = []
+    st.session_state.schedule = ScheduleIndex() # 세션 할 일의 구간 인덱스 (session_schedule)
+    st.session_state.master = {"wakeup": False, "reflection": "", "total_time": 0}
+    st.session_state.view_mode = "Daily View"
+    st.session_state.selected_date = datetime.date.today()
+    st.session_state.loaded_date = None
+    st.session_state.synced_rows = {} # 자동 저장 기준 스냅샷 {ID: 행}
+    st.session_state.synced_master = None
+    st.session_state.timer_events = [] # 선택한 날짜의 타이머 이벤트 행
+    st.session_state.expanded_tasks = set() # 간단히 보기에서 펼친 할 일 ID
+    st.session_state.startup = None # finish_warm 보고 (warm_pending 이 남김)
+    st.session_state.chat_limit = COACH_WINDOW
+    st.session_state.chat_window = None # [(id, 메시지)] 최근 것만. 로컬 저널은 최초 sync 를 기다리므로 첫 데이터 뒤에 받음
+    st.session_state.ai_suggestion_temp = ""
+    st.session_state.edit_target_id = None # 수정 중인 할 일 ID
+    st.session_state.last_ctx = (None, None) # ((카테고리, 오늘), 지난번 할 일) — session_last_context
+    st.session_state.init = True
+booting = warm_pending()
+if not booting:
+    if st.session_state.chat_window is None: st.session_state.chat_window = _chat_store().chat_page(COACH_WINDOW)
+    refresh_session_settings()
+    refresh_session_goals()
+perf_lap("init")
+
+# ---------------------------------------------------------
+# 4. 팝업 UI (Dialogs)
+# ---------------------------------------------------------
+@st.dialog("📝 템플릿 관리", width="large")
+def manage_templates_modal():
+    st.caption("자주 사용하는 루틴을 세트로 만드세요.")
+    with st.form("new_temp", clear_on_submit=True):
+        c1, c2 = st.columns([1.5, 1])
+        t_name = c1.text_input("템플릿명 (예: 평일, 업무기본)")
+        t_time = c2.time_input("시간", datetime.time(9,0))
+        c3, c4 = st.columns([1, 2])
+        t_cat = c3.selectbox("카테고리", PROJECT_CATEGORIES)
+        t_main = c4.text_input("할 일")
+        if st.form_submit_button("추가"):
+            if t_name and t_main:
+                add_template_row(t_name, t_time.strftime("%H:%M"), t_cat, t_main, "")
+                st.rerun()
+            else: st.warning("내용 필수")
+    st.divider()
+    st.write("###### 📋 목록")
+    templates = get_templates()
+    if templates:
+        for i, t in enumerate(templates):
+            c1, c2, c3, c4 = st.columns([1.5, 3, 1, 0.5], vertical_alignment="center")
+            c1.caption(f"[{t['템플릿명']}] {t['시간']}")
+            c2.write(f"**{t['할일_Main']}**")
+            c3.caption(t['카테고리'])
+            if c4.button("x", key=f"del_tm_{i}"):
+                delete_template_row(i + 2)
+                st.rerun()
+    else: st.info("없음")
+
+@st.dialog("💼 업무 루틴 가져오기", width="large")
+def manage_work_template_modal():
+    st.caption("오늘 처리할 업무를 선택하세요.")
+    last_work = get_last_work_context()
+    if last_work:
+        st.markdown("##### 🔔 어제 하던 일 (Context)")
+        with st.container(border=True):
+            c1, c2 = st.columns([0.1, 0.9])
+            resume = c1.checkbox("resume", label_visibility="collapsed", value=True, key="ctx_chk")
+            c2.markdown(f"**[{last_work['카테고리']}] {last_work['할일_Main']}**")
+            if last_work.get('할일_Sub'): c2.caption(f"└ {last_work['할일_Sub']}")
+    st.markdown("---")
+    st.markdown("##### 📋 업무 리스트 (선택)")
+    work_templates = get_template_groups()["work"]
+    selected_works = []
+    if work_templates:
+        cols = st.columns(2)
+        for i, t in enumerate(work_templates):
+            with cols[i % 2]:
+                if st.checkbox(f"[{t['시간']}] {t['할일_Main']}", key=f"wk_{i}"):
+                    selected_works.append(t)
+    else: st.info("등록된 업무 템플릿이 없습니다.")
+    st.markdown("---")
+    if st.button("선택 항목 추가하기", type="primary", use_container_width=True):
+        if last_work and st.session_state.get("ctx_chk"):
+            add_session_task(resume_task(last_work))
+        if selected_works: report_template(*apply_template(st.session_state.tasks, selected_works, session_schedule()))
+        st.rerun()
+
+@st.dialog("🎯 목표 관리")
+def goal_manager():
+    if st.session_state.project_goals:
+        for g in st.session_state.project_goals:
+            c1, c2, c3 = st.columns([2, 2, 1])
+            c1.markdown(f"**[{g['category']}]**")
+            c2.write(f"{g['name']} ({g['date']})")
+            if c3.button("삭제", key=f"del_gl_{g['id']}"):
+                delete_item("goals", g['id'])
+                st.rerun()
+    with st.form("new_gl"):
+        c1, c2 = st.columns(2)
+        cat = c1.selectbox("카테고리", PROJECT_CATEGORIES)
+        nm = c2.text_input("목표명")
+        dt = st.date_input("날짜")
+        if st.form_submit_button("추가"):
+            add_item("goals", {"category": cat, "name": nm, "date": str(dt)})
+            st.rerun()
+
+@st.dialog("📥 Inbox 관리", width="large")
+def manage_inbox_modal():
+    # 보이는 페이지만 읽음. 삭제·쪽 넘김은 창 안에서만 다시 실행
+    total = item_count("inbox")
+    pages = max((total - 1) // INBOX_PAGE_SIZE + 1, 1)
+    page = min(st.session_state.inbox_page, pages - 1)
+    for item in item_page("inbox", page * INBOX_PAGE_SIZE, INBOX_PAGE_SIZE):
+        c1, c2, c3 = st.columns([1, 4, 1], vertical_alignment="center")
+        c1.caption(f"[{item['category']}]")
+        c2.write(f"**{item['task']}**")
+        if c3.button("삭제", key=f"rm_ib_{item['id']}"):
+             delete_item("inbox", item['id'])
+             st.rerun(scope="fragment")
+        st.divider()
+    if pages > 1:
+        c_prev, c_pg, c_next = st.columns([1, 2, 1], vertical_alignment="center")
+        if c_prev.button("◀", disabled=page == 0, use_container_width=True):
+            st.session_state.inbox_page = page - 1; st.rerun(scope="fragment")
+        c_pg.caption(f"{page + 1} / {pages} 쪽 · 총 {total}건")
+        if c_next.button("▶", disabled=page >= pages - 1, use_container_width=True):
+            st.session_state.inbox_page = page + 1; st.rerun(scope="fragment")
+    with st.form("inb_add"):
+        c1, c2 = st.columns([1, 2])
+        cat = c1.selectbox("카테고리", PROJECT_CATEGORIES)
+        task = c2.text_input("할 일")
+        if st.form_submit_button("저장"):
+            add_item("inbox", {"category": cat, "task": task, "created_at": str(datetime.datetime.now())})
+            st.rerun()
+
+# ---------------------------------------------------------
+# 5. 메인 로직 (View)
+# ---------------------------------------------------------
+def format_time(seconds):
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+# 1초 틱은 아래 프래그먼트만 다시 실행 (시트 접근 없음, 실행 중인 타이머 수에만 비례)
+@st.fragment(run_every=1)
+def live_timer(t):
+    curr = t['accumulated']
+    if t.get('is_running'): curr += (time.time() - t['last_start'])
+    st.markdown(f"⏱️ `{format_time(curr)}`")
+
+def daily_report(base_total, base_stats, running):
+    now = time.time()
+    total_focus_sec, cat_stats = base_total, dict(base_stats)
+    for t in running:
+        if t.get('is_running'):
+            add_time = now - t['last_start']
+            total_focus_sec += add_time
+            cat_stats[t['카테고리']] = cat_stats.get(t['카테고리'], 0) + add_time
+    hours = total_focus_sec / 3600
+
+    k1, k2 = st.columns(2)
+    k1.metric("총 집중 시간", format_time(total_focus_sec))
+    k2.metric("평가", "Good" if hours >= 8 else "Fighting")
+
+    if total_focus_sec > 0:
+        for cat, sec in cat_stats.items():
+            if sec > 0:
+                ratio = sec / total_focus_sec
+                st.progress(ratio, text=f"{cat} ({int(ratio*100)}%)")
+
+def _done_checkbox(col, t, sel_date):
+    if col.checkbox("done", value=(t.get('상태') == '완료'), key=f"chk_{t['ID']}", label_visibility="collapsed"):
+        if t.get('상태') != '완료':
+            t['상태'] = '완료'
+            if t.get('is_running'): stop_timer(t, sel_date.strftime("%Y-%m-%d"))
+            st.rerun()
+    elif t.get('상태') == '완료':
+        t['상태'] = '예정'; st.rerun()
+
+def task_summary_row(t, sel_date):
+    """간단히 보기의 한 줄 (체크 | 시간 | 내용 | 타이머 | 펼치기)"""
+    c0, c1, c2, c3, c4 = st.columns([0.5, 1.2, 5, 1.2, 0.6], vertical_alignment="center")
+    _done_checkbox(c0, t, sel_date)
+    c1.text(t['시간'] + (f"~{t['마감시간']}" if t.get('마감시간') else ""))
+    main_txt = f"~~{t['할일_Main']}~~" if t.get('상태') == '완료' else t['할일_Main']
+    c2.markdown(f":{CATEGORY_COLORS.get(t['카테고리'], 'gray')}[●] {main_txt}")
+    if t.get('is_running'):
+        with c3: live_timer(t)
+    else: c3.caption(f"⏱️ {format_time(t['accumulated'])}")
+    if c4.button("⋯", key=f"unfold_{t['ID']}"):
+        st.session_state.expanded_tasks.add(t['ID']); st.rerun()
+
+def task_row(t, sel_date):
+    """할 일 한 행의 전체 컨트롤 (위젯 키는 모두 할 일 ID 기준)"""
+    date_str = sel_date.strftime("%Y-%m-%d")
+    # ================= [수정 모드 UI] =================
+    if st.session_state.edit_target_id == t['ID']:
+        st.caption(f"✏️ 수정 중: {t['시간']}")
+        with st.form(f"edit_form_{t['ID']}"):
+            e_cat = st.selectbox("카테고리", PROJECT_CATEGORIES, index=PROJECT_CATEGORIES.index(t['카테고리']))
+            e_main = st.text_input("메인 목표", value=t['할일_Main'])
+            e_sub = st.text_area("세부 목표", value=t['할일_Sub'])
+
+            c_save, c_cancel = st.columns(2)
+            if c_save.form_submit_button("저장", type="primary"):
+                t['카테고리'] = e_cat
+                t['할일_Main'] = e_main
+                t['할일_Sub'] = e_sub
+                st.session_state.edit_target_id = None # 수정 종료
+                st.rerun()
+            if c_cancel.form_submit_button("취소"):
+                st.session_state.edit_target_id = None
+                st.rerun()
+        return
+
+    # ================= [일반 조회 UI] =================
+    cat_color = CATEGORY_COLORS.get(t['카테고리'], "gray")
+    is_done = (t.get('상태') == '완료')
+
+    # 레이아웃: 체크 | 시간 | 카테고리 | 내용 | 타이머 | 버튼 | 수정 | 삭제
+    c0, c1, c2, c3, c4, c5, c6, c7 = st.columns([0.5, 1, 1.2, 3.5, 1.2, 1.5, 0.5, 0.5], vertical_alignment="center")
+
+    # [Check]
+    _done_checkbox(c0, t, sel_date)
+
+    # [Time]
+    time_disp = t['시간']
+    if t.get('마감시간'): time_disp += f"~{t['마감시간']}"
+    c1.text(time_disp)
+
+    # [Cat]
+    c2.markdown(f":{cat_color}[**{t['카테고리']}**]")
+
+    # [Content]
+    main_txt = t['할일_Main']
+    if is_done: c3.markdown(f"~~{main_txt}~~")
+    else:
+        prio = f"`{t['중요도']}` " if t.get('중요도') else ""
+        c3.markdown(f"{prio}**{main_txt}**")
+
+    # [Timer]
+    if is_done: c4.write("-"); c5.write("🎉")
+    else:
+        if t.get('is_running'):
+            with c4: live_timer(t)
+        else: c4.markdown(f"⏱️ `{format_time(t['accumulated'])}`")
+
+        if sel_date == datetime.date.today():
+            if t.get('is_running'):
+                if c5.button("⏹️", key=f"stp_{t['ID']}", use_container_width=True):
+                    stop_timer(t, date_str); st.rerun()
+            else:
+                lbl = "🔥" if t['카테고리']=="업무/사업" else "▶️"
+                if c5.button(lbl, key=f"str_{t['ID']}", use_container_width=True, type="primary"):
+                    start_timer(t, date_str); st.rerun()
+        else: c5.caption("-")
+
+    # [Edit] 수정 버튼 (시작 전인 경우만)
+    if not is_done and not t.get('is_running') and t['accumulated'] == 0:
+        if c6.button("✏️", key=f"edt_{t['ID']}"):
+            st.session_state.edit_target_id = t['ID']
+            st.rerun()
+    else: c6.write("")
+
+    # [Delete]
+    if c7.button("🗑️", key=f"del_{t['ID']}"):
+        if t.get('is_running'): stop_timer(t, date_str)
+        remove_session_task(t)
+        st.session_state.expanded_tasks.discard(t['ID']); st.rerun()
+
+    # [Detail Expander]
+    has_dt = bool(t['할일_Sub'] or t['참고자료'])
+    exp_lbl = "🔽 세부 내용" if has_dt else "🔽 추가"
+    with st.expander(exp_lbl):
+        n_sub = st.text_area("세부 목표", value=t['할일_Sub'], key=f"sb_{t['ID']}")
+        n_lnk = st.text_input("링크", value=t['참고자료'], key=f"lk_{t['ID']}")
+        if n_sub != t['할일_Sub'] or n_lnk != t['참고자료']:
+            t['할일_Sub'] = n_sub; t['참고자료'] = n_lnk
+
+def render_daily_view():
+    sel_date = st.session_state.selected_date
+    if st.session_state.loaded_date != sel_date:
+        data = load_day_data(sel_date)
+        st.session_state.tasks = sorted(data['tasks'], key=_time_key)
+        st.session_state.schedule = ScheduleIndex(st.session_state.tasks)
+        st.session_state.master = data['master']
+        st.session_state.loaded_date = sel_date
+        date_str = sel_date.strftime("%Y-%m-%d")
+        st.session_state.synced_rows = {str(t['ID']): task_to_row(t, date_str) for t in data['tasks']}
+        st.session_state.synced_master = master_to_row(date_str, data['master'])
+        # 새로고침 전에 돌던 타이머와 저장 전에 멈춘 타이머의 누적을 이벤트 로그에서 되살림
+        st.session_state.timer_events = timer_events(date_str, date_str)
+        # 지난 날짜에 켜 둔 채 남은 타이머는 그날 자정에 멈춘 것으로 (시작/정지 버튼은 오늘만 보여서 계속 쌓이지 않게)
+        day_end = datetime.datetime.combine(sel_date + datetime.timedelta(days=1), datetime.time()).timestamp() if sel_date < datetime.date.today() else None
+        for t in restore_timers(data['tasks'], st.session_state.timer_events, until=day_end): log_timer_event(t, "stop", date_str, day_end)
+    prefetch_range(sel_date - datetime.timedelta(days=1), sel_date + datetime.timedelta(days=1))
+    perf_lap("daily:load")
+
+    today = datetime.date.today()
+    future = [g for g in st.session_state.project_goals if g['date'] >= str(today)]
+    suffix = ""
+    if future:
+        pg = min(future, key=lambda x: x['date'])
+        d_obj = datetime.datetime.strptime(pg['date'], '%Y-%m-%d').date()
+        delta = (d_obj - sel_date).days
+        d_str = f"D-{delta}" if delta >= 0 else f"D+{-delta}"
+        suffix = f"({pg['name']} {d_str})"
+    
+    st.title(f"📝 {sel_date.strftime('%Y-%m-%d')} {suffix}")
+
+    c1, c2 = st.columns([1, 2], vertical_alignment="center")
+    with c1:
+        st.session_state.master['wakeup'] = st.checkbox("☀️ 7시 기상 성공!", value=st.session_state.master['wakeup'])
+    with c2:
+        groups = get_template_groups()
+        if groups["by_name"]:
+            t_names = groups["study_names"]
+            c_sel, c_btn = st.columns([3, 1])
+            sel_temp = c_sel.selectbox("📚 학습 루틴", ["선택하세요"] + t_names, label_visibility="collapsed")
+            if c_btn.button("적용", use_container_width=True):
+                if sel_temp != "선택하세요":
+                    report_template(*apply_template(st.session_state.tasks, groups["by_name"].get(sel_temp, []), session_schedule()))
+                    st.rerun()
+        else: st.caption("👈 템플릿 관리에서 루틴 생성")
+    
+    st.divider()
+    perf_lap("daily:header")
+
+    # -----------------------------------------------
+    # [수정된 할 일 입력 섹션] (No st.form to allow interaction)
+    # -----------------------------------------------
+    with st.expander("➕ 할 일 추가 / ✨ AI Copilot", expanded=True):
+        # 1. 입력 필드 (Form 아님, 즉시 반영)
+        c1, c2 = st.columns([1, 1])
+        i_time = c1.time_input("시작 시간", datetime.time(9,0))
+        # key를 주어 리런 시에도 값 유지
+        i_cat = c2.selectbox("카테고리", PROJECT_CATEGORIES, key="new_task_cat")
+        
+        i_main = st.text_input("메인 목표 (Task)", key="new_task_main")
+        if i_main:
+            hints = suggest_subtasks(i_cat, i_main, 3)
+            if hints: st.caption("💡 예전에 하던 세부 목표: " + " · ".join(hints))
+
+        # 이 카테고리에서 지난번에 하던 일 (카테고리나 날짜가 바뀔 때만 조회)
+        last_ctx = session_last_context(i_cat)
+        if last_ctx:
+            c_ctx, c_res = st.columns([3, 1], vertical_alignment="center")
+            c_ctx.caption(f"🔔 지난번 ({last_ctx['날짜']}): **{last_ctx['할일_Main']}**")
+            if c_res.button("이어하기", key="resume_ctx", use_container_width=True):
+                add_session_task(resume_task(last_ctx)); st.rerun()
+        
+        # 2. 업무용 추가 필드 (체크박스로 활성화)
+        i_due = None
+        i_prio = ""
+        
+        if i_cat == "업무/사업":
+            st.caption("💼 업무 옵션")
+            c3, c4 = st.columns(2)
+            use_due = c3.checkbox("마감 시간 설정")
+            use_prio = c4.checkbox("중요도 설정")
+            
+            if use_due:
+                i_due = c3.time_input("마감 시간", datetime.time(18,0))
+            if use_prio:
+                i_prio = c4.selectbox("중요도", PRIORITIES, index=1)
+
+        # 3. AI 제안 버튼 (일반 버튼)
+        if st.button("✨ AI 제안 받기"):
+            st.session_state.ai_suggestion_temp = generate_ai_suggestion(i_cat, i_main)
+        
+        # AI 제안 결과 표시
+        if st.session_state.ai_suggestion_temp:
+            st.info(f"💡 AI 추천:\n{st.session_state.ai_suggestion_temp}")
+            
+        def_sub = st.session_state.get("ai_suggestion_temp", "")
+        i_sub = st.text_area("세부 목표", value=def_sub, height=100, key="new_task_sub")
+        i_link = st.text_input("참고 링크", key="new_task_link")
+        
+        # 4. 등록 버튼 (로직 검증 포함)
+        if st.button("등록", type="primary"):
+            t_str = i_time.strftime("%H:%M")
+            due_str = i_due.strftime("%H:%M") if i_due else ""
+
+            # A. 마감 시간 검증 (같은 날이라고 가정)
+            if i_due and i_due <= i_time:
+                st.error("⚠️ 마감 시간은 시작 시간보다 늦어야 합니다.")
+
+            # B. 일정 겹침 체크 (시작~마감 구간 기준)
+            elif (clash := conflict_message(session_schedule(), {"시간": t_str, "마감시간": due_str, "할일_Main": i_main})):
+                st.error(f"⚠️ {clash}. 시간을 변경하세요.")
+
+            else:
+                # C. 정상 등록
+                new_task = {
+                    "ID": str(uuid.uuid4()), "시간": t_str, "카테고리": i_cat,
+                    "할일_Main": i_main, "할일_Sub": i_sub, "상태": "예정",
+                    "소요시간(초)": 0, "참고자료": i_link, "accumulated": 0, "is_running": False
+                }
+                if i_cat == "업무/사업":
+                    new_task["마감시간"] = due_str
+                    new_task["중요도"] = i_prio
+                
+                add_session_task(new_task)
+                st.session_state.ai_suggestion_temp = "" # 초기화
+                st.rerun()
+    perf_lap("daily:add_form")
+
+    # -----------------------------------------------
+    # [할 일 리스트 & 수정 기능]
+    # -----------------------------------------------
+    # 통계는 화면에 그리는 행과 무관하게 전체로 (실행 중인 타이머의 경과분은 daily_report 에서 틱마다 더함)
+    total_focus_sec = 0
+    cat_stats = {cat: 0 for cat in PROJECT_CATEGORIES}
+    running = []
+    for t in st.session_state.tasks:
+        if t['카테고리'] not in NON_STUDY_CATEGORIES:
+            total_focus_sec += t['accumulated']
+            cat_stats[t['카테고리']] = cat_stats.get(t['카테고리'], 0) + t['accumulated']
+            if t.get('is_running'): running.append(t)
+
+    tasks = st.session_state.tasks # 시간 순 유지 (불러올 때 정렬, 이후엔 insert_task 로 제자리 삽입)
+    if not tasks:
+        st.info("등록된 일정이 없습니다.")
+    else:
+        if "task_compact" not in st.session_state: st.session_state.task_compact = len(tasks) > TASK_COMPACT_MIN
+        pages = (len(tasks) - 1) // TASK_PAGE_SIZE + 1
+        c_mode, c_page = st.columns([3, 1], vertical_alignment="center")
+        compact = c_mode.toggle("간단히 보기 (펼친 행만 전체 컨트롤)", key="task_compact")
+        page = 1
+        if pages > 1:
+            if st.session_state.get("task_page", 1) > pages: st.session_state.task_page = pages
+            page = c_page.number_input("페이지", min_value=1, max_value=pages, key="task_page", label_visibility="collapsed")
+            c_page.caption(f"{page} / {pages} 쪽 · 전체 {len(tasks)}건")
+
+        for t in tasks[(page - 1) * TASK_PAGE_SIZE:page * TASK_PAGE_SIZE]:
+            with st.container(border=True):
+                if compact and t['ID'] not in st.session_state.expanded_tasks and st.session_state.edit_target_id != t['ID']:
+                    task_summary_row(t, sel_date)
+                else:
+                    task_row(t, sel_date)
+                    if compact and st.button("🔼 접기", key=f"fold_{t['ID']}"):
+                        st.session_state.expanded_tasks.discard(t['ID']); st.rerun()
+
+    perf_lap("daily:task_list")
+    st.markdown("---")
+    st.subheader("📊 Daily Report")
+    st.session_state.master['total_time'] = total_focus_sec + sum(time.time() - t['last_start'] for t in running)
+    report = st.fragment(daily_report, run_every=1 if running else None)
+    report(total_focus_sec, cat_stats, running)
+    profile = hour_profile(st.session_state.timer_events, now=time.time())
+    if any(profile):
+        peak = max(range(24), key=profile.__getitem__)
+        st.caption(f"⏰ 시간대별 집중 (0~23시, 타이머 기록): `{sparkline(profile)}` · 가장 많은 때 {peak}시 {profile[peak]:.0f}분")
+    if sel_date >= today: schedule_reminders(sel_date.strftime("%Y-%m-%d"), st.session_state.tasks, st.session_state.project_goals)
+
+    st.session_state.master['reflection'] = st.text_area("✍️ 회고", value=st.session_state.master['reflection'])
+    perf_lap("daily:report")
+    
+    queue_autosave(sel_date.strftime("%Y-%m-%d"))
+    saver, store, sync = get_autosaver(), get_local_store(), get_sync_engine()
+    c_save, c_stat = st.columns([1, 2], vertical_alignment="center")
+    if c_save.button("💾 지금 저장 (Save)", type="primary", use_container_width=True):
+        if not saver: st.error("❌ 저장 실패")
+        else:
+            with st.spinner("💾 저장 중..."): saved = saver.flush(wait=True)
+            if not saved: st.error(f"❌ 저장 실패 (자동으로 다시 시도합니다): {saver.last_error}")
+            elif sync:
+                sync.flush() # 시트 반영은 백그라운드 (결과는 아래 동기화 상태에)
+                st.toast("💾 로컬에 저장했습니다 · 시트 동기화를 시작했습니다")
+            else: st.toast("💾 시트에 저장했습니다")
+    if saver:
+        last = saver.last_flush.strftime("%H:%M:%S") if saver.last_flush else "-"
+        c_stat.caption(f"자동 저장 대기 {saver.pending()}건 · 마지막 저장 {last}")
+        if saver.last_error: c_stat.caption(f"⚠️ 저장 재시도 중: {saver.last_error}")
+    if sync:
+        last = sync.last_sync.strftime("%H:%M:%S") if sync.last_sync else "-"
+        c_stat.caption(f"☁️ 동기화 대기 {store.pending_count()}건 · 마지막 동기화 {last}")
+        if sync.last_error: c_stat.caption(f"⚠️ 오프라인 (로컬에 저장 중): {sync.last_error}")
+    perf_lap("daily:save")
+
+def _day_focus(data):
+    """하루 집중 시간: 저장된 총집중시간, 없으면 공부 카테고리 소요시간 합"""
+    return data["master"]["total_time"] or sum(t['accumulated'] for t in data["tasks"] if t['카테고리'] not in NON_STUDY_CATEGORIES)
+
+# 위젯(selected_date)이 그려지기 전에 바꿔야 하므로 on_click 콜백으로만 호출
+def _open_day(d):
+    st.session_state.selected_date = d
+    st.session_state.view_mode = "Daily View"
+
+def _shift_date(days=0, months=0):
+    d = st.session_state.selected_date
+    if months:
+        y, m = divmod(d.month - 1 + months, 12)
+        y, m = d.year + y, m + 1
+        d = datetime.date(y, m, min(d.day, calendar.monthrange(y, m)[1]))
+    st.session_state.selected_date = d + datetime.timedelta(days=days)
+
+def _planner_nav(title, prev_label, next_label, step):
+    c_prev, c_title, c_next = st.columns([1, 4, 1], vertical_alignment="center")
+    c_prev.button(prev_label, on_click=_shift_date, kwargs={k: -v for k, v in step.items()}, use_container_width=True)
+    c_title.subheader(title)
+    c_next.button(next_label, on_click=_shift_date, kwargs=step, use_container_width=True)
+
+def render_week_view():
+    sel = st.session_state.selected_date
+    start = sel - datetime.timedelta(days=sel.weekday())
+    end = start + datetime.timedelta(days=6)
+    _planner_nav(f"🗓️ {start:%Y-%m-%d} ~ {end:%m-%d}", "◀ 지난주", "다음주 ▶", {"days": 7})
+    days = load_range(start, end)
+    prefetch_range(start - datetime.timedelta(days=7), end + datetime.timedelta(days=7))
+    perf_lap("week:load")
+
+    today = datetime.date.today()
+    for col, (date_str, data) in zip(st.columns(7), days.items()):
+        d = datetime.date.fromisoformat(date_str)
+        with col:
+            st.button(f"{WEEKDAY_NAMES[d.weekday()]} {d.day}", key=f"wv_open_{date_str}", on_click=_open_day, args=(d,),
+                      type="primary" if d == today else "secondary", use_container_width=True)
+            st.caption(f"{'☀️' if data['master']['wakeup'] else '🌙'} {format_time(_day_focus(data))}")
+            for t in sorted(data["tasks"], key=lambda x: str(x['시간'])):
+                mark = "✅" if t['상태'] == "완료" else "▫️"
+                st.markdown(f"{mark} `{t['시간']}` :{CATEGORY_COLORS.get(t['카테고리'], 'gray')}[{t['할일_Main']}]")
+
+def render_month_view():
+    sel = st.session_state.selected_date
+    first = sel.replace(day=1)
+    last = sel.replace(day=calendar.monthrange(sel.year, sel.month)[1])
+    _planner_nav(f"📆 {sel:%Y년 %m월}", "◀ 지난달", "다음달 ▶", {"months": 1})
+    days = load_range(first, last)
+    prev_first = (first - datetime.timedelta(days=1)).replace(day=1)
+    nxt = last + datetime.timedelta(days=1)
+    prefetch_range(prev_first, nxt.replace(day=calendar.monthrange(nxt.year, nxt.month)[1]))
+    perf_lap("month:load")
+
+    today = datetime.date.today()
+    for col, name in zip(st.columns(7), WEEKDAY_NAMES): col.markdown(f"**{name}**")
+    for week in calendar.monthcalendar(sel.year, sel.month):
+        for col, day in zip(st.columns(7), week):
+            if not day: continue
+            d = sel.replace(day=day)
+            data = days[d.strftime("%Y-%m-%d")]
+            done = sum(t['상태'] == "완료" for t in data["tasks"])
+            with col.container(border=True):
+                st.button(str(day), key=f"mv_open_{d}", on_click=_open_day, args=(d,),
+                          type="primary" if d == today else "secondary", use_container_width=True)
+                st.caption(f"{'☀️' if data['master']['wakeup'] else '🌙'} {_day_focus(data) / 3600:.1f}h · {done}/{len(data['tasks'])}")
+
+def render_dashboard():
+    st.title("📊 대시보드")
+    if not _local() and not _pool(): return
+    rollups = get_rollups()
+    try: rollups.refresh(_change_log(), read_columns)
+    except Exception as e:
+        st.error(f"데이터 로드 실패: {e}")
+        return
+    if rollups.daily.empty and rollups.masters.empty:
+        st.info("데이터 없음")
+        return
+    today = datetime.date.today()
+
+    cur, best = rollups.view(f"streaks:{today}", lambda d, m: wakeup_streaks(m, today))
+    comp = rollups.view("completion", lambda d, m: completion_by_category(d))
+    done, total = int(comp["완료"].sum()), int(comp["전체"].sum())
+    k1, k2, k3 = st.columns(3)
+    k1.metric("☀️ 연속 기상 성공", f"{cur}일")
+    k2.metric("🏆 최장 연속", f"{best}일")
+    k3.metric("✅ 전체 완료율", f"{100 * done / total:.1f}%" if total else "-")
+
+    if not rollups.masters.empty:
+        st.subheader("📅 집중 시간 추이")
+        st.line_chart(rollups.masters, x="날짜", y="총집중시간(초)")
+
+    st.subheader("⏱️ 카테고리별 집중 시간 (시간)")
+    t_week, t_month = st.tabs(["주간", "월간"])
+    with t_week: st.bar_chart(rollups.view("weekly", lambda d, m: focus_by_period(d, "W")))
+    with t_month: st.bar_chart(rollups.view("monthly", lambda d, m: focus_by_period(d, "M")))
+
+    st.subheader("✅ 카테고리별 완료율")
+    st.dataframe(comp, use_container_width=True)
+
+    st.subheader("🎯 목표 페이스")
+    pace = goal_pace(rollups.daily, st.session_state.project_goals, today)
+    if not pace.empty: st.dataframe(pace, hide_index=True, use_container_width=True)
+    else: st.caption("다가오는 목표가 없습니다")
+
+    st.subheader("🔥 시간대별 집중 (최근 8주 타이머 기록)")
+    events = timer_events(str(today - datetime.timedelta(weeks=8)), str(today))
+    if events:
+        st.vega_lite_chart(hour_heatmap(timer_intervals(events, now=time.time())), {
+            "mark": "rect",
+            "encoding": {"x": {"field": "시", "type": "ordinal"},
+                         "y": {"field": "요일", "type": "ordinal", "sort": WEEKDAY_NAMES},
+                         "color": {"field": "시간", "type": "quantitative"}}}, use_container_width=True)
+    else: st.caption("아직 타이머 기록이 없습니다")
+
+    span, sec = rollups.last_refresh
+    st.caption(f"마지막 집계: {span} 구간 다시 계산 ({sec * 1000:.0f}ms) · 데이터 version {rollups.version}")
+
+def coach_message(msg, rich=True):
+    with st.chat_message(msg["role"]):
+        st.markdown(msg["content"])
+        if "video_url" in msg:
+            if rich: st.video(msg["video_url"])
+            else: st.caption(f"🎬 [영상]({msg['video_url']})")
+        if "news_data" in msg:
+            for n in msg["news_data"]:
+                if rich: st.info(f"**{n['title']}**\n{n['summary']}")
+                else: st.caption(f"📰 {n['title']}")
+
+# 채팅 입력은 이 프래그먼트만 다시 실행 (할 일 목록·대시보드는 그대로)
+@st.fragment
+def render_coach():
+    st.header("💬 AI Coach")
+    st.caption("비즈니스 인사이트 & 건강 코칭")
+
+    window = st.session_state.chat_window
+    box = st.container(height=600, border=True)
+    with box:
+        if len(window) >= st.session_state.chat_limit:
+            st.button("⬆️ 이전 대화 더 보기", on_click=coach_load_older, use_container_width=True)
+        if not window:
+            with st.chat_message("assistant"): st.markdown("안녕하세요! 무엇을 도와드릴까요?")
+        for k, (_, msg) in enumerate(window):
+            coach_message(msg, rich=k >= len(window) - COACH_MEDIA_RECENT)
+
+    if prompt := st.chat_input("질문 입력..."):
+        user_msg = {"role": "user", "content": prompt}
+        history = [m for _, m in window]
+        coach_append(user_msg)
+        reply = {"role": "assistant", "content": ""}
+        with box:
+            coach_message(user_msg)
+            with st.chat_message("assistant"):
+                st.write_stream(coach_stream(prompt, history, reply))
+                if "video_url" in reply: st.video(reply["video_url"])
+                if "news_data" in reply:
+                    for n in reply["news_data"]: st.info(f"**{n['title']}**\n{n['summary']}")
+        coach_append(reply)
+
+# ---------------------------------------------------------
+# 6. 실행부 (Router)
+# ---------------------------------------------------------
+with st.sidebar:
+    st.title("🗂️ 메뉴")
+    if st.button("📝 Daily Planner", use_container_width=True): 
+        st.session_state.view_mode = "Daily View"; st.rerun()
+    if st.button("🗓️ Week Planner", use_container_width=True): 
+        st.session_state.view_mode = "Week View"; st.rerun()
+    if st.button("📆 Month Planner", use_container_width=True): 
+        st.session_state.view_mode = "Month View"; st.rerun()
+    if st.button("📊 Dashboard", use_container_width=True): 
+        st.session_state.view_mode = "Dashboard"; st.rerun()
+    st.date_input("📅 날짜", key="selected_date")
+    
+    st.markdown("---")
+    st.subheader("🎯 목표")
+    if st.session_state.project_goals:
+        today = datetime.date.today()
+        for g in st.session_state.project_goals:
+            delta = (datetime.datetime.strptime(g['date'], '%Y-%m-%d').date() - today).days
+            d_str = f"D-{delta}" if delta >= 0 else f"D+{-delta}"
+            st.caption(f"**{g['name']}** ({d_str})")
+    if st.button("목표 설정"): goal_manager()
+    
+    st.markdown("---")
+    if st.button("📥 Inbox" if booting else f"📥 Inbox ({item_count('inbox')})", use_container_width=True): manage_inbox_modal()
+    if st.button("💼 업무 템플릿", use_container_width=True): manage_work_template_modal()
+    if st.button("💾 템플릿 관리", use_container_width=True): manage_templates_modal()
+
+    st.markdown("---")
+    with st.expander("⚙️ 설정"):
+        tel_id = st.text_input("텔레그램 ID", value=st.session_state.telegram_id)
+        if st.button("ID 저장"):
+            st.session_state.telegram_id = tel_id
+            save_setting("telegram_id", tel_id)
+        sched = _reminders()
+        if not sched: st.caption("🔕 알림 꺼짐 (봇 토큰 telegram_bot_token 없음)")
+        else:
+            st.caption(f"🔔 알림 대기 {sched.pending()}건 · 보냄 {sched.sent_n}건" + (f" · 못 보냄 {sched.dropped_n}건" if sched.dropped_n else "")
+                       + (f" · 마지막 {sched.last_sent:%H:%M}" if sched.last_sent else "") + (f" · ⚠️ {sched.last_error}" if sched.last_error else ""))
+            if st.session_state.telegram_id and st.button("🔔 테스트 알림"):
+                sched.replace(str(st.session_state.telegram_id).strip(), "test", [(f"test:{time.time()}", time.time() + 0.5, "✅ 아르칸 알림 테스트")])
+                st.toast("테스트 알림을 보냈습니다")
+        if st.button("🔄 시트 다시 읽기"):
+            get_day_cache().invalidate(); invalidate_handles()
+            get_settings_store().index = None
+            for kind in ITEM_SHEETS: get_item_store(kind).invalidate()
+            get_timer_log().invalidate()
+            if get_sync_engine(): get_sync_engine().sync(full=True)
+            st.session_state.loaded_date = None; st.rerun()
+        if st.button("📦 백업 만들기 (CSV zip)"):
+            with st.spinner("내보내는 중..."): st.session_state.backup_zip = export_zip()
+        if st.session_state.get("backup_zip"):
+            st.download_button("⬇️ 백업 받기", st.session_state.backup_zip, file_name=f"arkan_backup_{datetime.date.today():%Y%m%d}.zip", mime="application/zip")
+        files = st.file_uploader("백업 가져오기 (표 이름.csv / .parquet)", type=["csv", "parquet"], accept_multiple_files=True)
+        if files and st.button("📥 가져오기"):
+            for f in files:
+                name, _, ext = f.name.rpartition(".")
+                if name not in BACKUP_TABLES:
+                    st.error(f"❌ {f.name}: 파일 이름은 {', '.join(BACKUP_TABLES)} 중 하나여야 합니다"); continue
+                try:
+                    with st.spinner(f"{f.name} 가져오는 중..."):
+                        fp = io.TextIOWrapper(f, encoding="utf-8-sig", newline="") if ext == "csv" else f
+                        rep = import_table(name, *read_pages(fp, ext))
+                except Exception as e:
+                    st.error(f"❌ {f.name}: {e}"); continue
+                st.success(f"✅ {f.name}: {rep['added']}건 추가, {rep['skipped']}건은 이미 있음")
+                if rep["errors"]:
+                    lines = [f"{line}행: {msg}" for line, msg in rep["errors"][:10]]
+                    if len(rep["errors"]) > 10: lines.append(f"… 외 {len(rep['errors']) - 10}건")
+                    st.warning(f"⚠️ 건너뛴 행 {len(rep['errors'])}건  \n" + "  \n".join(lines))
+            st.session_state.loaded_date = None
+        if TASK_PARTITIONING and st.button("🗂️ 할 일 시트 월별 분할 (1회)"):
+            with st.spinner("분할 중..."): moved = migrate_task_partitions()
+            st.success(f"✅ {moved}건을 월별 시트로 옮겼습니다")
+        api_stats = get_gateway().stats
+        if api_stats and st.toggle("📡 Sheets API 호출 통계"): # 표를 그릴 때만 pandas 를 불러옴
+            st.dataframe([
+                {"호출": k, "횟수": v["calls"], "평균(ms)": round(1000 * v["total_sec"] / max(v["calls"] - v["errors"], 1)),
+                 "최대(ms)": round(1000 * v["max_sec"]), "스로틀": v["throttled"], "재시도": v["retries"], "실패": v["errors"]}
+                for k, v in sorted(api_stats.items())
+            ], hide_index=True)
+    if st.query_params.get("diag") == "1": diagnostics_panel()
+perf_lap("sidebar")
+
+main_col, chat_col = st.columns([2.2, 1])
+
+if booting: # 메뉴와 자리표시까지가 첫 화면
+    if st.session_state.warm["paint"] is None: st.session_state.warm["paint"] = get_perf_log().elapsed()
+    with main_col: boot_panel()
+    with chat_col:
+        st.header("💬 AI Coach")
+        st.caption("대화 기록을 불러오는 중...")
+    perf_lap("boot")
+else:
+    with main_col:
+        if st.session_state.view_mode == "Daily View":
+            render_daily_view()
+        elif st.session_state.view_mode == "Week View":
+            render_week_view()
+            perf_lap("week")
+        elif st.session_state.view_mode == "Month View":
+            render_month_view()
+            perf_lap("month")
+        elif st.session_state.view_mode == "Dashboard":
+            render_dashboard()
+            perf_lap("dashboard")
+
+    with chat_col:
+        render_coach()
+    perf_lap("chat")
+perf_end()
@@ -0,0 +1,2829 @@
+"""아르칸 데이터 계층: 상수, Sheets·로컬 저널 읽기/쓰기, 동기화, 자동 저장, 알림, 시작 준비
+화면을 그리지 않아 import 만으로 쓸 수 있음 (app.py 의 화면, bench.py, backup.py, 테스트가 같이 씀)"""
+import streamlit as st
+import datetime
+import time
+import json
+import uuid
+import copy
+import collections
+import itertools
+import bisect
+import heapq
+import threading
+import random
+import re
+import os
+import sqlite3
+import csv
+import io
+import zipfile
+import math
+import sys
+import concurrent.futures
+# pandas / numpy 는 대시보드에서, gspread / oauth2client 는 처음 연결할 때 불러옴 (새 세션 첫 화면을 빨리 그리도록)
+
+# ---------------------------------------------------------
+# 1. 상수
+# ---------------------------------------------------------
+PROJECT_CATEGORIES = ["CTA 공부", "업무/사업", "건강/운동", "기타/생활"]
+CATEGORY_COLORS = {"CTA 공부": "blue", "업무/사업": "orange", "건강/운동": "green", "기타/생활": "gray"}
+NON_STUDY_CATEGORIES = ["건강/운동", "기타/생활"] 
+WEEKDAY_NAMES = ["월", "화", "수", "목", "금", "토", "일"]
+SPREADSHEET_NAME = "CTA_Study_Data"
+MASTER_HEADER = ["날짜", "기상성공", "총집중시간(초)", "한줄평"]
+TEMPLATE_HEADER = ["템플릿명", "시간", "카테고리", "할일_Main", "할일_Sub"]
+TEMPLATE_REVALIDATE_SEC = 0 # 0 이면 템플릿 백그라운드 재검증 안 함 (변경은 앱 안에서만 일어난다고 가정)
+AUTOSAVE_INTERVAL_SEC = 10 # 자동 저장 주기
+AUTOSAVE_MAX_PENDING = 20 # 대기 건수가 이만큼 쌓이면 주기를 기다리지 않고 저장
+SHEETS_QUOTA_PER_MIN = 60 # Sheets API 사용자당 분당 요청 한도
+SHEETS_BURST = 10 # 토큰 버킷 크기 (한 번에 몰아서 보낼 수 있는 요청 수)
+SHEETS_MAX_RETRIES = 5 # 429/5xx 재시도 횟수
+SHEETS_UI_DEADLINE_SEC = 8 # 화면을 그리는 스크립트 스레드의 호출 한 번이 스로틀·재시도로 기다리는 최대 시간 (백그라운드 스레드는 제한 없음)
+TASK_SHEET = "Task_Details"
+TASK_PARTITIONING = os.environ.get("ARKAN_TASK_PARTITIONING", "").lower() in ("1", "true", "yes") # 켜면 할 일을 월별 시트(Task_Details_YYYY_MM)에 나눠 저장 (기존 데이터는 ⚙️ 설정에서 1회 분할)
+LOCAL_DB_PATH = os.environ.get("ARKAN_LOCAL_DB", "arkan_local.db") # 로컬 저널(SQLite). "" 이면 끄고 Sheets 를 직접 읽고 씀
+SYNC_INTERVAL_SEC = 10 # 로컬 변경분을 Sheets 로 올리는 주기
+SYNC_PULL_SEC = 300 # Sheets 에서 바뀐 내용을 받아 오는 주기
+TASK_HEADER = ["ID", "날짜", "시간", "카테고리", "할일_Main", "할일_Sub", "상태", "소요시간(초)", "참고자료", "마감시간", "중요도"]
+TASK_LEGACY_WIDTH = 9 # 마감시간·중요도 열이 붙기 전의 헤더 폭 (예전 시트는 처음 읽거나 쓸 때 TASK_HEADER 로 올림)
+PRIORITIES = ["🔥 높음", "⚡ 보통", "☕ 낮음"] # 중요도 값
+TASK_STATUSES = ["예정", "진행중", "완료"] # 앱이 쓰는 상태 값 (진행중: 상태가 없는 할 일을 저장할 때의 기본값)
+ROW_STAMP = "수정시각" # 할 일·마스터 시트 행 맨 뒤의 마지막 수정 시각(epoch 초). 동기화 충돌 때 더 늦게 고친 쪽이 이김 (화면·백업엔 안 씀)
+TASK_SHEET_HEADER = TASK_HEADER + [ROW_STAMP]
+MASTER_SHEET_HEADER = MASTER_HEADER + [ROW_STAMP]
+CONTEXT_SHEET = "Context" # 카테고리별 마지막 할 일 인덱스 (없으면 처음 쓸 때 만듦)
+CONTEXT_HEADER = ["카테고리", "슬롯"] + TASK_HEADER
+CONTEXT_KEEP = 14 # Context 인덱스가 카테고리마다 들고 있는 최근 날짜 수 (오늘 이후 일정이 이보다 많으면 그때만 시트를 읽음)
+ITEM_SHEETS = { # 한 행 = 한 항목(ID 키)인 시트: 종류 → (시트명, 헤더, 항목 dict 키, 예전 Settings 키)
+    "inbox": ("Inbox", ["ID", "카테고리", "할일", "생성일시"], ["id", "category", "task", "created_at"], "inbox_items"),
+    "goals": ("Goals", ["ID", "카테고리", "목표명", "날짜"], ["id", "category", "name", "date"], "project_goals"),
+}
+TIMER_SHEET = "TimerEvents" # 타이머 시작/정지 이벤트 (append-only, 한 행 = 한 이벤트)
+TIMER_HEADER = ["ID", "할일ID", "날짜", "이벤트", "시각", "누적(초)"] # 시각: epoch 초, 누적: 그 시점 할 일의 누적 초
+SCHEDULE_SLOTS = 2048 # ScheduleIndex 세그먼트 트리의 잎 수 (하루 1440분을 덮는 2의 거듭제곱)
+TASK_PAGE_SIZE = 15 # 할 일 목록 한 페이지에 그리는 행 수
+TASK_COMPACT_MIN = 12 # 할 일이 이보다 많으면 처음엔 간단히 보기로 (펼친 행만 전체 컨트롤)
+INBOX_PAGE_SIZE = 20 # Inbox 관리 창에서 한 번에 보여 줄 항목 수
+COACH_BACKEND = os.environ.get("ARKAN_COACH_BACKEND", "stub") # AI Coach 응답 생성기 (COACH_BACKENDS 의 키)
+COACH_URL = os.environ.get("ARKAN_COACH_URL", "") # http 백엔드 주소 (줄 단위로 텍스트를 흘려 주는 POST 엔드포인트)
+COACH_WINDOW = 20 # 채팅 창에 들고 있는 최근 메시지 수 (이전 대화는 버튼으로 COACH_PAGE 개씩)
+COACH_PAGE = 20
+COACH_MEDIA_RECENT = 2 # 영상·뉴스 카드를 그대로 그리는 최근 메시지 수 (그 이전은 링크 한 줄)
+COACH_HISTORY_KEEP = 500 # 보관하는 대화 수 (로컬 저널이면 SQLite, 아니면 프로세스 메모리)
+BACKUP_PAGE_ROWS = 2000 # 내보내기 때 한 번에 읽는 행 수 (메모리에는 한 페이지만)
+BACKUP_CHUNK_ROWS = 500 # 가져오기 때 한 요청으로 덧붙이는 최대 행 수
+TELEGRAM_API = os.environ.get("ARKAN_TELEGRAM_API", "https://api.telegram.org") # 텔레그램 Bot API 주소 (테스트 땐 로컬 스텁 서버). 봇 토큰은 secrets 의 telegram_bot_token 또는 ARKAN_TELEGRAM_TOKEN
+REMIND_LEAD_MIN = 10 # 할 일 시작·마감 몇 분 전에 알릴지
+REMIND_GOAL_DAYS = (30, 7, 3, 1, 0) # 목표 D-day 알림을 보내는 날 (그날 REMIND_GOAL_HOUR 시)
+REMIND_GOAL_HOUR = 8
+REMIND_RETRY_SEC = 60 # 전송에 실패한 알림을 다시 보내기까지 (실패할 때마다 두 배, REMIND_MAX_RETRIES 번까지)
+REMIND_MAX_RETRIES = 3 # 알림 전송 실패(429/5xx/연결 오류) 재시도 횟수
+STARTUP_WORKERS = 4 # 새 세션의 첫 데이터(설정·목표·첫 날짜·템플릿)를 동시에 받는 스레드 수
+STARTUP_WAIT_SEC = 30 # 첫 화면이 그 데이터를 기다리는 최대 시간 (넘으면 평소 경로가 이어서 받음)
+PERF_HISTORY = 300 # 진단 패널의 p50/p95 를 낼 최근 실행 수 (프로세스 전체). 패널은 주소에 ?diag=1 을 붙이면 보임
+PAYLOAD_CELL_BYTES = 12 # 진단용 바이트 추정에서 셀 하나의 평균 크기
+
+# ---------------------------------------------------------
+# 2. DB 연결 및 CRUD 함수
+# ---------------------------------------------------------
+def _secret(key, default=None):
+    try: return st.secrets.get(key, default)
+    except Exception: return default # secrets.toml 자체가 없음
+
+@st.cache_resource(ttl=3600)
+def get_client():
+    if os.environ.get("ARKAN_FAKE_SHEETS"):
+        import fake_gspread # 오프라인 실행용 인메모리 가짜 Sheets
+        return fake_gspread.demo_client()
+    if not _secret("gcp_service_account"): return None
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(dict(st.secrets["gcp_service_account"]), scope)
+    return gspread.authorize(creds)
+
+class SheetsTimeout(Exception):
+    pass
+
+def _status_code(e):
+    return getattr(getattr(e, "response", None), "status_code", None)
+
+def _on_script_thread():
+    """지금 스레드가 Streamlit 리런을 실행 중인지 (자동 저장·동기화·미리 받기 스레드는 False)"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    return get_script_run_ctx(suppress_warning=True) is not None
+
+class SheetsGateway:
+    """모든 Sheets 호출이 지나가는 단일 통로
+    토큰 버킷으로 분당 한도 안에서 속도를 늦추고, 429/5xx/네트워크 오류는 지터를 준 지수 백오프로 재시도.
+    idempotent=False 인 쓰기(행 추가, 위치로 지우기, 시트 만들기)는 5xx·연결 오류면 이미 반영됐을 수 있어 거절이 확실한 429 만 재시도
+    (그 밖의 실패는 부른 쪽 — AutoSaver·SyncEngine 은 다시 줄 세우고 ID 위치를 새로 읽어 재시도).
+    deadline(초)을 넘기면 SheetsTimeout. 스크립트 스레드(리런)에서 deadline 없이 부르면 SHEETS_UI_DEADLINE_SEC 를 씀.
+    호출 종류별 지연시간·스로틀 횟수를 stats 에 누적"""
+    def __init__(self, per_min, burst):
+        self.lock = threading.Lock()
+        self.rate, self.capacity = per_min / 60.0, float(burst)
+        self.tokens, self.updated = float(burst), time.monotonic()
+        self.stats = {}
+        self.observer = None # 성공한 호출마다 (이름, 바이트) 로 불림 (PerfLog.record_call)
+
+    def _stat(self, name):
+        return self.stats.setdefault(name, {"calls": 0, "errors": 0, "retries": 0, "throttled": 0, "total_sec": 0.0, "max_sec": 0.0})
+
+    def _acquire(self, name, until):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+                self._stat(name)["throttled"] += 1
+            if until and time.monotonic() + wait > until: raise SheetsTimeout(f"{name}: 요청 한도 대기 초과")
+            time.sleep(wait)
+
+    def call(self, fn, *args, deadline=None, idempotent=True, **kw):
+        name = getattr(fn, "__name__", "call")
+        if deadline is None and _on_script_thread(): deadline = SHEETS_UI_DEADLINE_SEC
+        until = time.monotonic() + deadline if deadline else None
+        for attempt in range(SHEETS_MAX_RETRIES + 1):
+            self._acquire(name, until)
+            t0 = time.monotonic()
+            try:
+                result = fn(*args, **kw)
+                with self.lock:
+                    s = self._stat(name); dt = time.monotonic() - t0
+                    s["calls"] += 1; s["total_sec"] += dt; s["max_sec"] = max(s["max_sec"], dt)
+                if self.observer: self.observer(name, _payload_bytes(args) + _payload_bytes(kw) + _payload_bytes(result))
+                return result
+            except Exception as e:
+                code = _status_code(e)
+                retryable = code == 429 or idempotent and ((code is not None and code >= 500) or isinstance(e, (ConnectionError, TimeoutError, OSError)))
+                delay = random.uniform(0.5, 1.0) * min(2 ** attempt, 32)
+                with self.lock:
+                    s = self._stat(name); s["calls"] += 1
+                    if code == 429: s["throttled"] += 1
+                    if not retryable or attempt == SHEETS_MAX_RETRIES or (until and time.monotonic() + delay > until):
+                        s["errors"] += 1
+                        raise
+                    s["retries"] += 1
+                time.sleep(delay)
+
+@st.cache_resource
+def get_gateway():
+    gateway = SheetsGateway(SHEETS_QUOTA_PER_MIN, SHEETS_BURST)
+    gateway.observer = get_perf_log().record_call
+    return gateway
+
+def sheets_call(fn, *args, **kw):
+    return get_gateway().call(fn, *args, **kw)
+
+class SheetPool:
+    """스프레드시트(키)와 워크시트(제목) 핸들을 재런·세션 간에 재사용. 실패한 핸들만 다시 조회"""
+    def __init__(self, client, key, gateway):
+        self.client, self.key, self.gateway = client, key, gateway
+        self.lock = threading.Lock()
+        self.doc, self.sheets, self._titles = None, {}, None
+        self.headers = {} # 시트별 헤더 행 (열 이름 → 위치)
+        self.context = None # 카테고리별 마지막 할 일 인덱스 (_sheet_context)
+
+    def spreadsheet(self):
+        with self.lock:
+            if self.doc is None:
+                # 키가 없으면 최초 1회만 이름으로 찾고, 이후엔 키로 재오픈
+                if self.key: self.doc = self.gateway.call(self.client.open_by_key, self.key)
+                else: self.doc = self.gateway.call(self.client.open, SPREADSHEET_NAME)
+                self.key = self.doc.id
+            return self.doc
+
+    def worksheet(self, title):
+        """시트 핸들. 목록을 아직 모르면 worksheets 한 번으로 전부 받아 둠 (titles 와 같은 lock 이라 동시에 불려도 조회는 한 번)"""
+        doc = self.spreadsheet()
+        with self.lock:
+            if title not in self.sheets and self._titles is None: self._load_titles(doc)
+            if title not in self.sheets: self.sheets[title] = self.gateway.call(doc.worksheet, title) # 목록 이후에 생긴 시트 (없으면 WorksheetNotFound)
+            return self.sheets[title]
+
+    def titles(self):
+        doc = self.spreadsheet()
+        with self.lock:
+            if self._titles is None: self._load_titles(doc)
+            return list(self._titles)
+
+    def _load_titles(self, doc):
+        """lock 을 잡은 상태에서 호출"""
+        sheets = self.gateway.call(doc.worksheets)
+        for ws in sheets: self.sheets.setdefault(ws.title, ws)
+        self._titles = [ws.title for ws in sheets]
+
+    def ensure_worksheet(self, title, header):
+        """없으면 시트를 만들고 헤더를 씀 (월별 파티션 자동 생성)"""
+        import gspread
+        try: return self.worksheet(title)
+        except gspread.exceptions.WorksheetNotFound:
+            ws = self.gateway.call(self.spreadsheet().add_worksheet, title, rows=1000, cols=len(header), idempotent=False)
+            self.gateway.call(ws.append_row, header, idempotent=False)
+            with self.lock: self.sheets[title] = ws; self._titles = None; self.headers[title] = list(header)
+            return ws
+
+    def header(self, title):
+        if title not in self.headers:
+            rows = _read_ranges(self, [f"'{title}'!1:1"])[0]
+            self.headers[title] = [str(h) for h in rows[0]] if rows else []
+        return self.headers[title]
+
+    def invalidate(self, title=None):
+        with self.lock:
+            self._titles = None
+            if title: self.sheets.pop(title, None); self.headers.pop(title, None)
+            else: self.doc = None; self.sheets.clear(); self.headers.clear(); self.context = None
+
+@st.cache_resource(ttl=3600)
+def get_sheet_pool(key):
+    client = get_client()
+    return SheetPool(client, key, get_gateway()) if client else None
+
+def _pool():
+    if not get_client(): return None
+    return get_sheet_pool(_secret("spreadsheet_key", ""))
+
+def get_sheet(sheet_name):
+    pool = _pool()
+    if not pool: return None
+    try: return pool.worksheet(sheet_name)
+    except Exception as e:
+        pool.invalidate(sheet_name)
+        st.toast(f"⚠️ '{sheet_name}' 시트를 열 수 없습니다: {e}")
+        return None
+
+def invalidate_handles():
+    pool = _pool()
+    if pool: pool.invalidate()
+
+# --- Instrumentation ---
+def _payload_bytes(obj):
+    """요청·응답 크기 추정 = 셀(값) 수 × PAYLOAD_CELL_BYTES. 큰 읽기를 JSON 으로 직렬화하면 호출 자체보다 오래 걸려서
+    값만 든 행 목록은 행마다 len() 만 세고, 그 밖의 긴 목록은 앞 16개로 어림. 핸들 같은 객체는 0"""
+    if isinstance(obj, dict): return sum(map(_payload_bytes, obj.values()))
+    if isinstance(obj, (list, tuple)):
+        if not obj: return 0
+        first = obj[0]
+        if isinstance(first, (list, tuple, dict)) and not any(isinstance(v, (list, tuple, dict)) for v in (first.values() if isinstance(first, dict) else first)):
+            return sum(map(len, obj)) * PAYLOAD_CELL_BYTES # 값만 든 행들 (values, get_all_records)
+        if len(obj) <= 16: return sum(map(_payload_bytes, obj))
+        return sum(map(_payload_bytes, obj[:16])) * len(obj) // 16 # 긴 목록(appendCells 의 행 등)은 앞부분으로 어림
+    return PAYLOAD_CELL_BYTES if isinstance(obj, (str, int, float)) else 0
+
+def _pct(vals, q):
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(round(q * (len(vals) - 1))))]
+
+class PerfLog:
+    """스크립트 실행(리런)마다 구간별 시간과 Sheets 호출 수·바이트를 기록
+    실행 중인 기록은 스크립트 스레드의 threading.local 에 두어 게이트웨이가 그 실행의 호출로 셈.
+    다른 스레드(자동 저장·동기화)의 호출은 background 에 따로 누적"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.runs = collections.deque(maxlen=PERF_HISTORY)
+        self.background = {"calls": 0, "bytes": 0}
+        self.startups = collections.deque(maxlen=PERF_HISTORY) # 새 세션 첫 실행의 시작 보고 (finish_warm)
+        self.local = threading.local()
+
+    def begin(self, session_id, view):
+        now = time.perf_counter()
+        run = {"ts": round(time.time(), 3), "session": session_id, "view": view, "phases": {}, "calls": 0, "bytes": 0, "api": {}, "_t0": now, "_last": now}
+        self.local.run = run
+        return run
+
+    def lap(self, name):
+        """직전 lap 이후 걸린 시간을 name 구간에 더함"""
+        run = getattr(self.local, "run", None)
+        if run is None: return
+        now = time.perf_counter()
+        run["phases"][name] = run["phases"].get(name, 0.0) + (now - run["_last"])
+        run["_last"] = now
+
+    def elapsed(self):
+        """이 실행이 시작된 뒤 지난 초"""
+        run = getattr(self.local, "run", None)
+        return time.perf_counter() - run["_t0"] if run else 0.0
+
+    def record_call(self, name, nbytes):
+        run = getattr(self.local, "run", None)
+        with self.lock:
+            target = self.background if run is None else run
+            target["calls"] += 1; target["bytes"] += nbytes
+            if run is not None: run["api"][name] = run["api"].get(name, 0) + 1
+
+    def finish(self, run, status="ok"):
+        """실행 기록을 닫음. st.rerun() 으로 끊긴 실행은 다음 실행 시작 때 status="rerun" 으로 닫힘"""
+        if "_t0" not in run: return
+        run["total"] = run["_last"] - run.pop("_t0")
+        run.pop("_last")
+        run["status"] = status
+        if getattr(self.local, "run", None) is run: self.local.run = None
+        with self.lock: self.runs.append(run)
+
+    def summary(self):
+        """(구간별 p50/p95 표, 실행당 호출·바이트 p50/p95)"""
+        with self.lock: runs = list(self.runs)
+        series = {}
+        for r in runs:
+            series.setdefault("(전체)", []).append(r["total"])
+            for k, v in r["phases"].items(): series.setdefault(k, []).append(v)
+        table = [{"구간": k, "실행 수": len(v), "p50(ms)": round(1000 * _pct(v, 0.5), 1), "p95(ms)": round(1000 * _pct(v, 0.95), 1)}
+                 for k, v in series.items()]
+        per_run = {k: (_pct([r[k] for r in runs], 0.5), _pct([r[k] for r in runs], 0.95)) for k in ("calls", "bytes")} if runs else {}
+        return table, per_run
+
+    def jsonl(self):
+        with self.lock: return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in self.runs)
+
+    def record_startup(self, report):
+        with self.lock: self.startups.append(report)
+
+    def startup_summary(self):
+        """시작 보고의 항목별 p50/p95 (첫 화면까지, 데이터 대기, 작업별 시간)"""
+        with self.lock: reports = list(self.startups)
+        series = {}
+        for r in reports:
+            series.setdefault("첫 화면(paint)", []).append(r["paint"])
+            series.setdefault("데이터 대기(wait)", []).append(r["wait"])
+            for k, (sec, _) in r["jobs"].items(): series.setdefault(f"작업: {k}", []).append(sec)
+        return [{"구간": k, "세션 수": len(v), "p50(ms)": round(1000 * _pct(v, 0.5), 1), "p95(ms)": round(1000 * _pct(v, 0.95), 1)}
+                for k, v in series.items()]
+
+@st.cache_resource
+def get_perf_log():
+    return PerfLog()
+
+def perf_begin():
+    """이 실행의 기록을 시작 (끝나지 않은 직전 실행이 있으면 rerun 으로 닫음)"""
+    log = get_perf_log()
+    prev = st.session_state.get("perf_run")
+    if prev: _perf_close(log, prev, "rerun")
+    if "perf_session" not in st.session_state:
+        st.session_state.perf_session = {"id": uuid.uuid4().hex[:8], "runs": 0, "calls": 0, "bytes": 0}
+    st.session_state.perf_run = log.begin(st.session_state.perf_session["id"], st.session_state.get("view_mode"))
+
+def perf_lap(name):
+    get_perf_log().lap(name)
+
+def perf_end():
+    run = st.session_state.pop("perf_run", None)
+    if run: _perf_close(get_perf_log(), run, "ok")
+
+def _perf_close(log, run, status):
+    log.finish(run, status)
+    totals = st.session_state.perf_session
+    totals["runs"] += 1; totals["calls"] += run["calls"]; totals["bytes"] += run["bytes"]
+    st.session_state.perf_run = None
+
+def diagnostics_panel():
+    """?diag=1 일 때만 보이는 진단 패널: 구간별 p50/p95, 실행당 Sheets 호출·바이트, JSONL 내보내기"""
+    log = get_perf_log()
+    with st.expander("🩺 진단 (Diagnostics)"):
+        table, per_run = log.summary()
+        if not table:
+            st.caption("아직 기록된 실행이 없습니다")
+            return
+        import pandas as pd
+        st.dataframe(pd.DataFrame(table), hide_index=True)
+        st.caption(f"실행당 Sheets 호출 p50 {per_run['calls'][0]} · p95 {per_run['calls'][1]} / "
+                   f"바이트 p50 {per_run['bytes'][0]:,} · p95 {per_run['bytes'][1]:,}")
+        totals = st.session_state.perf_session
+        st.caption(f"이 세션: 실행 {totals['runs']}회 · Sheets 호출 {totals['calls']}회 · {totals['bytes']:,} 바이트")
+        st.caption(f"백그라운드(자동 저장·동기화): 호출 {log.background['calls']}회 · {log.background['bytes']:,} 바이트")
+        st.download_button("⬇️ JSONL 내보내기", log.jsonl(), file_name="arkan_perf.jsonl", mime="application/jsonl")
+        startup = log.startup_summary()
+        if startup:
+            st.caption("🚀 새 세션 시작 시간")
+            st.dataframe(pd.DataFrame(startup), hide_index=True)
+        boot = st.session_state.get("startup")
+        if boot:
+            errors = [f"{k}: {e}" for k, (_, e) in boot["jobs"].items() if e]
+            st.caption(f"이 세션 시작: 첫 화면 {1000 * boot['paint']:.0f}ms · 데이터 대기 {1000 * boot['wait']:.0f}ms · "
+                       f"pandas {'불러옴' if boot['pandas'] else '안 불러옴'}" + (f" · 실패 {', '.join(errors)}" if errors else ""))
+
+# --- Settings ---
+SETTING_DEFAULTS = {
+    "telegram_id": "",
+}
+# Inbox / Goals 시트로 옮기기 전 Settings 에 키가 없을 때 쓰던 기본값
+LEGACY_ITEM_DEFAULTS = {
+    "project_goals": [{"category": "CTA 공부", "name": "1차 시험", "date": str(datetime.date(2026, 4, 25))}],
+}
+
+class SettingsStore:
+    """설정(키 → JSON 문자열)의 프로세스 캐시
+    키 → 시트 행 위치를 기억해 모아 둔(stage) 여러 키를 batch_update 한 번으로 쓰고,
+    키별 version 으로 세션은 마지막으로 본 뒤 바뀐 키만 받음 (json.loads 도 version 당 1회)"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.raw, self.parsed, self.versions = {}, {}, {}
+        self.staged = {}
+        self.index = None # Settings 시트의 {키: 행 위치}. None 이면 아직 안 읽음
+        self.local_version = None # 마지막으로 병합한 로컬 저널의 settings_version
+
+    def merge(self, items):
+        """{키: JSON 문자열} 을 반영하고 값이 바뀐 키만 version 을 올림"""
+        with self.lock:
+            for k, v in items.items():
+                if self.raw.get(k) != v:
+                    self.raw[k] = v
+                    self.parsed.pop(k, None)
+                    self.versions[k] = self.versions.get(k, 0) + 1
+
+    def changed(self, known):
+        """known({키: version}) 이후 바뀐 키의 {키: (값, version)}. 값은 세션이 고쳐도 되는 사본"""
+        with self.lock:
+            out = {}
+            for k, ver in self.versions.items():
+                if k not in SETTING_DEFAULTS or known.get(k) == ver or not self.raw[k]: continue
+                if k not in self.parsed: self.parsed[k] = json.loads(self.raw[k])
+                out[k] = (copy.deepcopy(self.parsed[k]), ver)
+            return out
+
+    def stage(self, key, value):
+        with self.lock: self.staged[key] = json.dumps(value, ensure_ascii=False)
+
+    def take_staged(self):
+        with self.lock:
+            items, self.staged = self.staged, {}
+            return items
+
+    def restage(self, items):
+        # 실패한 변경을 되돌림 (그 사이 새로 stage 된 값이 우선)
+        with self.lock: self.staged = {**items, **self.staged}
+
+@st.cache_resource
+def get_settings_store():
+    return SettingsStore()
+
+def _settings_store():
+    """설정 캐시를 채움: 로컬 저널은 바뀌었을 때만 다시 병합, 시트는 프로세스당 1회 읽음"""
+    ss = get_settings_store()
+    store = _local()
+    if store:
+        version = store.settings_version
+        if ss.local_version != version:
+            ss.merge(store.settings())
+            ss.local_version = version
+    elif ss.index is None:
+        pool = _pool()
+        if pool:
+            vals = _read_ranges(pool, ["'Settings'!A:B"])[0]
+            ss.merge({str(r[0]): str(r[1]) for r in vals[1:] if len(r) > 1 and r[0] != ""})
+            ss.index = {str(r[0]): i for i, r in enumerate(vals) if r and r[0] != ""}
+    return ss
+
+def refresh_session_settings():
+    """마지막으로 본 뒤 바뀐 설정 키만 세션에 반영 (바뀐 게 없으면 읽기·파싱 없음)"""
+    try: changed = _settings_store().changed(st.session_state.settings_versions)
+    except Exception as e:
+        st.warning(f"⚠️ 설정을 불러오지 못해 기본값을 사용합니다: {e}")
+        return
+    for k, (v, ver) in changed.items():
+        st.session_state[k] = v
+        st.session_state.settings_versions[k] = ver
+
+def stage_setting(key, value):
+    get_settings_store().stage(key, value)
+
+def commit_settings():
+    """stage 된 설정을 한 번에 기록 (로컬 저널이면 트랜잭션 1회, 아니면 batch_update 1회)"""
+    ss = get_settings_store()
+    items = ss.take_staged()
+    if not items: return True
+    store = get_local_store()
+    try:
+        if store: store.set_settings(items)
+        else:
+            pool = _pool()
+            if not pool: return False
+            ss.index = _push_settings(pool, items, ss.index)
+        ss.merge(items)
+        return True
+    except Exception as e:
+        ss.restage(items)
+        ss.index = None
+        st.toast(f"⚠️ 설정 저장 실패: {e}")
+        return False
+
+def save_setting(key, value):
+    stage_setting(key, value)
+    return commit_settings()
+
+# --- Inbox & Goals ---
+def _legacy_items(kind):
+    """예전 Settings 의 JSON 목록을 행으로 (새 시트로 1회 옮길 때). ID 는 내용에서 만들어 여러 기기에서 옮겨도 겹치지 않음"""
+    title, header, fields, key = ITEM_SHEETS[kind]
+    raw = _settings_store().raw.get(key)
+    items = json.loads(raw) if raw else LEGACY_ITEM_DEFAULTS.get(key, [])
+    return [[str(uuid.uuid5(uuid.NAMESPACE_URL, f"{kind}:{json.dumps(it, sort_keys=True, ensure_ascii=False)}"))]
+            + [str(it.get(f, "")) for f in fields[1:]] for it in items]
+
+class ItemStore:
+    """Inbox / Goals 시트의 지연 로딩 캐시
+    처음엔 ID 열만 읽어 개수와 ID → 행 위치를 알고, 내용은 보여 줄 페이지의 행 범위만 읽음.
+    추가는 appendCells, 삭제는 그 행 하나의 deleteDimension 이라 목록 길이와 무관"""
+    def __init__(self, kind):
+        self.title, self.header, self.fields, _ = ITEM_SHEETS[kind]
+        self.lock = threading.Lock()
+        self.ids, self.rows, self.version = None, {}, 0 # ids: 시트 순서(헤더 제외, 빈 행은 ""), rows: 읽어 둔 {ID: 행}
+
+    def ensure(self, pool, legacy):
+        with self.lock:
+            if self.ids is not None: return
+            if self.title in pool.titles():
+                self.ids = [str(r[0]) if r else "" for r in _read_ranges(pool, [f"'{self.title}'!A2:A"])[0]]
+                self.rows = {}
+            else:
+                rows = legacy()
+                sh = pool.ensure_worksheet(self.title, self.header)
+                if rows: _batch(pool, [_append_req(sh.id, rows)])
+                self.ids, self.rows = [r[0] for r in rows], {r[0]: r for r in rows}
+            self.version += 1
+
+    def count(self):
+        with self.lock: return sum(1 for i in self.ids if i)
+
+    def page(self, pool, offset, limit):
+        with self.lock:
+            span = [(pos, tid) for pos, tid in enumerate(self.ids) if tid][offset:offset + limit if limit is not None else None]
+            missing = [pos for pos, tid in span if tid not in self.rows]
+            if missing:
+                # 아직 안 읽은 행들을 한 범위로 (시트 행 번호 = 위치 + 2)
+                lo, hi = min(missing), max(missing)
+                vals = _read_ranges(pool, [f"'{self.title}'!A{lo + 2}:{_col(len(self.header))}{hi + 2}"])[0]
+                for k, r in enumerate(vals):
+                    if r and lo + k < len(self.ids) and str(r[0]) == self.ids[lo + k]: self.rows[self.ids[lo + k]] = _pad(r, len(self.header))
+            return [self.rows[tid] for pos, tid in span if tid in self.rows]
+
+    def add(self, pool, row):
+        sh = pool.worksheet(self.title)
+        with self.lock:
+            _batch(pool, [_append_req(sh.id, [row])])
+            self.ids.append(row[0]); self.rows[row[0]] = row
+            self.version += 1
+
+    def remove(self, pool, item_id):
+        """다른 기기가 그사이 행을 넣거나 지웠을 수 있어 캐시된 위치는 믿지 않음: ID 열을 다시 읽고 그 ID 가 있는 행만 지움"""
+        sh = pool.worksheet(self.title)
+        with self.lock:
+            ids = [str(r[0]) if r else "" for r in _read_ranges(pool, [f"'{self.title}'!A2:A"])[0]]
+            reqs = [_delete_req(sh.id, pos + 1) for pos in reversed(range(len(ids))) if ids[pos] == item_id]
+            if reqs: _batch(pool, reqs)
+            self.ids = [tid for tid in ids if tid != item_id]; self.rows.pop(item_id, None)
+            self.version += 1
+
+    def invalidate(self):
+        with self.lock: self.ids, self.rows = None, {}
+
+@st.cache_resource
+def get_item_store(kind):
+    return ItemStore(kind)
+
+def _item_backend(kind):
+    """(로컬 저널, None) 또는 (None, 채워진 ItemStore). 둘 다 처음 쓸 때 Inbox/Goals 시트가 아직 없으면 예전 Settings 목록을 1회 옮김"""
+    store, pool = _local(), _pool()
+    if store:
+        store.migrate_items(kind, lambda: _legacy_items(kind), lambda: pool is not None and ITEM_SHEETS[kind][0] in pool.titles())
+        return store, None
+    if not pool: return None, None
+    items = get_item_store(kind)
+    items.ensure(pool, lambda: _legacy_items(kind))
+    return None, items
+
+def _item_dict(kind, row):
+    return dict(zip(ITEM_SHEETS[kind][2], row))
+
+def item_count(kind):
+    store, items = _item_backend(kind)
+    if store: return store.item_count(kind)
+    return items.count() if items else 0
+
+def item_page(kind, offset=0, limit=None):
+    store, items = _item_backend(kind)
+    if store: rows = store.item_page(kind, offset, limit)
+    elif items: rows = items.page(_pool(), offset, limit)
+    else: rows = []
+    return [_item_dict(kind, r) for r in rows]
+
+def items_version(kind):
+    store, items = _item_backend(kind)
+    if store: return store.items_version.get(kind, 0)
+    return items.version if items else 0
+
+def add_item(kind, item):
+    row = [str(uuid.uuid4())] + [str(item.get(f, "")) for f in ITEM_SHEETS[kind][2][1:]]
+    try:
+        store, items = _item_backend(kind)
+        if store: store.add_item(kind, row)
+        elif items: items.add(_pool(), row)
+    except Exception as e:
+        get_item_store(kind).invalidate()
+        st.toast(f"⚠️ 저장 실패: {e}")
+
+def delete_item(kind, item_id):
+    try:
+        store, items = _item_backend(kind)
+        if store: store.delete_item(kind, item_id)
+        elif items: items.remove(_pool(), item_id)
+    except Exception as e:
+        get_item_store(kind).invalidate()
+        st.toast(f"⚠️ 삭제 실패: {e}")
+
+def refresh_session_goals():
+    """목표가 바뀌었을 때만 세션 목록을 다시 만듦 (사이드바·제목의 D-day 용, 날짜순)"""
+    try:
+        ver = items_version("goals")
+        if st.session_state.goals_version != ver:
+            st.session_state.project_goals = sorted(item_page("goals"), key=lambda g: g['date'])
+            st.session_state.goals_version = ver
+    except Exception as e: st.warning(f"⚠️ 목표를 불러오지 못했습니다: {e}")
+
+# --- Daily Task ---
+def _read_ranges(pool, ranges):
+    """여러 범위를 values_batch_get 한 번으로 읽음 (숫자는 숫자, 날짜는 문자열로)"""
+    got = pool.gateway.call(pool.spreadsheet().values_batch_get, ranges, params={"valueRenderOption": "UNFORMATTED_VALUE", "dateTimeRenderOption": "FORMATTED_STRING"})
+    return [vr.get("values", []) for vr in got.get("valueRanges", [])]
+
+def _batch(pool, reqs):
+    """batch_update 한 번. 덮어쓰기(updateCells)만 든 요청이 아니면 다시 보낼 때 두 번 반영될 수 있어 idempotent=False"""
+    return pool.gateway.call(pool.spreadsheet().batch_update, {"requests": reqs}, idempotent=all("updateCells" in r for r in reqs))
+
+def _to_records(values):
+    if not values: return []
+    head = [str(h) for h in values[0]]
+    return [{h: (r[i] if i < len(r) else "") for i, h in enumerate(head)} for r in values[1:] if any(v != "" for v in r)]
+
+def _col(n):
+    return chr(64 + n)
+
+def _task_range(title):
+    # 열 끝을 적지 않음: 예전 폭(TASK_LEGACY_WIDTH)으로 만든 시트는 격자가 좁아 A:K 를 읽으면 범위 오류
+    return f"'{title}'"
+
+def _header_reqs(pool, heads):
+    """예전 헤더인 Daily_Master·할 일 시트를 MASTER_SHEET_HEADER / TASK_SHEET_HEADER 로 올리는 batch_update 요청. heads: {시트: 읽어 둔 1행}
+    빠진 열(마감시간·중요도·수정시각)은 맨 뒤라 기존 행은 그대로 두고 격자 폭과 1행만 고침. pool.headers 를 미리 바꿔 두므로 요청이 실패하면 부른 쪽이 pool 을 invalidate"""
+    reqs = []
+    for title, head in heads.items():
+        want, oldest = (MASTER_SHEET_HEADER, len(MASTER_HEADER)) if title == "Daily_Master" else (TASK_SHEET_HEADER, TASK_LEGACY_WIDTH)
+        head = [str(h) for h in head]
+        if oldest <= len(head) < len(want) and head == want[:len(head)]:
+            sh = pool.worksheet(title)
+            if sh.col_count < len(want):
+                reqs.append({"appendDimension": {"sheetId": sh.id, "dimension": "COLUMNS", "length": len(want) - sh.col_count}})
+            reqs.append(_update_req(sh.id, 0, want))
+            head = list(want)
+        if head: pool.headers[title] = head
+    return reqs
+
+def _stamp(v):
+    """ROW_STAMP 칸 값 → epoch 초 (비었거나 예전 행이면 0)"""
+    try: return float(v or 0)
+    except (TypeError, ValueError): return 0.0
+
+def partition_title(date_str):
+    return f"{TASK_SHEET}_{date_str[:4]}_{date_str[5:7]}"
+
+def task_sheet_title(date_str):
+    """날짜의 할 일이 저장되는 시트 (월별 분할 시 Task_Details_YYYY_MM)"""
+    return partition_title(date_str) if TASK_PARTITIONING else TASK_SHEET
+
+def task_sheet_titles(pool, date_from=None, date_to=None):
+    """존재하는 할 일 시트, 최신 파티션부터. 날짜 범위를 주면 겹치는 파티션만"""
+    if not TASK_PARTITIONING: return [TASK_SHEET]
+    lo = partition_title(date_from) if date_from else ""
+    hi = partition_title(date_to) if date_to else "~"
+    return sorted((t for t in pool.titles() if re.fullmatch(rf"{TASK_SHEET}_\d{{4}}_\d{{2}}", t) and lo <= t <= hi), reverse=True)
+
+def _range_titles(date_from, date_to):
+    """[date_from, date_to] 의 할 일이 저장되는 시트 (존재 여부와 무관, 오래된 것부터)"""
+    if not TASK_PARTITIONING: return [TASK_SHEET]
+    y, m = int(date_from[:4]), int(date_from[5:7])
+    titles = []
+    while f"{y:04d}-{m:02d}" <= date_to[:7]:
+        titles.append(f"{TASK_SHEET}_{y:04d}_{m:02d}")
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return titles
+
+# --- Column Reader ---
+NUMERIC_COLUMNS = {"소요시간(초)", "총집중시간(초)"}
+
+def _sheet_columns(pool, titles, columns, date_from=None, date_to=None):
+    """시트들에서 필요한 열만 values_batch_get 한 번으로 받아 {열: tuple} 로 (행 순서는 titles 순)
+    시트에 없는 열(예전 헤더의 마감시간·중요도 등)은 빈 값"""
+    need = list(columns) + (["날짜"] if (date_from or date_to) and "날짜" not in columns else [])
+    ranges, have = [], []
+    for title in titles:
+        head = pool.header(title)
+        have.append([c for c in need if c in head])
+        ranges += [f"'{title}'!{_col(head.index(c) + 1)}2:{_col(head.index(c) + 1)}" for c in have[-1]]
+    vals = iter(_read_ranges(pool, ranges) if ranges else [])
+    out = {c: [] for c in need}
+    for cols in have:
+        part = {c: next(vals) for c in cols}
+        n = max((len(v) for v in part.values()), default=0) # 열마다 끝의 빈 칸이 잘려 길이가 다를 수 있음
+        for c in need: out[c] += [r[0] if r else "" for r in part.get(c, [])] + [""] * (n - len(part.get(c, [])))
+    if date_from or date_to:
+        keep = [i for i, d in enumerate(out["날짜"]) if (not date_from or str(d) >= date_from) and (not date_to or str(d) <= date_to)]
+        out = {c: [v[i] for i in keep] for c, v in out.items()}
+    return {c: tuple(out[c]) for c in columns}
+
+def read_columns(kind, columns, date_from=None, date_to=None):
+    """kind("tasks" / "masters")에서 지정한 열만, 날짜 범위 [date_from, date_to] 안의 행만 읽어 {열: tuple} 로"""
+    store = _local()
+    if store: return store.columns(kind, columns, date_from, date_to)
+    pool = _pool()
+    if not pool: return {c: () for c in columns}
+    titles = ["Daily_Master"] if kind == "masters" else sorted(task_sheet_titles(pool, date_from, date_to))
+    return _sheet_columns(pool, titles, columns, date_from, date_to)
+
+def columns_frame(cols):
+    """열 묶음을 알맞은 dtype 의 DataFrame 으로 (날짜 → datetime, 시간(초) → 숫자, 기상성공 → bool)"""
+    import pandas as pd
+    df = pd.DataFrame(cols)
+    if "날짜" in df: df["날짜"] = pd.to_datetime(df["날짜"], errors="coerce")
+    for c in NUMERIC_COLUMNS & set(df.columns): df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0.0)
+    if "기상성공" in df: df["기상성공"] = df["기상성공"].astype(str).str.upper() == "TRUE"
+    return df
+
+def read_frame(kind, columns, date_from=None, date_to=None):
+    return columns_frame(read_columns(kind, columns, date_from, date_to))
+
+class ChangeLog:
+    """데이터 version 과 version 마다 바뀐 날짜. 집계 캐시가 마지막으로 본 뒤 바뀐 날짜만 다시 계산하게 함"""
+    def __init__(self, keep=1000):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.entries = collections.deque(maxlen=keep) # (version, 날짜 집합 또는 None=전체)
+
+    def touch(self, dates=None):
+        with self.lock:
+            self.version += 1
+            self.entries.append((self.version, None if dates is None else frozenset(dates)))
+
+    def since(self, version):
+        """version 이후 바뀐 날짜 집합. 전체가 바뀌었거나 기록이 밀려 알 수 없으면 None"""
+        with self.lock:
+            if version == self.version: return set()
+            if not self.entries or self.entries[0][0] > version + 1: return None
+            out = set()
+            for v, dates in self.entries:
+                if v <= version: continue
+                if dates is None: return None
+                out |= dates
+            return out
+
+class DayCache:
+    """Daily_Master 와 할 일 시트(파티션 단위)를 받아 날짜별로 인덱싱한 프로세스 캐시"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.masters, self.tasks, self.loaded = {}, {}, False
+        self.changes = ChangeLog() # 이 프로세스가 시트에 쓴 날짜 (집계 캐시용)
+        self.parts = set() # 이미 받은 할 일 시트
+        self.fetch_lock = threading.Lock()
+        self.replay = None # 받는 중이면 그동안의 apply 인자 목록
+        self.prefetching = set()
+
+    def ensure_range(self, pool, date_from, date_to):
+        """마스터와 [date_from, date_to] 에 걸친 할 일 시트 중 아직 안 받은 것을 한 번에 받음"""
+        titles = _range_titles(date_from, date_to)
+        with self.lock: # 이미 받은 구간이면 다른 스레드의 받기(fetch_lock)를 기다리지 않고 바로 돌아감
+            if self.loaded and all(t in self.parts for t in titles): return
+        with self.fetch_lock: # 받기는 한 번에 하나 (캐시 lock 은 병합할 때만 잡아 화면이 기다리지 않게)
+            with self.lock: # 기다리는 동안 다른 스레드가 받았을 수 있으니 다시 확인
+                fresh = not self.loaded
+                need = [t for t in titles if fresh or t not in self.parts]
+                if not need: return
+                self.replay = [] # 받는 동안 들어온 apply 는 모아 뒀다가 병합 후 다시 적용
+            try:
+                ranges = [f"'Daily_Master'!A:{_col(len(MASTER_HEADER))}"] if fresh else []
+                have = [t for t in need if t == TASK_SHEET or t in pool.titles()]
+                vals = _read_ranges(pool, ranges + [_task_range(t) for t in have]) if ranges or have else []
+            except Exception:
+                with self.lock: self.replay = None
+                raise
+            if (reqs := _header_reqs(pool, {t: v[0] for t, v in zip(have, vals[len(ranges):]) if v})):
+                try: _batch(pool, reqs)
+                except Exception: pool.invalidate() # 헤더 이전은 다음 쓰기 때 다시 시도 (읽은 값은 그대로 씀)
+            with self.lock:
+                if fresh:
+                    self.masters = {str(m["날짜"]): m for m in _to_records(vals.pop(0))}
+                    self.tasks, self.parts = {}, set()
+                for v in vals:
+                    for d in _to_records(v): self.tasks.setdefault(str(d["날짜"]), []).append(d)
+                self.parts.update(need)
+                self.loaded = True
+                replay, self.replay = self.replay, None
+                for args in replay: self._apply(*args)
+
+    def prefetch(self, pool, date_from, date_to):
+        """아직 안 받은 구간이면 백그라운드 스레드로 미리 받아 둠 (중복 요청은 무시)"""
+        key = (date_from, date_to)
+        with self.lock:
+            if self.loaded and self.parts.issuperset(_range_titles(date_from, date_to)): return
+            if key in self.prefetching: return
+            self.prefetching.add(key)
+        def run():
+            try: self.ensure_range(pool, date_from, date_to)
+            except Exception: pass # 미리 받기 실패는 실제로 볼 때 다시 시도됨
+            finally:
+                with self.lock: self.prefetching.discard(key)
+        threading.Thread(target=run, daemon=True, name="day-prefetch").start()
+
+    def range(self, date_from, date_to):
+        """구간의 ({날짜: 마스터}, {날짜: [할 일]}) 사본"""
+        with self.lock:
+            masters = {d: dict(m) for d, m in self.masters.items() if date_from <= d <= date_to}
+            tasks = {d: [dict(t) for t in ts] for d, ts in self.tasks.items() if date_from <= d <= date_to and ts}
+        return masters, tasks
+
+    def stored(self, ids):
+        """ids 중 캐시에 있는 할 일의 {ID: 시트 행} (_write_changes 가 내용이 같은 행을 건너뛰는 데 씀)"""
+        ids = set(ids)
+        with self.lock:
+            if not self.loaded: return {}
+            return {str(d["ID"]): [d.get(h, "") for h in TASK_HEADER] for ts in self.tasks.values() for d in ts if str(d["ID"]) in ids}
+
+    def apply(self, tasks, masters):
+        """저장된 변경분을 캐시에 그대로 반영 (_write_changes 와 같은 인자)"""
+        self.changes.touch({d for d, _ in tasks.values()} | set(masters))
+        with self.lock:
+            if self.replay is not None: self.replay.append((tasks, masters))
+            self._apply(tasks, masters)
+
+    def _apply(self, tasks, masters):
+        """apply 의 본체 (lock 을 잡은 상태에서 호출)"""
+        if not self.loaded: return
+        for date_str, row in masters.items(): self.masters[date_str] = dict(zip(MASTER_HEADER, row))
+        for tid, (date_str, row) in tasks.items():
+            if task_sheet_title(date_str) not in self.parts: continue
+            day = [d for d in self.tasks.get(date_str, []) if str(d["ID"]) != tid]
+            if row is not None: day.append(dict(zip(TASK_HEADER, row)))
+            self.tasks[date_str] = day
+
+    def invalidate(self):
+        with self.lock: self.loaded = False
+        self.changes.touch()
+
+@st.cache_resource
+def get_day_cache():
+    return DayCache()
+
+def _day_data(day_m, tasks):
+    """시트/저널 행(dict)을 화면용 {"tasks", "master"} 로"""
+    data = {"tasks": tasks, "master": {"wakeup": False, "reflection": "", "total_time": 0}}
+    if day_m:
+        data["master"]["wakeup"] = (str(day_m.get("기상성공")).upper() == "TRUE")
+        data["master"]["reflection"] = day_m.get("한줄평", "")
+        data["master"]["total_time"] = float(day_m.get("총집중시간(초)", 0) or 0)
+    for t in tasks:
+        t['is_running'] = False
+        t['last_start'] = None
+        t['accumulated'] = float(t.get('소요시간(초)', 0) or 0)
+    return data
+
+def load_range(date_from, date_to):
+    """[date_from, date_to] 의 날짜별 {"tasks", "master"} (한 번의 읽기, 이미 받은 구간은 읽기 없음)"""
+    days = [date_from + datetime.timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    f, t = date_from.strftime("%Y-%m-%d"), date_to.strftime("%Y-%m-%d")
+    out = {d.strftime("%Y-%m-%d"): _day_data(None, []) for d in days}
+    store = _local()
+    pool = _pool()
+    if not store and not pool: return out
+
+    try:
+        if store:
+            masters, tasks = store.range(f, t)
+        else:
+            cache = get_day_cache()
+            cache.ensure_range(pool, f, t)
+            masters, tasks = cache.range(f, t)
+        for date_str in out: out[date_str] = _day_data(masters.get(date_str), tasks.get(date_str, []))
+    except Exception as e:
+        invalidate_handles()
+        st.warning(f"⚠️ {f if f == t else f'{f} ~ {t}'} 데이터를 불러오지 못했습니다: {e}")
+    return out
+
+def load_day_data(target_date):
+    return load_range(target_date, target_date)[target_date.strftime("%Y-%m-%d")]
+
+def prefetch_range(date_from, date_to):
+    """이웃 구간을 백그라운드로 미리 받아 둠 (로컬 저널은 이미 로컬이라 할 일 없음)"""
+    if _local(): return
+    pool = _pool()
+    if pool: get_day_cache().prefetch(pool, date_from.strftime("%Y-%m-%d"), date_to.strftime("%Y-%m-%d"))
+
+def _cell(v):
+    if isinstance(v, bool): v = "TRUE" if v else "FALSE"
+    if isinstance(v, (int, float)): return {"userEnteredValue": {"numberValue": v}}
+    return {"userEnteredValue": {"stringValue": str(v)}}
+
+def _norm_row(row, width):
+    # 시트 값(UNFORMATTED)과 메모리 값을 같은 형태로 맞춰 비교
+    return [float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else str(v) for v in _pad(row, width)]
+
+def _pad(row, width):
+    return list(row)[:width] + [""] * (width - len(row))
+
+def _update_rows_req(sheet_id, row_idx, rows):
+    return {"updateCells": {"rows": [{"values": [_cell(v) for v in r]} for r in rows], "fields": "userEnteredValue",
+                            "start": {"sheetId": sheet_id, "rowIndex": row_idx, "columnIndex": 0}}}
+
+def _update_req(sheet_id, row_idx, values):
+    return _update_rows_req(sheet_id, row_idx, [values])
+
+def _append_req(sheet_id, rows):
+    return {"appendCells": {"sheetId": sheet_id, "rows": [{"values": [_cell(v) for v in r]} for r in rows], "fields": "userEnteredValue"}}
+
+def _delete_req(sheet_id, row_idx, end_idx=None):
+    return {"deleteDimension": {"range": {"sheetId": sheet_id, "dimension": "ROWS", "startIndex": row_idx, "endIndex": end_idx or row_idx + 1}}}
+
+def task_to_row(t, date_str):
+    curr_acc = t['accumulated']
+    if t.get('is_running'): curr_acc += (time.time() - t['last_start'])
+    return [
+        str(t.get('ID') or uuid.uuid4()), date_str, t.get('시간', '00:00'),
+        t.get('카테고리', '기타'), t.get('할일_Main', ''), t.get('할일_Sub', ''),
+        t.get('상태', '진행중'), round(curr_acc, 2), t.get('참고자료', ''),
+        t.get('마감시간', ''), t.get('중요도', '')
+    ]
+
+def master_to_row(date_str, master_data):
+    return [date_str, "TRUE" if master_data['wakeup'] else "FALSE", round(master_data['total_time'], 2), master_data['reflection']]
+
+def _write_changes(pool, tasks, masters, known=None, at=None):
+    """변경분을 읽기 1회 + batch_update 1회로 반영
+    tasks: {ID: (날짜, 행 또는 None=삭제)}, masters: {날짜: 행}
+    시트에선 행 위치를 찾을 ID·날짜 열만 읽음. known({ID: 시트에 있는 행}, 보통 DayCache)과 같은 행은 건너뛰고, 모르는 행은 그대로 덮어씀
+    쓰는 행마다 ROW_STAMP 열에 수정 시각을 붙임 (at: {ID 또는 날짜: 시각}, 없으면 지금).
+    at 을 주면(로컬 저널 push) 수정시각 열도 읽어 시트 쪽이 더 늦게 고친 행은 덮어쓰거나 지우지 않고, 그 키 집합을 돌려줌"""
+    known = known or {}
+    now = time.time()
+    stamp = lambda key: at.get(key, now) if at else now
+    # 할 일은 저장될 시트(파티션)별로 묶음
+    by_title = {}
+    for tid, (date_str, row) in tasks.items(): by_title.setdefault(task_sheet_title(date_str), {})[tid] = (date_str, row)
+    sh_m = pool.worksheet("Daily_Master")
+    sheets = {title: pool.ensure_worksheet(title, TASK_SHEET_HEADER) for title in by_title}
+    titles = ["Daily_Master"] + list(by_title)
+    if at is not None:
+        for t in titles: pool.header(t) # 수정시각 열 위치가 필요 (pool 을 비운 직후에만 1행을 따로 읽음)
+    heads = [t for t in titles if t not in pool.headers] # 헤더를 아직 모르는 시트는 같은 읽기에 1행을 끼워 확인
+    stamped = [t for t in titles if at is not None and ROW_STAMP in pool.headers.get(t, ())]
+    stamp_cols = [_col(pool.headers[t].index(ROW_STAMP) + 1) for t in stamped]
+    m_vals, *vals = _read_ranges(pool, ["'Daily_Master'!A:A"] + [f"'{t}'!A:B" for t in by_title] + [f"'{t}'!1:1" for t in heads]
+                                 + [f"'{t}'!{c}:{c}" for t, c in zip(stamped, stamp_cols)])
+    part_vals, head_vals, stamp_vals = vals[:len(by_title)], vals[len(by_title):len(by_title) + len(heads)], vals[len(by_title) + len(heads):]
+    reqs = _header_reqs(pool, {**{t: pool.headers[t] for t in titles if t in pool.headers}, **{t: v[0] for t, v in zip(heads, head_vals) if v}})
+    remote_at = {t: [_stamp(r[0]) if r else 0.0 for r in v] for t, v in zip(stamped, stamp_vals)}
+    newer = lambda title, i, key: i < len(remote_at.get(title, ())) and remote_at[title][i] > stamp(key)
+    stale = set()
+
+    # 1. Daily_Master: 날짜 행이 있으면 수정, 없으면 추가
+    m_idx = {str(r[0]): i for i, r in enumerate(m_vals) if r}
+    m_new = [] if m_vals else [MASTER_SHEET_HEADER]
+    for date_str, row in masters.items():
+        row = _pad(row, len(MASTER_HEADER)) + [stamp(date_str)]
+        if date_str not in m_idx: m_new.append(row)
+        elif newer("Daily_Master", m_idx[date_str], date_str): stale.add(date_str)
+        else: reqs.append(_update_req(sh_m.id, m_idx[date_str], row))
+    if len(m_new) > (0 if m_vals else 1): reqs.append(_append_req(sh_m.id, m_new))
+
+    # 2. 할 일 시트: ID 기준 diff
+    width = len(TASK_HEADER)
+    for (title, changes), d_vals in zip(by_title.items(), part_vals):
+        sheet_id = sheets[title].id
+        stored = {str(r[0]): (i, r) for i, r in enumerate(d_vals) if i > 0 and r and r[0] != ""}
+        inserts = [] if d_vals else [TASK_SHEET_HEADER]
+        removed = set()
+        for tid, (date_str, row) in changes.items():
+            if tid in stored and newer(title, stored[tid][0], tid):
+                stale.add(tid)
+            elif row is None:
+                if tid in stored: removed.add(stored[tid][0])
+            elif tid in stored:
+                old = known.get(tid)
+                if old is None or _norm_row(old, width) != _norm_row(row, width):
+                    reqs.append(_update_req(sheet_id, stored[tid][0], _pad(row, width) + [stamp(tid)]))
+            else: inserts.append(_pad(row, width) + [stamp(tid)])
+        # 삭제는 아래 행부터 (앞쪽 인덱스가 밀리지 않도록)
+        reqs.extend(_delete_req(sheet_id, i) for i in sorted(removed, reverse=True))
+        if len(inserts) > (0 if d_vals else 1): reqs.append(_append_req(sheet_id, inserts))
+
+    # 3. 카테고리별 마지막 할 일 인덱스도 같은 batch 로 (시트에 못 쓴 행은 빼고)
+    ctx = _sheet_context(pool)
+    ctx.apply({tid: c for tid, c in tasks.items() if tid not in stale})
+    if ctx.dirty: reqs += _context_reqs(pool, ctx)
+
+    if reqs: _batch(pool, reqs)
+    return stale
+
+def migrate_task_partitions():
+    """기존 Task_Details 를 월별 시트로 1회 분할 복사. 이미 옮겨진 ID 는 건너뛰고 원본은 그대로 둠"""
+    pool = _pool()
+    if not pool: return 0
+    src = _read_ranges(pool, [_task_range(TASK_SHEET)])[0]
+    by_title = {}
+    for r in src[1:]:
+        if len(r) > 1 and re.match(r"\d{4}-\d{2}", str(r[1])): by_title.setdefault(partition_title(str(r[1])), []).append(r)
+    if not by_title: return 0
+    sheets = {title: pool.ensure_worksheet(title, TASK_SHEET_HEADER) for title in by_title}
+    existing = _read_ranges(pool, [_task_range(t) for t in by_title])
+    moved = 0
+    for (title, rows), ex in zip(by_title.items(), existing):
+        done = {str(r[0]) for r in ex[1:] if r}
+        rows = [r for r in rows if str(r[0]) not in done]
+        if rows:
+            reqs = _header_reqs(pool, {title: ex[0]} if ex else {}) + [_append_req(sheets[title].id, rows)]
+            _batch(pool, reqs)
+            moved += len(rows)
+    get_day_cache().invalidate()
+    return moved
+
+# --- Timer Events ---
+class TimerLog:
+    """TimerEvents 시트의 프로세스 캐시 (Sheets 직접 모드용)
+    처음 한 번 전체를 받고, 이후엔 이 프로세스가 덧붙인 행만 더함. 쓰기는 appendCells 1회"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = None
+
+    def ensure(self, pool):
+        with self.lock:
+            if self.rows is not None: return
+            vals = _read_ranges(pool, [f"'{TIMER_SHEET}'!A2:{_col(len(TIMER_HEADER))}"])[0] if TIMER_SHEET in pool.titles() else []
+            self.rows = [_pad(r, len(TIMER_HEADER)) for r in vals if r and r[0] != ""]
+
+    def events(self, date_from, date_to):
+        with self.lock: return [list(r) for r in self.rows if date_from <= str(r[2]) <= date_to]
+
+    def append(self, pool, rows):
+        _push_timer_events(pool, rows)
+        with self.lock:
+            if self.rows is not None: self.rows.extend(rows)
+
+    def invalidate(self):
+        with self.lock: self.rows = None
+
+@st.cache_resource
+def get_timer_log():
+    return TimerLog()
+
+def _push_timer_events(pool, rows):
+    sh = pool.ensure_worksheet(TIMER_SHEET, TIMER_HEADER)
+    _batch(pool, [_append_req(sh.id, rows)])
+
+def timer_events(date_from, date_to):
+    """[date_from, date_to] 날짜 할 일들의 타이머 이벤트 행"""
+    store = _local()
+    if store: return store.timer_events(date_from, date_to)
+    pool = _pool()
+    if not pool: return []
+    log = get_timer_log()
+    log.ensure(pool)
+    return log.events(date_from, date_to)
+
+def log_timer_event(t, kind, date_str, ts):
+    """시작/정지 이벤트를 한 행 덧붙임 (세션의 당일 이벤트 목록에도)"""
+    row = [str(uuid.uuid4()), str(t['ID']), date_str, kind, round(ts, 3), round(t['accumulated'], 3)]
+    st.session_state.timer_events.append(row)
+    try:
+        store = _local()
+        if store: store.add_timer_events([row])
+        elif _pool(): get_timer_log().append(_pool(), [row])
+    except Exception as e:
+        get_timer_log().invalidate()
+        st.toast(f"⚠️ 타이머 기록 실패: {e}")
+
+def start_timer(t, date_str):
+    t['is_running'] = True; t['last_start'] = time.time()
+    log_timer_event(t, "start", date_str, t['last_start'])
+
+def stop_timer(t, date_str):
+    now = time.time()
+    t['accumulated'] += (now - t['last_start'])
+    t['is_running'] = False
+    log_timer_event(t, "stop", date_str, now)
+
+def restore_timers(tasks, events, until=None):
+    """이벤트로 타이머 상태 복원: 할 일별 마지막 이벤트가 start 면 실행 중이고 누적은 그 start 때의 값
+    (자동 저장된 소요시간에는 그 뒤 흐른 시간이 이미 들어 있어 last_start 부터 다시 세면 두 번 더해짐),
+    stop 이면 그 누적이 저장값보다 클 때만 그 값.
+    until(지난 날짜면 그날 자정 다음 시각)이 있으면 그때까지 안 멈춘 타이머는 until 에 멈춘 것으로 보고, 그런 할 일 목록을 돌려줌 (부른 쪽이 stop 을 기록)"""
+    last, capped = {}, []
+    for r in sorted(events, key=lambda r: float(r[4] or 0)): last[str(r[1])] = r
+    for t in tasks:
+        r = last.get(str(t['ID']))
+        if not r: continue
+        if r[3] == "start" and t.get('상태') != '완료':
+            if until is None:
+                t['accumulated'], t['is_running'], t['last_start'] = float(r[5] or 0), True, float(r[4])
+            else:
+                t['accumulated'] = float(r[5] or 0) + max(0.0, until - float(r[4])) # 자정 뒤에 자동 저장된 시간은 버림
+                capped.append(t)
+        else: t['accumulated'] = max(t['accumulated'], float(r[5] or 0))
+    return capped
+
+# --- Context Index ---
+def _ctx_key(row):
+    return str(row[1]), str(row[2])
+
+class ContextIndex:
+    """카테고리별 날짜마다의 마지막 할 일 (최근 CONTEXT_KEEP 개 날짜). 날짜를 정렬해 두고 bisect 로 'before 이전 마지막 할 일'을 찾음
+    저장되는 행으로 갱신하므로 오늘·내일 일정이 있어도 할 일 시트를 읽지 않음. floor: 오래된 날짜를 버린 경계 (그보다 이전은 모름)
+    인덱스에 든 행이 삭제되거나 날짜·카테고리가 바뀌면 그 카테고리만 stale 로 두고 다음 조회 때 다시 만듦"""
+    def __init__(self, rows=()):
+        self.lock = threading.Lock()
+        self.days, self.floor, self.stale = {}, {}, set() # {카테고리: {날짜: 행}}, {카테고리: 날짜}
+        self.dirty, self.saved_n = False, 0
+        for r in rows:
+            cat = str(r[0])
+            if r[1] == "stale": self.stale.add(cat)
+            elif r[1] == "floor": self.floor[cat] = str(r[3])
+            elif r[1] in ("day", "cur", "prev"): self.days.setdefault(cat, {})[str(r[3])] = list(r[2:])
+            if r[1] == "prev": self.floor[cat] = str(r[3]) # 예전 두 칸(cur/prev) 인덱스: prev 이전 날짜는 모름
+
+    def rows(self):
+        """CONTEXT_HEADER 형태의 행 목록 (시트·로컬 meta 저장용)"""
+        with self.lock:
+            out = [[cat, "day"] + list(days[d]) for cat, days in sorted(self.days.items()) if cat not in self.stale for d in sorted(days)]
+            out += [[cat, "floor", "", f] + [""] * (len(TASK_HEADER) - 2) for cat, f in sorted(self.floor.items()) if cat not in self.stale]
+            return out + [[cat, "stale"] + [""] * len(TASK_HEADER) for cat in sorted(self.stale)]
+
+    def _offer(self, row):
+        cat, d = str(row[3]), str(row[1])
+        if cat in self.floor and d < self.floor[cat]: return
+        days = self.days.setdefault(cat, {})
+        if d not in days or _ctx_key(row) >= _ctx_key(days[d]):
+            if days.get(d) != list(row): days[d] = list(row); self.dirty = True
+        if len(days) > CONTEXT_KEEP:
+            del days[min(days)]
+            self.floor[cat] = min(days)
+
+    def apply(self, tasks):
+        """저장되는 변경분을 반영 (_write_changes 의 tasks)"""
+        with self.lock:
+            for cat, days in self.days.items():
+                for d, r in list(days.items()):
+                    tid = str(r[0])
+                    if tid in tasks:
+                        new = tasks[tid][1]
+                        if new is None or _ctx_key(new) != _ctx_key(r) or str(new[3]) != cat: self.stale.add(cat)
+                        elif list(new) != r: days[d] = list(new); self.dirty = True
+            for tid, (date_str, row) in tasks.items():
+                if row is not None and str(row[3]) not in self.stale: self._offer(row)
+            if self.stale: self.dirty = True
+
+    def rebuild(self, category, rows):
+        """category(None 이면 전체)의 인덱스를 rows 로 다시 만듦"""
+        with self.lock:
+            if category is None: self.days.clear(); self.floor.clear(); self.stale.clear()
+            else: self.days.pop(category, None); self.floor.pop(category, None); self.stale.discard(category)
+            for r in rows:
+                if category is None or str(r[3]) == category: self._offer(r)
+            self.dirty = True
+
+    def lookup(self, category, before):
+        """(답할 수 있는지, before 날짜 이전의 마지막 행 또는 None)"""
+        with self.lock:
+            if category in self.stale: return False, None
+            days = self.days.get(category, {})
+            dates = sorted(days)
+            i = bisect.bisect_left(dates, before)
+            if i: return True, list(days[dates[i - 1]])
+            # 남은 날짜가 모두 before 이후(미래 일정)면 floor 아래를 알 수 없음
+            return category not in self.floor, None
+
+def _context_lookup(ctx, category, before, scan):
+    """인덱스로 찾고, 답할 수 없으면 scan(category) 로 그 카테고리 행을 받아 인덱스를 다시 만든 뒤 다시 찾음
+    (before 이후 일정만 CONTEXT_KEEP 일보다 많은 드문 경우엔 받은 행에서 바로 계산)"""
+    ok, row = ctx.lookup(category, before)
+    if ok: return row
+    rows = scan(category)
+    ctx.rebuild(category, rows)
+    ok, row = ctx.lookup(category, before)
+    if ok: return row
+    past = [r for r in rows if str(r[1]) < before]
+    return max(past, key=_ctx_key) if past else None
+
+def _sheet_task_rows(pool, category=None):
+    cols = _sheet_columns(pool, sorted(task_sheet_titles(pool)), TASK_HEADER)
+    return [list(r) for r in zip(*(cols[c] for c in TASK_HEADER)) if category is None or r[3] == category]
+
+def _sheet_context(pool):
+    """Context 시트의 인덱스 (프로세스당 1회 읽음). 시트가 없으면 할 일 전체로 만들고 다음 저장 때 함께 기록"""
+    if pool.context is None:
+        if CONTEXT_SHEET in pool.titles():
+            vals = _read_ranges(pool, [f"'{CONTEXT_SHEET}'"])[0] # 열 끝 없이 (예전 폭의 시트도 범위 오류 없게)
+            ctx = ContextIndex([_pad(r, len(CONTEXT_HEADER)) for r in vals[1:]])
+            ctx.saved_n = len(vals)
+        else:
+            ctx = ContextIndex()
+            ctx.rebuild(None, _sheet_task_rows(pool))
+        pool.context = ctx
+    return pool.context
+
+def _context_reqs(pool, ctx):
+    """Context 시트를 인덱스로 통째로 덮어쓰는 요청 (카테고리 수의 두 배 남짓한 행)"""
+    sh = pool.ensure_worksheet(CONTEXT_SHEET, CONTEXT_HEADER)
+    rows = [CONTEXT_HEADER] + ctx.rows()
+    reqs = [_update_rows_req(sh.id, 0, rows)]
+    if pool.headers.get(CONTEXT_SHEET) != CONTEXT_HEADER: # 할 일 열이 늘기 전에 만든 시트면 격자부터 넓힘 (프로세스당 1회 확인)
+        if sh.col_count < len(CONTEXT_HEADER):
+            reqs.insert(0, {"appendDimension": {"sheetId": sh.id, "dimension": "COLUMNS", "length": len(CONTEXT_HEADER) - sh.col_count}})
+        pool.headers[CONTEXT_SHEET] = list(CONTEXT_HEADER)
+    if ctx.saved_n > len(rows): reqs.append(_delete_req(sh.id, len(rows), ctx.saved_n))
+    ctx.saved_n, ctx.dirty = len(rows), False
+    return reqs
+
+# --- Autosave ---
+class AutoSaver:
+    """세션의 편집을 모아 백그라운드 스레드에서 일괄 저장
+    같은 행(ID / 날짜)의 반복 수정은 마지막 값 하나로 합치고,
+    AUTOSAVE_INTERVAL_SEC 마다 또는 대기 건수가 AUTOSAVE_MAX_PENDING 에 닿으면 flush"""
+    def __init__(self, sink, interval):
+        self.sink, self.interval = sink, interval
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock() # 스레드와 flush(wait=True) 가 겹쳐도 쓰기 순서 유지
+        self.wake = threading.Event()
+        self.tasks, self.masters = {}, {}
+        self.last_flush, self.last_error = None, None
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit_task(self, task_id, date_str, row):
+        with self.lock: self.tasks[task_id] = (date_str, row)
+        self._check_size()
+
+    def submit_master(self, date_str, row):
+        with self.lock: self.masters[date_str] = row
+        self._check_size()
+
+    def _check_size(self):
+        if self.pending() >= AUTOSAVE_MAX_PENDING: self.wake.set()
+
+    def pending(self):
+        with self.lock: return len(self.tasks) + len(self.masters)
+
+    def flush(self, wait=False):
+        """wait=True 면 지금 쓰고 결과를 돌려줌 (대기분이 모두 저장됐으면 True, 실패분은 다음 주기에 재시도)"""
+        if wait: return self._flush_now()
+        self.wake.set()
+
+    def _run(self):
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self._flush_now()
+
+    def _flush_now(self):
+        with self.flush_lock:
+            with self.lock:
+                tasks, masters = self.tasks, self.masters
+                self.tasks, self.masters = {}, {}
+            if not tasks and not masters: return True
+            try:
+                self.sink(tasks, masters)
+                self.last_flush, self.last_error = datetime.datetime.now(), None
+                return True
+            except Exception as e:
+                # 실패분은 되돌려 다음 주기에 재시도 (그 사이 들어온 더 새로운 값은 유지)
+                with self.lock:
+                    for k, v in tasks.items(): self.tasks.setdefault(k, v)
+                    for k, v in masters.items(): self.masters.setdefault(k, v)
+                self.last_error = str(e)
+                return False
+
+def _sheets_sink(pool, cache):
+    def sink(tasks, masters):
+        try: _write_changes(pool, tasks, masters, known=cache.stored(tasks))
+        except Exception: pool.invalidate(); raise
+        cache.apply(tasks, masters)
+    return sink
+
+@st.cache_resource
+def get_autosaver():
+    # 로컬 저널이 있으면 거기에 바로 쓰고 (Sheets 반영은 SyncEngine 몫), 없으면 Sheets 로 직접
+    store = get_local_store()
+    if store: return AutoSaver(store.write_changes, 1)
+    pool = _pool()
+    return AutoSaver(_sheets_sink(pool, get_day_cache()), AUTOSAVE_INTERVAL_SEC) if pool else None
+
+def queue_autosave(date_str):
+    """직전 스냅샷과 비교해 바뀐 행만 자동 저장 큐에 넣음"""
+    saver = get_autosaver()
+    if not saver: return
+    rows = {str(t['ID']): task_to_row(t, date_str) for t in st.session_state.tasks}
+    synced = st.session_state.synced_rows
+    for tid, row in rows.items():
+        if synced.get(tid) != row: saver.submit_task(tid, date_str, row)
+    for tid in synced.keys() - rows.keys(): saver.submit_task(tid, date_str, None)
+    m_row = master_to_row(date_str, st.session_state.master)
+    if st.session_state.synced_master != m_row: saver.submit_master(date_str, m_row)
+    st.session_state.synced_rows, st.session_state.synced_master = rows, m_row
+
+# --- Local Journal & Sync ---
+class LocalStore:
+    """로컬 SQLite(WAL) 저널. 앱의 읽기/쓰기 기준이며 바뀐 행은 dirty 로 남아 SyncEngine 이 Sheets 로 올림
+    행은 시트와 같은 순서의 JSON 배열로 저장 (tasks: TASK_HEADER, masters: MASTER_HEADER, templates: TEMPLATE_HEADER)"""
+    def __init__(self, path):
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (id TEXT PRIMARY KEY, date TEXT, row TEXT, updated_at REAL, dirty INTEGER DEFAULT 0, deleted INTEGER DEFAULT 0);
+            CREATE INDEX IF NOT EXISTS tasks_date ON tasks(date);
+            CREATE TABLE IF NOT EXISTS masters (date TEXT PRIMARY KEY, row TEXT, updated_at REAL, dirty INTEGER DEFAULT 0);
+            CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT, updated_at REAL, dirty INTEGER DEFAULT 0);
+            CREATE TABLE IF NOT EXISTS templates (pos INTEGER PRIMARY KEY, row TEXT);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS items (kind TEXT, id TEXT, row TEXT, updated_at REAL, dirty INTEGER DEFAULT 0, deleted INTEGER DEFAULT 0, PRIMARY KEY (kind, id));
+            CREATE TABLE IF NOT EXISTS chat (id INTEGER PRIMARY KEY AUTOINCREMENT, row TEXT);
+            CREATE TABLE IF NOT EXISTS timer_events (id TEXT PRIMARY KEY, date TEXT, ts REAL, row TEXT, dirty INTEGER DEFAULT 0);
+            CREATE INDEX IF NOT EXISTS timer_events_date ON timer_events(date);
+        """)
+        if self.meta("task_width") != str(len(TASK_HEADER)):
+            # 예전 폭(마감시간·중요도 없음)으로 저장된 할 일 행을 빈 값으로 늘림 (시트에서 받은 행과 같은 폭이라야 비교·내보내기가 맞음)
+            while self._q("SELECT 1 FROM tasks WHERE json_array_length(row) < ? LIMIT 1", (len(TASK_HEADER),)):
+                self._q("UPDATE tasks SET row = json_insert(row, '$[#]', '') WHERE json_array_length(row) < ?", (len(TASK_HEADER),))
+            self.set_meta("task_width", len(TASK_HEADER))
+        self.templates_version = 0
+        self.settings_version = 0
+        self.items_version = {} # 종류별 (Inbox / Goals)
+        self.changes = ChangeLog() # 할 일·마스터가 바뀐 날짜 (집계 캐시용)
+        self.context = None
+
+    def _q(self, sql, args=()):
+        with self.lock: return self.db.execute(sql, args).fetchall()
+
+    def _tx(self, fn):
+        with self.lock:
+            self.db.execute("BEGIN")
+            try: fn(self.db); self.db.execute("COMMIT")
+            except: self.db.execute("ROLLBACK"); raise
+
+    def meta(self, key, default=None):
+        r = self._q("SELECT value FROM meta WHERE key=?", (key,))
+        return r[0][0] if r else default
+
+    def set_meta(self, key, value):
+        self._q("INSERT INTO meta VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value", (key, str(value)))
+
+    # --- 할 일 / 마스터 ---
+    def range(self, date_from, date_to):
+        """구간의 ({날짜: 마스터}, {날짜: [할 일]}) — 행은 헤더를 키로 한 dict"""
+        ms = self._q("SELECT date, row FROM masters WHERE date BETWEEN ? AND ?", (date_from, date_to))
+        rows = self._q("SELECT date, row FROM tasks WHERE date BETWEEN ? AND ? AND deleted=0 ORDER BY date, rowid",
+                       (date_from, date_to))
+        tasks = {}
+        for d, r in rows: tasks.setdefault(d, []).append(dict(zip(TASK_HEADER, json.loads(r))))
+        return {d: dict(zip(MASTER_HEADER, json.loads(r))) for d, r in ms}, tasks
+
+    def master_rows(self):
+        return [json.loads(r[0]) for r in self._q("SELECT row FROM masters ORDER BY date")]
+
+    def write_changes(self, tasks, masters):
+        """_write_changes 와 같은 인자를 로컬에 기록하고 dirty 표시 (내용이 같은 행은 건드리지 않음)"""
+        now = time.time()
+        def run(db):
+            for tid, (date_str, row) in tasks.items():
+                if row is None:
+                    db.execute("UPDATE tasks SET deleted=1, dirty=1, updated_at=? WHERE id=? AND deleted=0", (now, tid))
+                else:
+                    db.execute("""INSERT INTO tasks (id, date, row, updated_at, dirty) VALUES (?, ?, ?, ?, 1)
+                                  ON CONFLICT(id) DO UPDATE SET date=excluded.date, row=excluded.row, updated_at=excluded.updated_at, dirty=1, deleted=0
+                                  WHERE tasks.row != excluded.row OR tasks.deleted=1""", (tid, date_str, json.dumps(row, ensure_ascii=False), now))
+            for date_str, row in masters.items():
+                db.execute("""INSERT INTO masters VALUES (?, ?, ?, 1)
+                              ON CONFLICT(date) DO UPDATE SET row=excluded.row, updated_at=excluded.updated_at, dirty=1
+                              WHERE masters.row != excluded.row""", (date_str, json.dumps(row, ensure_ascii=False), now))
+            self._update_context(tasks)
+        self._tx(run)
+        self.changes.touch({d for d, _ in tasks.values()} | set(masters))
+
+    def pending(self):
+        """올릴 변경분: (tasks, masters, stamps) — stamps 는 mark_clean 에 넘겨 그 사이 다시 바뀐 행을 걸러냄"""
+        tasks, masters, stamps = {}, {}, []
+        for tid, date_str, row, ts, deleted in self._q("SELECT id, date, row, updated_at, deleted FROM tasks WHERE dirty=1"):
+            tasks[tid] = (date_str, None if deleted else json.loads(row)); stamps.append(("tasks", "id", tid, ts))
+        for date_str, row, ts in self._q("SELECT date, row, updated_at FROM masters WHERE dirty=1"):
+            masters[date_str] = json.loads(row); stamps.append(("masters", "date", date_str, ts))
+        return tasks, masters, stamps
+
+    def pending_count(self):
+        return sum(self._q(f"SELECT COUNT(*) FROM {t} WHERE dirty=1")[0][0] for t in ("tasks", "masters", "settings"))
+
+    def mark_clean(self, stamps):
+        def run(db):
+            for table, key, val, ts in stamps:
+                db.execute(f"UPDATE {table} SET dirty=0 WHERE {key}=? AND updated_at=?", (val, ts))
+            db.execute("DELETE FROM tasks WHERE deleted=1 AND dirty=0")
+        self._tx(run)
+
+    def merge_remote(self, task_rows, master_rows, in_scope):
+        """시트에서 받은 행(맨 뒤가 ROW_STAMP)을 ID(마스터는 날짜) 기준 last-writer-wins 로 병합.
+        로컬 dirty 행은 시트 쪽 수정시각이 더 늦을 때만 시트 값으로 바뀌고(dirty 해제), 아니면 남아서 다음 push 가 올림. 깨끗한 행은 시트를 따름.
+        in_scope(날짜) 인 깨끗한 로컬 행이 시트에 없으면 시트에서 지워진 것으로 보고 삭제 (지운 쪽은 시각이 없어 로컬 dirty 행이 이김)"""
+        now = time.time()
+        touched = set()
+        tw, mw = len(TASK_HEADER), len(MASTER_HEADER)
+        def run(db):
+            dirty = dict(db.execute("SELECT id, updated_at FROM tasks WHERE dirty=1"))
+            remote = {str(r[0]): (r[:tw], _stamp(r[tw]) if len(r) > tw else 0.0) for r in task_rows if r and r[0] != ""}
+            remote = {tid: (r, ts) for tid, (r, ts) in remote.items() if tid not in dirty or ts > (dirty[tid] or 0)}
+            # 내용이 실제로 달라지는 날짜만 모음 (집계 캐시가 그 날들만 다시 계산)
+            local = {tid: (d, row) for tid, d, row in db.execute("SELECT id, date, row FROM tasks")}
+            for tid, (r, _) in remote.items():
+                old = local.get(tid)
+                if old is None or tid in dirty or old[1] != json.dumps(r, ensure_ascii=False):
+                    touched.add(str(r[1]))
+                    if old: touched.add(old[0])
+            dirty_m = dict(db.execute("SELECT date, updated_at FROM masters WHERE dirty=1"))
+            local_m = dict(db.execute("SELECT date, row FROM masters"))
+            remote_m = {str(r[0]): (r[:mw], _stamp(r[mw]) if len(r) > mw else 0.0) for r in master_rows if r and r[0] != ""}
+            remote_m = {d: (r, ts) for d, (r, ts) in remote_m.items() if d not in dirty_m or ts > (dirty_m[d] or 0)}
+            touched.update(d for d, (r, _) in remote_m.items() if d in dirty_m or local_m.get(d) != json.dumps(r, ensure_ascii=False))
+            db.executemany("""INSERT INTO tasks (id, date, row, updated_at, dirty) VALUES (?, ?, ?, ?, 0)
+                              ON CONFLICT(id) DO UPDATE SET date=excluded.date, row=excluded.row, updated_at=excluded.updated_at, dirty=0, deleted=0
+                              WHERE tasks.dirty=1 OR tasks.row != excluded.row""",
+                           [(tid, str(r[1]), json.dumps(r, ensure_ascii=False), ts or now) for tid, (r, ts) in remote.items()])
+            gone = [(tid,) for tid, d in db.execute("SELECT id, date FROM tasks WHERE dirty=0") if tid not in remote and in_scope(d)]
+            touched.update(local[tid][0] for tid, in gone)
+            db.executemany("DELETE FROM tasks WHERE id=?", gone)
+            changes = {tid: (str(r[1]), r) for tid, (r, _) in remote.items()}
+            changes.update((tid, ("", None)) for tid, in gone)
+            self._update_context(changes)
+            db.executemany("""INSERT INTO masters VALUES (?, ?, ?, 0)
+                              ON CONFLICT(date) DO UPDATE SET row=excluded.row, updated_at=excluded.updated_at, dirty=0
+                              WHERE masters.dirty=1 OR masters.row != excluded.row""",
+                           [(d, json.dumps(r, ensure_ascii=False), ts or now) for d, (r, ts) in remote_m.items()])
+        self._tx(run)
+        if touched: self.changes.touch(touched)
+
+    def columns(self, kind, columns, date_from=None, date_to=None):
+        """read_columns 의 로컬 버전: 필요한 열만 json_extract 로 꺼냄"""
+        table, head = ("tasks", TASK_HEADER) if kind == "tasks" else ("masters", MASTER_HEADER)
+        sel = ", ".join(f"json_extract(row, '$[{head.index(c)}]')" for c in columns)
+        where, args = (["deleted=0"] if table == "tasks" else ["1=1"]), []
+        if date_from: where.append("date >= ?"); args.append(date_from)
+        if date_to: where.append("date <= ?"); args.append(date_to)
+        rows = self._q(f"SELECT {sel} FROM {table} WHERE {' AND '.join(where)} ORDER BY date, rowid", args)
+        return {c: tuple("" if r[i] is None else r[i] for r in rows) for i, c in enumerate(columns)}
+
+    # --- 카테고리별 마지막 할 일 (ContextIndex 를 meta 에 보관) ---
+    def _context_index(self):
+        with self.lock:
+            if self.context is None:
+                saved = self.meta("context_index")
+                if saved: self.context = ContextIndex(json.loads(saved))
+                else:
+                    self.context = ContextIndex()
+                    self.context.rebuild(None, self.category_rows())
+            return self.context
+
+    def _save_context(self):
+        if self.context.dirty:
+            self.set_meta("context_index", json.dumps(self.context.rows(), ensure_ascii=False))
+            self.context.dirty = False
+
+    def _update_context(self, tasks):
+        self._context_index().apply(tasks)
+        self._save_context()
+
+    def category_rows(self, category=None):
+        sql, args = "SELECT row FROM tasks WHERE deleted=0", ()
+        if category: sql, args = sql + " AND json_extract(row, '$[3]') = ?", (category,)
+        return [json.loads(r[0]) for r in self._q(sql, args)]
+
+    def last_task(self, category, before):
+        with self.lock:
+            row = _context_lookup(self._context_index(), category, before, self.category_rows)
+            self._save_context()
+            return row
+
+    # --- 설정 ---
+    def settings(self):
+        return dict(self._q("SELECT key, value FROM settings"))
+
+    def set_settings(self, items):
+        now = time.time()
+        def run(db):
+            db.executemany("""INSERT INTO settings VALUES (?, ?, ?, 1)
+                              ON CONFLICT(key) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at, dirty=1""",
+                           [(k, v, now) for k, v in items.items()])
+        self._tx(run)
+        self.settings_version += 1
+
+    def pending_settings(self):
+        return {k: (v, ts) for k, v, ts in self._q("SELECT key, value, updated_at FROM settings WHERE dirty=1")}
+
+    def mark_settings_clean(self, pending):
+        for k, (v, ts) in pending.items(): self._q("UPDATE settings SET dirty=0 WHERE key=? AND updated_at=?", (k, ts))
+
+    def merge_remote_settings(self, items):
+        def run(db):
+            db.executemany("""INSERT INTO settings VALUES (?, ?, ?, 0)
+                              ON CONFLICT(key) DO UPDATE SET value=excluded.value WHERE settings.dirty=0""",
+                           [(k, v, time.time()) for k, v in items.items()])
+        self._tx(run)
+        self.settings_version += 1
+
+    # --- Inbox / Goals (한 행 = 한 항목) ---
+    def _bump_items(self, kind):
+        self.items_version[kind] = self.items_version.get(kind, 0) + 1
+
+    def migrate_items(self, kind, legacy, has_sheet):
+        """예전 Settings 목록을 1회 옮김. 시트(Inbox/Goals)가 이미 있으면 다른 기기가 옮긴 뒤라 시트를 따름 (pull 이 받아 옴)
+        has_sheet() 가 실패하면(오프라인 등) 아무것도 하지 않고 다음에 다시 확인"""
+        if self.meta(f"items_{kind}") == "1": return
+        try: remote = has_sheet()
+        except Exception: return
+        with self.lock:
+            if not remote and not self._q("SELECT 1 FROM items WHERE kind=? LIMIT 1", (kind,)):
+                now = time.time()
+                self._tx(lambda db: db.executemany("INSERT OR IGNORE INTO items VALUES (?, ?, ?, ?, 1, 0)",
+                                                   [(kind, r[0], json.dumps(r, ensure_ascii=False), now) for r in legacy()]))
+                self._bump_items(kind)
+            self.set_meta(f"items_{kind}", "1")
+
+    def item_count(self, kind):
+        return self._q("SELECT COUNT(*) FROM items WHERE kind=? AND deleted=0", (kind,))[0][0]
+
+    def item_page(self, kind, offset=0, limit=None):
+        rows = self._q("SELECT row FROM items WHERE kind=? AND deleted=0 ORDER BY rowid LIMIT ? OFFSET ?", (kind, -1 if limit is None else limit, offset))
+        return [json.loads(r[0]) for r in rows]
+
+    def add_item(self, kind, row):
+        self._q("INSERT INTO items VALUES (?, ?, ?, ?, 1, 0)", (kind, row[0], json.dumps(row, ensure_ascii=False), time.time()))
+        self._bump_items(kind)
+
+    def delete_item(self, kind, item_id):
+        self._q("UPDATE items SET deleted=1, dirty=1, updated_at=? WHERE kind=? AND id=?", (time.time(), kind, item_id))
+        self._bump_items(kind)
+
+    def pending_items(self):
+        """{종류: (추가할 행 목록, 지울 ID 집합, stamps)}"""
+        out = {}
+        for kind, tid, row, ts, deleted in self._q("SELECT kind, id, row, updated_at, deleted FROM items WHERE dirty=1 ORDER BY rowid"):
+            adds, dels, stamps = out.setdefault(kind, ([], set(), []))
+            if deleted: dels.add(tid)
+            else: adds.append(json.loads(row))
+            stamps.append((kind, tid, ts))
+        return out
+
+    def mark_items_clean(self, stamps):
+        def run(db):
+            db.executemany("UPDATE items SET dirty=0 WHERE kind=? AND id=? AND updated_at=?", stamps)
+            db.execute("DELETE FROM items WHERE deleted=1 AND dirty=0")
+        self._tx(run)
+
+    def merge_remote_items(self, kind, rows):
+        """시트의 항목으로 맞춤. 아직 안 올라간 로컬 추가·삭제는 유지"""
+        now = time.time()
+        remote = {str(r[0]): r for r in rows if r and r[0] != ""}
+        def run(db):
+            gone = [(kind, tid) for tid, in db.execute("SELECT id FROM items WHERE kind=? AND dirty=0", (kind,)) if tid not in remote]
+            db.executemany("""INSERT INTO items VALUES (?, ?, ?, ?, 0, 0)
+                              ON CONFLICT(kind, id) DO UPDATE SET row=excluded.row WHERE items.dirty=0 AND items.row != excluded.row""",
+                           [(kind, tid, json.dumps(r, ensure_ascii=False), now) for tid, r in remote.items()])
+            db.executemany("DELETE FROM items WHERE kind=? AND id=?", gone)
+        with self.lock:
+            before = self.db.total_changes
+            self._tx(run)
+            if self.db.total_changes != before: self._bump_items(kind)
+
+    # --- 백업 ---
+    def table_pages(self, name, page_rows):
+        """백업 표(BACKUP_TABLES)의 행을 page_rows 개씩 (keyset 페이지라 뒤로 갈수록 느려지지 않음)"""
+        sql = {"Task_Details": "SELECT rowid, row FROM tasks WHERE deleted=0 AND rowid > ? ORDER BY rowid LIMIT ?",
+               "Daily_Master": "SELECT rowid, row FROM masters WHERE rowid > ? ORDER BY rowid LIMIT ?",
+               "Templates": "SELECT pos, row FROM templates WHERE pos > ? ORDER BY pos LIMIT ?",
+               "Settings": "SELECT rowid, json_array(key, value) FROM settings WHERE rowid > ? ORDER BY rowid LIMIT ?"}[name]
+        last = -1
+        while True:
+            rows = self._q(sql, (last, page_rows))
+            if not rows: return
+            yield [json.loads(r) for _, r in rows]
+            last = rows[-1][0]
+
+    def keys(self, name):
+        """가져오기 중복 판단용 기존 키 (할 일: ID, 마스터: 날짜, 설정: 키, 템플릿: 행 전체)"""
+        if name == "Task_Details": return {r[0] for r in self._q("SELECT id FROM tasks WHERE deleted=0")}
+        if name == "Daily_Master": return {r[0] for r in self._q("SELECT date FROM masters")}
+        if name == "Settings": return set(self.settings())
+        return {tuple(map(str, r)) for r in self.templates()}
+
+    # --- AI Coach 대화 (Sheets 로는 안 올림) ---
+    def chat_append(self, msg):
+        with self.lock:
+            cur = self.db.execute("INSERT INTO chat (row) VALUES (?)", (json.dumps(_chat_pack(msg), ensure_ascii=False),))
+            self.db.execute("DELETE FROM chat WHERE id <= ?", (cur.lastrowid - COACH_HISTORY_KEEP,))
+            return cur.lastrowid
+
+    def chat_page(self, limit, before=None):
+        rows = self._q("SELECT id, row FROM chat WHERE id < ? ORDER BY id DESC LIMIT ?", (before or 2 ** 62, limit))
+        return [(i, _chat_unpack(json.loads(r))) for i, r in reversed(rows)]
+
+    # --- 타이머 이벤트 (append-only) ---
+    def add_timer_events(self, rows, dirty=True):
+        """이벤트 행 추가 (이미 있는 ID 는 무시)"""
+        self._tx(lambda db: db.executemany("INSERT OR IGNORE INTO timer_events VALUES (?, ?, ?, ?, ?)",
+                                           [(str(r[0]), str(r[2]), float(r[4] or 0), json.dumps(r, ensure_ascii=False), int(dirty)) for r in rows]))
+
+    def timer_events(self, date_from, date_to):
+        rows = self._q("SELECT row FROM timer_events WHERE date BETWEEN ? AND ? ORDER BY ts", (date_from, date_to))
+        return [json.loads(r[0]) for r in rows]
+
+    def pending_timer_events(self):
+        return [json.loads(r[0]) for r in self._q("SELECT row FROM timer_events WHERE dirty=1 ORDER BY ts")]
+
+    def mark_timer_events_clean(self, rows):
+        self._tx(lambda db: db.executemany("UPDATE timer_events SET dirty=0 WHERE id=?", [(str(r[0]),) for r in rows]))
+
+    # --- 템플릿 (표 전체가 한 단위) ---
+    def templates(self):
+        return [json.loads(r[0]) for r in self._q("SELECT row FROM templates ORDER BY pos")]
+
+    def replace_templates(self, rows, dirty=True):
+        def run(db):
+            db.execute("DELETE FROM templates")
+            db.executemany("INSERT INTO templates VALUES (?, ?)", [(i, json.dumps(r, ensure_ascii=False)) for i, r in enumerate(rows)])
+        with self.lock:
+            if not dirty and self.meta("templates_dirty") == "1": return # 로컬 수정이 아직 안 올라감
+            self._tx(run)
+            if dirty: self.set_meta("templates_dirty", "1")
+            self.templates_version += 1
+
+def _push_settings(pool, items, index=None):
+    """설정 여러 키를 batch_update 1회로 기록. index({키: 행 위치})를 모르면 A열을 먼저 1회 읽음. 갱신된 index 를 돌려줌"""
+    sh = pool.worksheet("Settings")
+    if index is None: index = {str(r[0]): i for i, r in enumerate(_read_ranges(pool, ["'Settings'!A:A"])[0]) if r and r[0] != ""}
+    reqs, new = [], ([] if index else [["Key", "Value"]])
+    for k, v in items.items():
+        if k in index: reqs.append(_update_req(sh.id, index[k], [k, v]))
+        else: new.append([k, v])
+    if new: reqs.append(_append_req(sh.id, new))
+    if reqs: _batch(pool, reqs)
+    n = max(index.values(), default=-1) + 1
+    return {**index, **{r[0]: n + j for j, r in enumerate(new)}}
+
+def _push_items(pool, kind, adds, dels):
+    """로컬에서 추가·삭제된 항목을 읽기 1회(ID 열) + batch_update 1회로 반영"""
+    title, header, _, _ = ITEM_SHEETS[kind]
+    sh = pool.ensure_worksheet(title, header)
+    ids = [str(r[0]) if r else "" for r in _read_ranges(pool, [f"'{title}'!A:A"])[0]]
+    reqs = [_delete_req(sh.id, i) for i in sorted((i for i, tid in enumerate(ids) if i > 0 and tid in dels), reverse=True)]
+    new = [r for r in adds if r[0] not in ids]
+    if new: reqs.append(_append_req(sh.id, new))
+    if reqs: _batch(pool, reqs)
+
+def _push_templates(pool, rows):
+    """Templates 시트를 로컬 목록으로 통째로 덮어씀 (남는 아래 행은 삭제)"""
+    sh = pool.worksheet("Templates")
+    n_remote = len(_read_ranges(pool, ["'Templates'!A:A"])[0])
+    reqs = [_update_rows_req(sh.id, 0, [TEMPLATE_HEADER] + rows)]
+    if n_remote > len(rows) + 1: reqs.append(_delete_req(sh.id, len(rows) + 1, n_remote))
+    _batch(pool, reqs)
+
+class SyncEngine:
+    """LocalStore ↔ Sheets 백그라운드 동기화
+    SYNC_INTERVAL_SEC 마다 dirty 행을 올리고(push), SYNC_PULL_SEC 마다 시트를 받아 병합(pull).
+    할 일·마스터 충돌은 ID(마스터는 날짜) 기준 last-writer-wins: 행마다 시트의 ROW_STAMP 열과 로컬 updated_at 을 비교해 늦게 고친 쪽을 남김
+    (push 는 시트 쪽이 더 늦은 행을 덮어쓰지 않고, pull 이 그 행을 받아 로컬 수정을 버림). 설정·Inbox/Goals 는 아직 안 올라간 로컬 변경이 이김.
+    시트에서 사라진 깨끗한 행은 로컬에서도 지움"""
+    def __init__(self, store, pool):
+        self.store, self.pool = store, pool
+        self.lock = threading.Lock() # push/pull 직렬화
+        self.wake = threading.Event()
+        self.want_pull, self.initial_tried = False, False
+        self.initial_lock = threading.Lock() # 첫 화면의 동시 로드가 빈 저널을 읽지 않도록 최초 sync 가 끝날 때까지 기다리게 함
+        self.last_sync, self.last_error = None, None
+        self.settings_index = None # Settings 시트의 {키: 행 위치} (pull 때마다 새로 받음)
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def flush(self, pull=False):
+        self.want_pull = self.want_pull or pull
+        self.wake.set()
+
+    def ensure_initial(self):
+        """로컬이 비어 있으면 최초 1회 전체를 받아 옴 (프로세스당 한 번만 시도, 실패하면 백그라운드에서 재시도)"""
+        with self.initial_lock:
+            if self.initial_tried: return
+            self.initial_tried = True
+            self.sync(full=True)
+
+    def _run(self):
+        while True:
+            self.wake.wait(SYNC_INTERVAL_SEC)
+            self.wake.clear()
+            self.sync()
+
+    def sync(self, full=False):
+        with self.lock:
+            try:
+                lost = self.push()
+                last_pull = float(self.store.meta("last_pull", 0))
+                if full or lost or self.want_pull or not last_pull or time.time() - last_pull > SYNC_PULL_SEC:
+                    self.want_pull = False
+                    self.pull(full=full or lost or not last_pull)
+                self.last_sync, self.last_error = datetime.datetime.now(), None
+            except Exception as e:
+                self.last_error = str(e)
+                self.settings_index = None
+                self.pool.invalidate()
+
+    def push(self):
+        """dirty 행을 올림. 시트 쪽이 더 늦게 고친 행이 있어 못 올렸으면 True (이어서 전체 pull 로 받아 감)"""
+        tasks, masters, stamps = self.store.pending()
+        stale = set()
+        if tasks or masters:
+            stale = _write_changes(self.pool, tasks, masters, at={key: ts for _, _, key, ts in stamps})
+            self.store.mark_clean([s for s in stamps if s[2] not in stale])
+        settings = self.store.pending_settings()
+        if settings:
+            self.settings_index = _push_settings(self.pool, {k: v for k, (v, ts) in settings.items()}, self.settings_index)
+            self.store.mark_settings_clean(settings)
+        for kind, (adds, dels, stamps) in self.store.pending_items().items():
+            _push_items(self.pool, kind, adds, dels)
+            self.store.mark_items_clean(stamps)
+        events = self.store.pending_timer_events()
+        if events:
+            _push_timer_events(self.pool, events)
+            self.store.mark_timer_events_clean(events)
+        if self.store.meta("templates_dirty") == "1":
+            version = self.store.templates_version
+            _push_templates(self.pool, self.store.templates())
+            if version == self.store.templates_version: self.store.set_meta("templates_dirty", "0")
+        return bool(stale)
+
+    def pull(self, full=False):
+        # 월별 분할이면 평소엔 최근 두 파티션만, 처음엔 전체
+        titles = task_sheet_titles(self.pool)
+        if TASK_PARTITIONING and not full: titles = titles[:2]
+        # Inbox / Goals 는 시트가 생긴 뒤에만 (처음 옮기는 건 push 몫)
+        kinds = [k for k, (title, header, _, _) in ITEM_SHEETS.items() if title in self.pool.titles()]
+        # 타이머 이벤트는 append-only 라 지난번에 받은 행 다음부터만
+        timer_from = max(int(self.store.meta("timer_rows", 1)), 1) + 1 if TIMER_SHEET in self.pool.titles() else None
+        timer_rng = [f"'{TIMER_SHEET}'!A{timer_from}:{_col(len(TIMER_HEADER))}"] if timer_from else []
+        m_vals, s_vals, t_vals, *rest = _read_ranges(self.pool, [
+            "'Daily_Master'", "'Settings'!A:B",
+            f"'Templates'!A:{_col(len(TEMPLATE_HEADER))}"]
+            + [f"'{ITEM_SHEETS[k][0]}'!A:{_col(len(ITEM_SHEETS[k][1]))}" for k in kinds] + timer_rng + [_task_range(t) for t in titles])
+        item_vals, rest = rest[:len(kinds)], rest[len(kinds):]
+        timer_vals, parts = (rest[0], rest[1:]) if timer_from else (None, rest)
+        for k, vals in zip(kinds, item_vals):
+            self.store.merge_remote_items(k, [_pad(r, len(ITEM_SHEETS[k][1])) for r in vals[1:]])
+        if timer_vals:
+            self.store.add_timer_events([_pad(r, len(TIMER_HEADER)) for r in timer_vals if r and r[0] != ""], dirty=False)
+            self.store.set_meta("timer_rows", timer_from - 1 + len(timer_vals))
+        heads = {t: p[0] for t, p in zip(["Daily_Master"] + titles, [m_vals] + parts) if p}
+        if (reqs := _header_reqs(self.pool, heads)):
+            _batch(self.pool, reqs)
+        in_scope = (lambda d: True) if not TASK_PARTITIONING else (lambda d: task_sheet_title(d) in titles)
+        self.store.merge_remote([_pad(r, len(TASK_SHEET_HEADER)) for p in parts for r in p[1:]],
+                                [_pad(r, len(MASTER_SHEET_HEADER)) for r in m_vals[1:]], in_scope)
+        self.store.merge_remote_settings({str(r[0]): str(r[1]) for r in s_vals[1:] if len(r) > 1 and r[0] != ""})
+        self.settings_index = {str(r[0]): i for i, r in enumerate(s_vals) if r and r[0] != ""}
+        rows = [_pad(r, len(TEMPLATE_HEADER)) for r in t_vals[1:] if any(v != "" for v in r)]
+        if rows != self.store.templates(): self.store.replace_templates(rows, dirty=False)
+        self.store.set_meta("last_pull", time.time())
+
+@st.cache_resource
+def get_local_store():
+    return LocalStore(LOCAL_DB_PATH) if LOCAL_DB_PATH else None
+
+@st.cache_resource
+def get_sync_engine():
+    store, pool = get_local_store(), _pool()
+    return SyncEngine(store, pool) if store and pool else None
+
+def _local():
+    """로컬 저널 (꺼져 있으면 None). 처음 쓰일 때 시트 전체를 한 번 받아 채움"""
+    store = get_local_store()
+    if store and store.meta("last_pull") is None:
+        sync = get_sync_engine()
+        if sync: sync.ensure_initial()
+    return store
+
+# --- Templates ---
+class TemplateStore:
+    """Templates 시트의 write-through 캐시. 추가/삭제 시 시트와 캐시를 함께 갱신하고 version 을 올림"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows, self.version, self.loaded_at = None, 0, 0.0
+        self.refreshing = False
+        self.local_version = -1
+        self._groups = (-1, None)
+
+    def get_local(self, store):
+        with self.lock:
+            if self.rows is None or self.local_version != store.templates_version:
+                self.rows = [dict(zip(TEMPLATE_HEADER, r)) for r in store.templates()]
+                self.local_version = store.templates_version
+                self.version += 1
+            return self.rows
+
+    def get(self, sh, gateway):
+        with self.lock:
+            if self.rows is None:
+                self.rows, self.loaded_at = gateway.call(sh.get_all_records), time.time()
+                self.version += 1
+            elif TEMPLATE_REVALIDATE_SEC and not self.refreshing and time.time() - self.loaded_at > TEMPLATE_REVALIDATE_SEC:
+                self.refreshing = True
+                threading.Thread(target=self._revalidate, args=(sh, gateway), daemon=True).start()
+            return self.rows
+
+    def _revalidate(self, sh, gateway):
+        try:
+            fresh = gateway.call(sh.get_all_records)
+            with self.lock:
+                if fresh != self.rows: self.rows = fresh; self.version += 1
+                self.loaded_at = time.time()
+        except Exception: pass # 다음 주기에 다시 시도
+        finally: self.refreshing = False
+
+    def append(self, row):
+        with self.lock:
+            if self.rows is not None: self.rows = self.rows + [dict(zip(TEMPLATE_HEADER, row))]; self.version += 1
+
+    def delete(self, idx):
+        with self.lock:
+            if self.rows is not None and 0 <= idx < len(self.rows):
+                self.rows = self.rows[:idx] + self.rows[idx + 1:]; self.version += 1
+
+    def groups(self):
+        """템플릿명별 묶음과 학습/업무 분리 결과를 version 단위로 캐시"""
+        with self.lock:
+            if self._groups[0] != self.version:
+                rows = self.rows or []
+                by_name = {}
+                for t in rows: by_name.setdefault(t['템플릿명'], []).append(t)
+                study_names = sorted({t['템플릿명'] for t in rows if t['카테고리'] != '업무/사업'})
+                work = [t for t in rows if t['카테고리'] == '업무/사업']
+                self._groups = (self.version, {"by_name": by_name, "study_names": study_names, "work": work})
+            return self._groups[1]
+
+@st.cache_resource
+def get_template_store():
+    return TemplateStore()
+
+def get_templates():
+    store = _local()
+    if store: return get_template_store().get_local(store)
+    sh = get_sheet("Templates")
+    if not sh: return []
+    try: return get_template_store().get(sh, get_gateway())
+    except Exception as e:
+        st.toast(f"⚠️ 템플릿을 불러오지 못했습니다: {e}")
+        return []
+
+def get_template_groups():
+    get_templates()
+    return get_template_store().groups()
+
+def add_template_row(name, time_str, cat, main, sub):
+    row = [name, time_str, cat, main, sub]
+    store = get_local_store()
+    if store:
+        store.replace_templates(store.templates() + [row])
+        return
+    sh = get_sheet("Templates")
+    if not sh: return
+    try:
+        sheets_call(sh.append_row, row, idempotent=False)
+        get_template_store().append(row)
+    except Exception as e: st.toast(f"⚠️ 템플릿 추가 실패: {e}")
+
+def delete_template_row(row_idx):
+    store = get_local_store()
+    if store:
+        rows = store.templates()
+        if 0 <= row_idx - 2 < len(rows): store.replace_templates(rows[:row_idx - 2] + rows[row_idx - 1:])
+        return
+    sh = get_sheet("Templates")
+    if not sh: return
+    try:
+        sheets_call(sh.delete_rows, row_idx, idempotent=False)
+        get_template_store().delete(row_idx - 2)
+    except Exception as e: st.toast(f"⚠️ 템플릿 삭제 실패: {e}")
+
+# --- Backup (Export / Import) ---
+BACKUP_TABLES = {"Daily_Master": MASTER_HEADER, "Task_Details": TASK_HEADER, "Templates": TEMPLATE_HEADER, "Settings": ["Key", "Value"]}
+
+def _backup_key(name, row):
+    """가져오기 중복 판단 키 (할 일 ID / 마스터 날짜 / 설정 키 / 템플릿은 행 전체)"""
+    return tuple(map(str, row)) if name == "Templates" else str(row[0])
+
+def table_pages(name, page_rows=BACKUP_PAGE_ROWS):
+    """백업 표의 행을 페이지 단위로 흘림 (로컬 저널이면 SQLite, 아니면 시트를 행 범위로 나눠 읽음)"""
+    store = _local()
+    if store:
+        yield from store.table_pages(name, page_rows)
+        return
+    pool = _pool()
+    if not pool: return
+    width = len(BACKUP_TABLES[name])
+    titles = sorted(task_sheet_titles(pool)) if name == "Task_Details" else [name]
+    for title in titles:
+        if title not in pool.titles(): continue
+        start = 2
+        while True:
+            vals = _read_ranges(pool, [f"'{title}'!{start}:{start + page_rows - 1}"])[0] # 행 범위만 (예전 폭의 시트도 읽히게)
+            page = [_pad(r, width) for r in vals if any(v != "" for v in r)]
+            if page: yield page
+            if len(vals) < page_rows: break
+            start += page_rows
+
+def export_table(name, fp, fmt="csv"):
+    """표 하나를 fp 로 (csv: 텍스트 파일, parquet: 바이너리 파일 또는 경로). 쓴 행 수를 돌려줌"""
+    header, n = BACKUP_TABLES[name], 0
+    if fmt == "csv":
+        w = csv.writer(fp)
+        w.writerow(header)
+        for page in table_pages(name):
+            w.writerows(page); n += len(page)
+        return n
+    import pyarrow as pa # parquet 내보내기를 쓸 때만
+    import pyarrow.parquet as pq
+    schema = pa.schema([(c, pa.string()) for c in header])
+    with pq.ParquetWriter(fp, schema) as w:
+        for page in table_pages(name):
+            w.write_table(pa.table({c: [str(r[i]) for r in page] for i, c in enumerate(header)}, schema=schema)); n += len(page)
+    return n
+
+def export_zip():
+    """모든 백업 표를 CSV 로 묶은 zip 바이트 (화면의 다운로드 버튼용)"""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name in BACKUP_TABLES:
+            with zf.open(f"{name}.csv", "w") as raw, io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as fp:
+                export_table(name, fp)
+    return buf.getvalue()
+
+def read_pages(fp, fmt="csv", page_rows=BACKUP_CHUNK_ROWS):
+    """백업 파일 → (헤더, 행 페이지 generator). fp 는 csv 면 텍스트 파일, parquet 이면 경로나 바이너리 파일"""
+    if fmt == "csv":
+        reader = csv.reader(fp)
+        header = [h.lstrip("\ufeff") for h in next(reader, [])]
+        def pages():
+            while (page := list(itertools.islice(reader, page_rows))): yield page
+        return header, pages()
+    import pyarrow.parquet as pq
+    pf = pq.ParquetFile(fp)
+    header = pf.schema_arrow.names
+    return header, ([[d[c] for c in header] for d in b.to_pylist()] for b in pf.iter_batches(batch_size=page_rows))
+
+def _number(v):
+    try: f = float(v or 0)
+    except ValueError: raise ValueError(f"숫자가 아님: {v!r}")
+    return int(f) if f.is_integer() else f
+
+def _date_str(v):
+    try: return datetime.datetime.strptime(str(v), "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError: raise ValueError(f"날짜 형식 오류: {v!r}")
+
+def validate_row(name, row):
+    """표 형식에 맞게 정리한 행, 맞지 않으면 ValueError"""
+    row = _pad([("" if v is None else v) for v in row], len(BACKUP_TABLES[name]))[:len(BACKUP_TABLES[name])]
+    row = [v.strip() if isinstance(v, str) else v for v in row]
+    if name == "Task_Details":
+        if not row[0]: row[0] = str(uuid.uuid4())
+        row[1] = _date_str(row[1])
+        if not re.fullmatch(r"\d{1,2}:\d{2}", str(row[2])): raise ValueError(f"시간 형식 오류: {row[2]!r}")
+        row[2] = _hm(_minutes(row[2]))
+        if row[6] not in TASK_STATUSES: raise ValueError(f"상태는 {'/'.join(TASK_STATUSES)}: {row[6]!r}")
+        row[7] = _number(row[7])
+        if row[9] != "":
+            if not re.fullmatch(r"\d{1,2}:\d{2}", str(row[9])): raise ValueError(f"마감시간 형식 오류: {row[9]!r}")
+            row[9] = _hm(_minutes(row[9]))
+        if row[10] not in ("", *PRIORITIES): raise ValueError(f"중요도는 {'/'.join(PRIORITIES)} 또는 빈 값: {row[10]!r}")
+    elif name == "Daily_Master":
+        row[0] = _date_str(row[0])
+        row[1] = "TRUE" if str(row[1]).upper() == "TRUE" else "FALSE"
+        row[2] = _number(row[2])
+    elif name == "Templates":
+        if not row[0]: raise ValueError("템플릿명 없음")
+        if not re.fullmatch(r"\d{1,2}:\d{2}", str(row[1])): raise ValueError(f"시간 형식 오류: {row[1]!r}")
+        row[1] = _hm(_minutes(row[1]))
+    elif not row[0]: raise ValueError("키 없음")
+    return row
+
+def _existing_keys(pool, name):
+    """가져오기 중복 판단용 시트의 기존 키 (열 하나만 읽음, 템플릿은 표 전체)"""
+    if name == "Templates":
+        return {tuple(map(str, _pad(r, len(TEMPLATE_HEADER)))) for r in _read_ranges(pool, [f"'Templates'!A2:{_col(len(TEMPLATE_HEADER))}"])[0]}
+    titles = task_sheet_titles(pool) if name == "Task_Details" else [name]
+    titles = [t for t in titles if t in pool.titles()]
+    return {str(r[0]) for v in (_read_ranges(pool, [f"'{t}'!A2:A" for t in titles]) if titles else []) for r in v if r}
+
+def import_table(name, header, pages):
+    """백업 파일의 행을 검증해 없는 것만 덧붙임 (할 일 ID / 마스터 날짜 / 설정 키 / 템플릿 행이 같으면 건너뜀)
+    Sheets 직접 모드는 BACKUP_CHUNK_ROWS 행씩 appendCells 1회(게이트웨이 경유), 로컬 저널은 기록 후 SyncEngine 이 올림
+    → {"added", "skipped", "errors": [(줄, 사유)]}"""
+    want = BACKUP_TABLES[name]
+    head = [h.strip() for h in header[:len(want)]]
+    # 마감시간·중요도 열이 생기기 전의 할 일 백업도 받음 (빈 값으로)
+    if head != want and not (name == "Task_Details" and head == want[:TASK_LEGACY_WIDTH]): raise ValueError(f"{name} 헤더가 다릅니다: {header}")
+    store, pool = _local(), _pool()
+    if not store and not pool: raise RuntimeError("저장소에 연결되지 않았습니다")
+    seen = store.keys(name) if store else _existing_keys(pool, name)
+    report = {"added": 0, "skipped": 0, "errors": []}
+    line = 1
+    for page in pages:
+        rows = []
+        for raw in page:
+            line += 1
+            try: row = validate_row(name, raw)
+            except ValueError as e:
+                report["errors"].append((line, str(e))); continue
+            key = _backup_key(name, row)
+            if key in seen: report["skipped"] += 1; continue
+            seen.add(key); rows.append(row)
+        for i in range(0, len(rows), BACKUP_CHUNK_ROWS):
+            _import_chunk(name, rows[i:i + BACKUP_CHUNK_ROWS], store, pool)
+            report["added"] += len(rows[i:i + BACKUP_CHUNK_ROWS])
+    if pool and not store and name == "Task_Details":
+        ctx = _sheet_context(pool)
+        if ctx.dirty: _batch(pool, _context_reqs(pool, ctx))
+    return report
+
+def _import_chunk(name, rows, store, pool):
+    if name == "Task_Details":
+        changes = {r[0]: (r[1], r) for r in rows}
+        if store: store.write_changes(changes, {}); return
+        by_title = {}
+        for r in rows: by_title.setdefault(task_sheet_title(r[1]), []).append(r)
+        sheets = {title: pool.ensure_worksheet(title, TASK_SHEET_HEADER) for title in by_title}
+        reqs = _header_reqs(pool, {t: pool.header(t) for t in by_title}) + [_append_req(sheets[t].id, part) for t, part in by_title.items()]
+        _batch(pool, reqs)
+        get_day_cache().apply(changes, {})
+        _sheet_context(pool).apply(changes)
+    elif name == "Daily_Master":
+        if store: store.write_changes({}, {r[0]: r for r in rows}); return
+        _batch(pool, [_append_req(pool.worksheet("Daily_Master").id, rows)])
+        get_day_cache().apply({}, {r[0]: r for r in rows})
+    elif name == "Templates":
+        if store: store.replace_templates(store.templates() + rows); return
+        _batch(pool, [_append_req(pool.ensure_worksheet("Templates", TEMPLATE_HEADER).id, rows)])
+        for r in rows: get_template_store().append(r)
+    else:
+        if store: store.set_settings({r[0]: r[1] for r in rows}); return
+        _batch(pool, [_append_req(pool.ensure_worksheet("Settings", ["Key", "Value"]).id, rows)])
+        get_settings_store().index = None # 다음 조회 때 다시 읽어 병합
+
+# --- Analytics ---
+class Rollups:
+    """대시보드 집계의 프로세스 캐시 (벡터화 pandas)
+    일별×카테고리 집계(daily)와 일별 마스터(masters)를 데이터 version 과 함께 들고 있다가,
+    version 이 바뀌면 ChangeLog 가 알려 준 날짜 구간만 다시 읽어 바꿔 끼움 (알 수 없으면 전체)"""
+    TASK_COLUMNS = ["날짜", "카테고리", "상태", "소요시간(초)"]
+    MASTER_COLUMNS = ["날짜", "기상성공", "총집중시간(초)"]
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.log, self.version = None, None
+        self.daily, self.masters = None, None
+        self.views = (None, {}) # (version, {이름: 파생 결과})
+        self.last_refresh = None # (다시 계산한 구간, 걸린 초)
+
+    @staticmethod
+    def _daily(cols):
+        df = columns_frame(cols).dropna(subset=["날짜"])
+        df["완료"] = df["상태"] == "완료"
+        return df.groupby(["날짜", "카테고리"], as_index=False).agg(focus=("소요시간(초)", "sum"), done=("완료", "sum"), total=("완료", "size"))
+
+    @staticmethod
+    def _masters(cols):
+        return columns_frame(cols).dropna(subset=["날짜"]).drop_duplicates("날짜", keep="last")
+
+    def refresh(self, log, read):
+        """log 기준 최신으로. read 는 read_columns 와 같은 (kind, columns, date_from, date_to)"""
+        with self.lock:
+            version = log.version
+            if self.log is log and self.version == version: return
+            dates = log.since(self.version) if self.log is log else None
+            t0 = time.perf_counter()
+            if dates is None:
+                self.daily = self._daily(read("tasks", self.TASK_COLUMNS, None, None))
+                self.masters = self._masters(read("masters", self.MASTER_COLUMNS, None, None))
+                span = "전체"
+            elif not (dates := {d for d in dates if re.fullmatch(r"\d{4}-\d{2}-\d{2}", d)}):
+                span = "없음"
+            else:
+                import pandas as pd
+                lo, hi = min(dates), max(dates)
+                outside = lambda df: df[(df["날짜"] < pd.Timestamp(lo)) | (df["날짜"] > pd.Timestamp(hi))]
+                self.daily = pd.concat([outside(self.daily), self._daily(read("tasks", self.TASK_COLUMNS, lo, hi))], ignore_index=True).sort_values("날짜", kind="stable")
+                self.masters = pd.concat([outside(self.masters), self._masters(read("masters", self.MASTER_COLUMNS, lo, hi))], ignore_index=True).sort_values("날짜", kind="stable")
+                span = lo if lo == hi else f"{lo} ~ {hi}"
+            self.log, self.version = log, version
+            self.last_refresh = (span, time.perf_counter() - t0)
+
+    def view(self, name, fn):
+        """fn(daily, masters) 결과를 같은 version 동안 재사용"""
+        with self.lock:
+            if self.views[0] != self.version: self.views = (self.version, {})
+            if name not in self.views[1]: self.views[1][name] = fn(self.daily, self.masters)
+            return self.views[1][name]
+
+@st.cache_resource
+def get_rollups():
+    return Rollups()
+
+def _change_log():
+    store = _local()
+    return store.changes if store else get_day_cache().changes
+
+def focus_by_period(daily, freq):
+    """기간별(W: 주 — 일요일 마감, M: 월) 카테고리 집중 시간(시간)"""
+    import pandas as pd
+    if daily.empty: return pd.DataFrame()
+    rule = "W-SUN" if freq == "W" else "MS"
+    return (daily.groupby([pd.Grouper(key="날짜", freq=rule), "카테고리"])["focus"].sum().unstack(fill_value=0) / 3600).round(2)
+
+def wakeup_streaks(masters, today):
+    """(현재 연속 기상 성공 일수, 최장 연속). 기록 없는 날은 실패, 오늘 기록이 아직 없으면 어제까지로 셈"""
+    if masters.empty: return 0, 0
+    import pandas as pd
+    s = masters.set_index("날짜")["기상성공"].sort_index()
+    s = s.reindex(pd.date_range(s.index.min(), max(s.index.max(), pd.Timestamp(today)), freq="D"), fill_value=False)
+    run = s.groupby((~s).cumsum()).cumsum()
+    current = run.iloc[-1] if s.iloc[-1] or len(run) < 2 else run.iloc[-2]
+    return int(current), int(run.max())
+
+def completion_by_category(daily):
+    g = daily.groupby("카테고리")[["done", "total"]].sum()
+    g["완료율(%)"] = (100 * g["done"] / g["total"].where(g["total"] > 0)).round(1).fillna(0)
+    return g.rename(columns={"done": "완료", "total": "전체"})
+
+def goal_pace(daily, goals, today, window=14):
+    """다가오는 목표별 D-day 와, 최근 window 일의 카테고리 일평균 집중 시간으로 본 목표일까지 예상 누적 시간"""
+    import pandas as pd
+    recent = daily[daily["날짜"] > pd.Timestamp(today - datetime.timedelta(days=window))]
+    per_day = recent.groupby("카테고리")["focus"].sum() / 3600 / window
+    rows = []
+    for g in goals:
+        days = (datetime.datetime.strptime(g['date'], '%Y-%m-%d').date() - today).days
+        if days < 0: continue
+        avg = float(per_day.get(g['category'], 0.0))
+        rows.append({"목표": g['name'], "카테고리": g['category'], "D-day": f"D-{days}",
+                     "최근 일평균(시간)": round(avg, 2), "목표일까지 예상(시간)": round(avg * days, 1)})
+    return pd.DataFrame(rows)
+
+def timer_intervals(events, now=None):
+    """이벤트 행 → 구간 DataFrame(할일ID, 날짜, 시작, 끝, 초)
+    구간은 start 부터 같은 할 일의 다음 이벤트까지. 짝 없는 마지막 start 는 now 까지 (now 가 없으면 버림)"""
+    import pandas as pd
+    cols = ["할일ID", "날짜", "시작", "끝", "초"]
+    df = pd.DataFrame(events, columns=TIMER_HEADER).drop_duplicates("ID")
+    df["시각"] = pd.to_numeric(df["시각"], errors="coerce")
+    df = df.dropna(subset=["시각"]).sort_values(["할일ID", "시각"], kind="stable")
+    if df.empty: return pd.DataFrame(columns=cols)
+    end = df.groupby("할일ID")["시각"].shift(-1)
+    if now is not None: end = end.fillna(now)
+    out = df.assign(시작=df["시각"], 끝=end)[df["이벤트"].eq("start")].dropna(subset=["끝"])
+    return out.assign(초=out["끝"] - out["시작"])[cols].reset_index(drop=True)
+
+def _hour_slices(intervals):
+    """구간을 정시 경계로 쪼갠 DataFrame(시각=그 시간대 시작(로컬), 초)"""
+    import numpy as np
+    import pandas as pd
+    if intervals.empty: return pd.DataFrame({"시각": pd.to_datetime([]), "초": []})
+    off = _utc_offset()
+    start = intervals["시작"].to_numpy(float) + off
+    end = intervals["끝"].to_numpy(float) + off
+    first, last = np.floor(start / 3600), np.floor(np.maximum(end - 1e-6, start) / 3600)
+    n = (last - first + 1).astype(int)
+    idx = np.repeat(np.arange(len(start)), n)
+    hour = first[idx] + (np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n))
+    sec = np.minimum(end[idx], (hour + 1) * 3600) - np.maximum(start[idx], hour * 3600)
+    return pd.DataFrame({"시각": pd.to_datetime(hour * 3600, unit="s"), "초": sec})
+
+def _utc_offset():
+    return datetime.datetime.now().astimezone().utcoffset().total_seconds()
+
+def hour_profile(events, now=None):
+    """0~23시별 집중 시간(분) 리스트. timer_intervals 와 같은 규칙을 순수 파이썬으로 셈
+    일간 화면은 새 세션의 첫 화면이라 pandas/numpy 를 부르지 않음 (하루치 이벤트 수십 개라 벡터화 이득도 없음). 여러 날은 _hour_slices"""
+    first, by_task = set(), {}
+    for r in events:
+        if str(r[0]) in first: continue
+        first.add(str(r[0]))
+        try: by_task.setdefault(str(r[1]), []).append((float(r[4]), r[3]))
+        except (TypeError, ValueError): continue
+    off, mins = _utc_offset(), [0.0] * 24
+    for evs in by_task.values():
+        evs.sort(key=lambda e: e[0])
+        for (ts, kind), (end, _) in zip(evs, evs[1:] + [(now, None)]):
+            if kind != "start" or end is None: continue
+            s, e = ts + off, end + off
+            while s < e:
+                edge = (math.floor(s / 3600) + 1) * 3600
+                mins[int(s // 3600) % 24] += (min(e, edge) - s) / 60
+                s = edge
+    return mins
+
+def sparkline(vals):
+    """숫자 목록을 ▁▂▃▄▅▆▇█ 한 줄로 (0 은 빈칸에 가까운 ·)"""
+    top = max(vals, default=0)
+    return "".join("·" if v <= 0 else "▁▂▃▄▅▆▇█"[min(7, int(8 * v / top))] for v in vals) if top > 0 else ""
+
+def hour_heatmap(intervals):
+    """요일 × 시간대 집중 시간(시간) — long 형식(요일, 시, 시간)"""
+    import pandas as pd
+    sl = _hour_slices(intervals)
+    heat = sl.groupby([sl["시각"].dt.dayofweek.rename("요일"), sl["시각"].dt.hour.rename("시")])["초"].sum() / 3600
+    heat = heat.reindex(pd.MultiIndex.from_product([range(7), range(24)], names=["요일", "시"]), fill_value=0.0)
+    out = heat.rename("시간").reset_index()
+    out["요일"] = out["요일"].map(dict(enumerate(WEEKDAY_NAMES)))
+    return out
+
+# --- Schedule ---
+def _minutes(hm):
+    h, m = str(hm).split(":")[:2]
+    return int(h) * 60 + int(m)
+
+def _hm(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def _time_key(t):
+    return str(t['시간'])
+
+def insert_task(tasks, t):
+    """시간 순을 유지하며 제자리에 삽입 (같은 시간이면 뒤에)"""
+    bisect.insort(tasks, t, key=_time_key)
+
+def task_span(t):
+    """할 일이 차지하는 [시작, 끝) 분. 끝은 마감시간, 없으면 시작 1분만 (시작 시각이 같은 할 일끼리만 겹침)"""
+    start = _minutes(t['시간'])
+    due = _minutes(t['마감시간']) if t.get('마감시간') else 0
+    return start, (due if due > start else start + 1)
+
+def _span_label(t):
+    a, b = task_span(t)
+    return f"{_hm(a)}~{_hm(b)}" if b - a > 1 else _hm(a)
+
+class ScheduleIndex:
+    """하루 일정의 구간 인덱스: 시작 분(0~SCHEDULE_SLOTS-1)을 잎으로 하는 세그먼트 트리에 노드마다 그 아래 구간들의 끝 최댓값을 둠
+    겹침 조회는 end 전에 시작하고 끝 최댓값이 start 보다 큰 노드만 내려가 O((k+1)·log M) (k: 겹친 수, M: 슬롯 수), 추가·삭제는 O(log M).
+    세션마다 불러온 날짜로 한 번 만들고(session_schedule) 할 일을 넣고 뺄 때 같이 고침"""
+    def __init__(self, tasks=()):
+        self.tree = [0] * (2 * SCHEDULE_SLOTS) # 끝은 항상 시작보다 커서 0 = 빈 노드
+        self.leaves = {} # 시작 분 → [(끝, 할 일)]
+        for t in tasks: self.add(t)
+
+    def _slot(self, start):
+        return min(max(start, 0), SCHEDULE_SLOTS - 1)
+
+    def _update(self, slot):
+        i = slot + SCHEDULE_SLOTS
+        self.tree[i] = max((b for b, _ in self.leaves.get(slot, ())), default=0)
+        i //= 2
+        while i:
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+            i //= 2
+
+    def overlaps(self, start, end):
+        """[start, end) 와 겹치는 할 일들 (시작 순)"""
+        out, stack = [], [(1, 0, SCHEDULE_SLOTS)]
+        while stack:
+            node, lo, hi = stack.pop()
+            if lo >= end or self.tree[node] <= start: continue
+            if hi - lo == 1:
+                out += [t for b, t in sorted(self.leaves[lo], key=lambda x: x[0]) if b > start]
+                continue
+            mid = (lo + hi) // 2
+            stack += [(2 * node + 1, mid, hi), (2 * node, lo, mid)] # 왼쪽부터 꺼냄
+        return out
+
+    def add(self, t):
+        a, b = task_span(t)
+        self.leaves.setdefault(self._slot(a), []).append((b, t))
+        self._update(self._slot(a))
+
+    def remove(self, t):
+        slot = self._slot(task_span(t)[0])
+        self.leaves[slot] = [(b, k) for b, k in self.leaves.get(slot, []) if k is not t]
+        self._update(slot)
+
+    def next_free(self, start, length=1):
+        """start 이후 length 분이 비는 첫 시작 (분), 그날 안에 없으면 None"""
+        while start + length <= 24 * 60:
+            hit = self.overlaps(start, start + length)
+            if not hit: return start
+            start = max(task_span(t)[1] for t in hit)
+        return None
+
+def conflict_message(index, t):
+    """t 와 겹치는 일정이 있으면 안내 문구 (다음 빈 시간 포함), 없으면 None"""
+    hit = index.overlaps(*task_span(t))
+    if not hit: return None
+    a, b = task_span(t)
+    busy = ", ".join(f"{_span_label(k)} {k['할일_Main']}" for k in hit)
+    free = index.next_free(a, b - a)
+    return f"{t['시간']} 이(가) [{busy}] 와 겹칩니다" + (f" → 다음 빈 시간 {_hm(free)}" if free is not None else "")
+
+def session_schedule():
+    """세션 할 일 목록의 ScheduleIndex (날짜를 불러올 때 만들고 add_session_task / remove_session_task 가 같이 고침)"""
+    return st.session_state.schedule
+
+def add_session_task(t):
+    insert_task(st.session_state.tasks, t)
+    session_schedule().add(t)
+
+def remove_session_task(t):
+    st.session_state.tasks.remove(t)
+    session_schedule().remove(t)
+
+def apply_template(tasks, items, index=None):
+    """템플릿 항목들을 한 번에 추가. 기존 일정이나 먼저 추가된 항목과 겹치는 것은 건너뛰고 모두 모아 돌려줌
+    index: tasks 의 ScheduleIndex (주면 추가하는 항목도 반영, 없으면 새로 만듦) → (추가된 수, 충돌 안내 목록)"""
+    index = ScheduleIndex(tasks) if index is None else index
+    added, conflicts = 0, []
+    for it in items:
+        t = {"ID": str(uuid.uuid4()), "시간": it['시간'], "카테고리": it['카테고리'],
+             "할일_Main": it['할일_Main'], "할일_Sub": it.get('할일_Sub', ''),
+             "상태": "예정", "소요시간(초)": 0, "참고자료": "", "accumulated": 0, "is_running": False}
+        msg = conflict_message(index, t)
+        if msg:
+            conflicts.append(msg); continue
+        insert_task(tasks, t); index.add(t); added += 1
+    return added, conflicts
+
+def report_template(added, conflicts):
+    """적용 결과를 다음 리런에도 보이는 토스트로"""
+    st.toast(f"✅ {added}건 추가" + (f" · ⚠️ 충돌 {len(conflicts)}건 건너뜀" if conflicts else ""))
+    for msg in conflicts: st.toast(f"⚠️ {msg}")
+
+# --- Context Saver ---
+def get_last_context(category):
+    """category 의 오늘 이전 마지막 할 일 (Context 인덱스 조회, 보통 시트 읽기 없음)"""
+    today_str = datetime.date.today().strftime("%Y-%m-%d")
+    store = _local()
+    try:
+        if store: row = store.last_task(category, today_str)
+        else:
+            pool = _pool()
+            if not pool: return None
+            row = _context_lookup(_sheet_context(pool), category, today_str, lambda c: _sheet_task_rows(pool, c))
+        return dict(zip(TASK_HEADER, row)) if row else None
+    except Exception as e:
+        st.toast(f"⚠️ 이전 할 일을 불러오지 못했습니다: {e}")
+        return None
+
+def session_last_context(category):
+    """get_last_context 를 세션에 (카테고리, 오늘) 단위로 보관 (할 일 추가 패널이 리런마다 조회하지 않게)"""
+    key = (category, datetime.date.today())
+    if st.session_state.last_ctx[0] != key: st.session_state.last_ctx = (key, get_last_context(category))
+    return st.session_state.last_ctx[1]
+
+def get_last_work_context():
+    return get_last_context("업무/사업")
+
+def resume_task(last):
+    """지난 할 일을 이어서 하는 새 할 일"""
+    return {
+        "ID": str(uuid.uuid4()), "시간": datetime.datetime.now().strftime("%H:%M"),
+        "카테고리": last['카테고리'], "할일_Main": f"{last['할일_Main']} (이어서)",
+        "할일_Sub": last['할일_Sub'], "상태": "예정", "소요시간(초)": 0, "참고자료": last['참고자료'],
+        "accumulated": 0, "is_running": False
+    }
+
+# --- AI Suggestion ---
+SUGGEST_COLUMNS = ["날짜", "카테고리", "할일_Main", "할일_Sub", "상태"]
+SUGGEST_HALF_LIFE_DAYS = 30 # 최근성 가중이 절반이 되는 기간
+
+_WORD = re.compile(r"\w+")
+
+def _tokens(text):
+    return _WORD.findall(str(text).lower())
+
+def _sub_items(sub):
+    """세부 목표 칸을 항목 단위로 ('- ' 글머리표·빈 줄 제거)"""
+    return [ln.strip().lstrip("-•*·").strip() for ln in str(sub).splitlines() if ln.strip().lstrip("-•*·").strip()]
+
+class SuggestIndex:
+    """카테고리별 세부 목표 추천 인덱스 (Task_Details 의 완료된 할 일 + Templates)
+    후보(세부 목표 한 줄)마다 날짜별 등장 횟수를, 토큰(메인 목표·후보 낱말) → 후보 역색인과 접두 검색용 정렬 어휘를 둠.
+    ChangeLog 가 알려 준 날짜만 빼고 다시 읽어 넣으므로 저장 후 갱신은 바뀐 날짜 분량만"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.log, self.version, self.templates = None, None, None
+        self.by_date = {} # {날짜: [(카테고리, 후보, 토큰들)]}  ("" 는 템플릿)
+        self.cands = {} # {(카테고리, 후보): {날짜: 횟수}}
+        self.postings = {} # {카테고리: {토큰: {후보: 횟수}}}
+        self.vocab = {} # {카테고리: 정렬된 토큰 목록} (None 이면 다음 검색 때 다시 정렬)
+
+    def _add(self, date_str, entries):
+        self.by_date.setdefault(date_str, []).extend(entries)
+        for cat, cand, toks in entries:
+            seen = self.cands.setdefault((cat, cand), {})
+            seen[date_str] = seen.get(date_str, 0) + 1
+            post = self.postings.setdefault(cat, {})
+            for tok in toks:
+                p = post.setdefault(tok, {})
+                p[cand] = p.get(cand, 0) + 1
+            self.vocab[cat] = None
+
+    def _remove(self, date_str):
+        for cat, cand, toks in self.by_date.pop(date_str, []):
+            seen = self.cands[(cat, cand)]
+            seen[date_str] -= 1
+            if not seen[date_str]: del seen[date_str]
+            if not seen: del self.cands[(cat, cand)]
+            post = self.postings[cat]
+            for tok in toks:
+                post[tok][cand] -= 1
+                if post[tok][cand] <= 0: del post[tok][cand]
+                if not post[tok]: del post[tok]
+            self.vocab[cat] = None
+
+    def _load(self, cols):
+        entries, memo = {}, {} # 같은 (메인, 세부) 는 한 번만 쪼갬
+        for d, cat, main, sub, status in zip(*(cols[c] for c in SUGGEST_COLUMNS)):
+            if status != "완료" or not sub: continue
+            key = (main, sub)
+            if key not in memo:
+                main_toks = _tokens(main)
+                memo[key] = [(cand, tuple(set(main_toks + _tokens(cand)))) for cand in _sub_items(sub)]
+            entries.setdefault(str(d), []).extend((str(cat), cand, toks) for cand, toks in memo[key])
+        for d, e in entries.items():
+            if re.fullmatch(r"\d{4}-\d{2}-\d{2}", d): self._add(d, e)
+
+    def refresh(self, log, read, templates):
+        """log 기준 최신으로. read 는 read_columns 와 같은 (kind, columns, date_from, date_to)"""
+        with self.lock:
+            version = log.version
+            if self.log is not log or self.version != version:
+                dates = log.since(self.version) if self.log is log else None
+                if dates is None:
+                    for d in [d for d in self.by_date if d]: self._remove(d)
+                    self._load(read("tasks", SUGGEST_COLUMNS, None, None))
+                elif (dates := {d for d in dates if re.fullmatch(r"\d{4}-\d{2}-\d{2}", d)}):
+                    lo, hi = min(dates), max(dates)
+                    for d in [d for d in self.by_date if d and lo <= d <= hi]: self._remove(d)
+                    self._load(read("tasks", SUGGEST_COLUMNS, lo, hi))
+                self.log, self.version = log, version
+            t_key = [tuple(str(t.get(k, "")) for k in ("카테고리", "할일_Main", "할일_Sub")) for t in templates]
+            if t_key != self.templates:
+                self._remove("")
+                self._add("", [(cat, cand, tuple(set(_tokens(main) + _tokens(cand)))) for cat, main, sub in t_key for cand in _sub_items(sub)])
+                self.templates = t_key
+
+    def suggest(self, category, main, today, k=5):
+        """(후보, 점수) 상위 k개. 메인 목표와 낱말(접두 일치 포함)이 겹치는 후보가 먼저, 그 안에선 유사도 + 빈도 + 최근성"""
+        with self.lock:
+            post = self.postings.get(category, {})
+            if not post: return []
+            if self.vocab.get(category) is None: self.vocab[category] = sorted(post)
+            vocab = self.vocab[category]
+            sim = collections.Counter()
+            for q in set(_tokens(main)):
+                j = bisect.bisect_left(vocab, q)
+                while j < len(vocab) and vocab[j].startswith(q): # 입력 중인 낱말은 접두로 맞춤
+                    tok = vocab[j]
+                    idf = 1.0 / math.log1p(len(post[tok]) + 1)
+                    for cand, n in post[tok].items(): sim[cand] += idf * (1.0 if tok == q else 0.6) * min(n, 3)
+                    j += 1
+            pool = set(sim)
+            if len(pool) < k: pool |= {cand for (cat, cand) in self.cands if cat == category} # 비슷한 게 모자라면 빈도·최근성으로 채움
+            scored = []
+            for cand in pool:
+                seen = self.cands[(category, cand)]
+                dated = [d for d in seen if d]
+                age = (today - datetime.date.fromisoformat(max(dated))).days if dated else 365
+                score = 2.0 * sim.get(cand, 0) + math.log1p(sum(seen.values())) + 0.5 ** (max(age, 0) / SUGGEST_HALF_LIFE_DAYS)
+                scored.append((cand, float(score)))
+            return sorted(scored, key=lambda x: (x[0] not in sim, -x[1]))[:k] # 낱말이 겹치는 후보가 먼저
+
+@st.cache_resource
+def get_suggest_index():
+    return SuggestIndex()
+
+def suggest_subtasks(category, main_input, k=5):
+    """이력 기반 세부 목표 후보 (인덱스는 바뀐 날짜만 갱신)"""
+    if not _local() and not _pool(): return []
+    index = get_suggest_index()
+    try: index.refresh(_change_log(), read_columns, get_templates())
+    except Exception as e:
+        st.toast(f"⚠️ 추천 인덱스 갱신 실패: {e}")
+    return [c for c, _ in index.suggest(category, main_input, datetime.date.today(), k)]
+
+def generate_ai_suggestion(category, main_input):
+    suggestions = [f"- {c}" for c in suggest_subtasks(category, main_input, 3)]
+    if suggestions: return "\n".join(suggestions)
+    # 이력이 없으면 기본 제안
+    suggestions = []
+    if category == "CTA 공부":
+        if "세법" in main_input: suggestions = ["- 법인세 3강 수강", "- 익금/손금 암기", "- 기출 10문제"]
+        else: suggestions = ["- 진도 3강 수강", "- 백지 복습 20분", "- 핵심 키워드 정리"]
+    elif category == "업무/사업":
+        if "앱" in main_input: suggestions = ["- UI/UX 스케치", "- DB 설계 점검", "- 버그 수정"]
+        else: suggestions = ["- 메일 회신", "- 주간 우선순위 설정", "- 뉴스 스크랩"]
+    elif category == "건강/운동":
+        suggestions = ["- 스트레칭 10분", "- 유산소 30분", "- 스쿼트 3세트"]
+    else: suggestions = ["- 책상 정리", "- 내일 계획", "- 명상"]
+    return "\n".join(suggestions)
+
+# --- AI Coach ---
+def _chat_pack(msg):
+    """메시지 → [역할 1글자, 내용, (미디어)] (저장용)"""
+    media = {k: v for k, v in msg.items() if k not in ("role", "content")}
+    return [msg["role"][0], msg["content"]] + ([media] if media else [])
+
+def _chat_unpack(row):
+    msg = {"role": "user" if row[0] == "u" else "assistant", "content": row[1]}
+    if len(row) > 2: msg.update(row[2])
+    return msg
+
+class ChatLog:
+    """로컬 저널이 없을 때의 대화 보관 (프로세스 메모리, 최근 COACH_HISTORY_KEEP 개)"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = collections.deque(maxlen=COACH_HISTORY_KEEP)
+        self.next_id = 1
+
+    def chat_append(self, msg):
+        with self.lock:
+            self.rows.append((self.next_id, _chat_pack(msg)))
+            self.next_id += 1
+            return self.next_id - 1
+
+    def chat_page(self, limit, before=None):
+        with self.lock: rows = [(i, r) for i, r in self.rows if before is None or i < before][-limit:]
+        return [(i, _chat_unpack(r)) for i, r in rows]
+
+@st.cache_resource
+def get_chat_log():
+    return ChatLog()
+
+def _chat_store():
+    return _local() or get_chat_log()
+
+def _stub_backend(prompt, history):
+    """오프라인 응답 (예전 시뮬레이션과 같은 내용을 단어 단위로 흘림)"""
+    if "스트레칭" in prompt:
+        text, media = "거북목 교정 스트레칭 영상입니다! 🐢", {"video_url": "https://www.youtube.com/watch?v=M5J2aaw3YBc"}
+    elif "뉴스" in prompt:
+        text, media = "오늘의 주요 뉴스입니다.", {"news_data": [{"title": "금리 인하 전망", "summary": "내년 하반기 금리 인하 가능성..."}]}
+    else:
+        text, media = f"입력하신 내용: {prompt}\n(아직은 시뮬레이션입니다)", {}
+    for word in re.split(r"(\s+)", text):
+        if word: yield word
+    if media: yield media
+
+def _http_backend(prompt, history):
+    """COACH_URL 에 {prompt, history} 를 POST 하고 응답을 줄 단위로 흘림. JSON 객체 줄은 미디어로 취급"""
+    import requests
+    with requests.post(COACH_URL, json={"prompt": prompt, "history": [_chat_pack(m) for m in history]}, stream=True, timeout=(5, 60)) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            line = line.decode("utf-8")
+            if line.startswith("{"): yield json.loads(line)
+            else: yield line + "\n"
+
+COACH_BACKENDS = {"stub": _stub_backend, "http": _http_backend}
+
+def coach_stream(prompt, history, reply):
+    """백엔드 출력에서 텍스트 조각만 흘려 보내고(st.write_stream 용), 미디어와 전체 텍스트는 reply 에 모음"""
+    backend = COACH_BACKENDS.get(COACH_BACKEND, _stub_backend)
+    try:
+        for chunk in backend(prompt, history):
+            if isinstance(chunk, dict): reply.update(chunk)
+            else:
+                reply["content"] += chunk
+                yield chunk
+    except Exception as e:
+        msg = f"\n\n⚠️ 응답 생성 실패: {e}"
+        reply["content"] += msg
+        yield msg
+
+def coach_append(msg):
+    """대화 보관소와 세션 창에 한 메시지 추가 (창은 chat_limit 개로 자름)"""
+    mid = _chat_store().chat_append(msg)
+    window = st.session_state.chat_window
+    window.append((mid, msg))
+    del window[:-st.session_state.chat_limit]
+
+def coach_load_older():
+    """창 앞쪽으로 이전 대화 COACH_PAGE 개를 더 붙임 (없으면 창 한도만 그대로)"""
+    window = st.session_state.chat_window
+    older = _chat_store().chat_page(COACH_PAGE, window[0][0] if window else None)
+    st.session_state.chat_window = older + window
+    st.session_state.chat_limit += len(older) if older else 1 # 더 없으면 버튼을 숨김
+
+# --- Reminders ---
+class TelegramSender:
+    """Bot API sendMessage 전송기. 프로세스당 requests.Session 하나로 연결을 재사용하고
+    429(retry_after 만큼)·5xx·연결 오류는 지수 백오프로 REMIND_MAX_RETRIES 번까지 다시 보냄"""
+    def __init__(self, base, token):
+        import requests # 알림을 켤 때만
+        self.requests = requests
+        self.url = f"{base.rstrip('/')}/bot{token}/sendMessage"
+        self.session = requests.Session()
+        self.session.mount(base, requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+    def send(self, chat_id, text):
+        for attempt in range(REMIND_MAX_RETRIES + 1):
+            wait = 2 ** attempt
+            try:
+                r = self.session.post(self.url, json={"chat_id": chat_id, "text": text}, timeout=(5, 15))
+                if r.status_code == 200: return
+                if r.status_code != 429 and r.status_code < 500: raise RuntimeError(f"HTTP {r.status_code}: {r.text[:200]}")
+                if r.status_code == 429:
+                    try: wait = float(r.json().get("parameters", {}).get("retry_after", wait))
+                    except ValueError: pass
+                err = f"HTTP {r.status_code}"
+            except self.requests.RequestException as e: err = str(e)
+            if attempt < REMIND_MAX_RETRIES: time.sleep(wait)
+        raise RuntimeError(f"텔레그램 전송 실패: {err}")
+
+class ReminderScheduler:
+    """다가오는 알림(할 일 시작·마감, 목표 D-day)의 heap. 백그라운드 스레드가 때가 된 알림을 채팅별 한 메시지로 묶어 보냄
+    세션은 replace() 로 범위(날짜 / goals)별 알림을 바꿔 끼우기만 하고 곧바로 돌아감 (전송·재시도는 스레드에서).
+    replace 는 아직 때가 안 된 알림만 받으므로 보낸 알림이 리런마다 다시 들어오지 않고, 때가 됐지만 아직 못 보낸 알림은 건드리지 않음.
+    알림은 전송에 성공해야 items·scopes 에서 빠지고, 실패한 묶음은 REMIND_RETRY_SEC 뒤로 다시 줄 섬.
+    바뀌거나 지워진 알림의 heap 항목은 꺼낼 때 items 와 대조해 버림"""
+    def __init__(self, sender):
+        self.sender = sender
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.heap, self.items, self.scopes = [], {}, {} # heap: (시각, 키), items: {키: (시각, chat_id, 문구, 범위)}, scopes: {(chat_id, 범위): {안 보낸 키}}
+        self.retries = {} # 전송에 실패해 다시 줄 선 키: 실패 횟수
+        self.sent_n, self.dropped_n, self.last_sent, self.last_error = 0, 0, None, None
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def replace(self, chat_id, scope, reminders):
+        """chat_id 의 scope 알림을 reminders [(키, 시각, 문구)] 로 바꿈 (지난 것은 뺌, 때가 돼 보내는 중·재시도 중인 것은 그대로). 같으면 아무것도 안 함"""
+        now = time.time()
+        with self.lock:
+            fresh = {(chat_id, k): (when, chat_id, text, scope) for k, when, text in reminders if when > now}
+            old = self.scopes.get((chat_id, scope), set())
+            due = {k for k in old - fresh.keys() if k in self.retries or self.items[k][0] <= now}
+            if old == fresh.keys() | due and all(self.items.get(k) == v for k, v in fresh.items()): return
+            for k in old - fresh.keys() - due: del self.items[k]
+            for k, v in fresh.items():
+                if self.items.get(k) != v:
+                    self.items[k] = v
+                    heapq.heappush(self.heap, (v[0], k))
+            if fresh or due: self.scopes[(chat_id, scope)] = set(fresh) | due
+            else: self.scopes.pop((chat_id, scope), None)
+        self.wake.set()
+
+    def pending(self):
+        with self.lock: return len(self.items)
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while self.heap and self.items.get(self.heap[0][1], (None,))[0] != self.heap[0][0]: heapq.heappop(self.heap)
+                delay = self.heap[0][0] - time.time() if self.heap else None
+            if delay is None or delay > 0:
+                self.wake.wait(delay)
+                self.wake.clear()
+                continue
+            self._flush()
+
+    def _flush(self):
+        """때가 된 알림을 모두 꺼내 채팅별로 한 메시지로 보냄 (이른 것은 제 시각까지 기다림)"""
+        now, batch = time.time(), {}
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                when, k = heapq.heappop(self.heap)
+                item = self.items.get(k)
+                if item and item[0] == when: batch.setdefault(item[1], []).append((k, item))
+        for chat_id, entries in batch.items():
+            try: self.sender.send(chat_id, "\n".join(item[2] for _, item in entries))
+            except Exception as e:
+                self.last_error = str(e)
+                self._requeue(entries)
+                continue
+            with self.lock:
+                for k, item in entries: self._done(k, item)
+            self.sent_n += len(entries); self.last_sent, self.last_error = datetime.datetime.now(), None
+
+    def _requeue(self, entries):
+        """실패한 묶음을 REMIND_RETRY_SEC·2^(실패 횟수-1) 뒤로 다시 넣음. REMIND_MAX_RETRIES 번 넘게 실패하면 버림"""
+        with self.lock:
+            for k, item in entries:
+                if self.items.get(k) is not item: continue
+                n = self.retries.get(k, 0) + 1
+                if n > REMIND_MAX_RETRIES:
+                    self._done(k, item); self.dropped_n += 1
+                    continue
+                self.retries[k] = n
+                self.items[k] = (time.time() + REMIND_RETRY_SEC * 2 ** (n - 1),) + item[1:]
+                heapq.heappush(self.heap, (self.items[k][0], k))
+
+    def _done(self, k, item):
+        """보냈거나 포기한 알림을 지움 (lock 을 잡은 상태에서 호출)"""
+        if self.items.get(k) is item: del self.items[k]
+        self.retries.pop(k, None)
+        scope = (item[1], item[3])
+        keys = self.scopes.get(scope)
+        if keys is not None:
+            keys.discard(k)
+            if not keys: del self.scopes[scope]
+
+@st.cache_resource
+def get_reminder_scheduler(base, token):
+    return ReminderScheduler(TelegramSender(base, token))
+
+def _reminders():
+    """알림 스케줄러 (봇 토큰이 없으면 None)"""
+    token = _secret("telegram_bot_token") or os.environ.get("ARKAN_TELEGRAM_TOKEN", "")
+    return get_reminder_scheduler(TELEGRAM_API, token) if token else None
+
+def task_reminders(tasks, date_str):
+    """예정인 할 일의 시작·마감 REMIND_LEAD_MIN 분 전 알림 [(키, 시각, 문구)]. 시간이 바뀌면 키도 바뀜"""
+    out = []
+    for t in tasks:
+        if t.get('상태') == '완료': continue
+        for field, label in (("시간", "시작"), ("마감시간", "마감")):
+            hm = t.get(field)
+            if not hm: continue
+            try: at = datetime.datetime.strptime(f"{date_str} {hm}", "%Y-%m-%d %H:%M")
+            except ValueError: continue
+            out.append((f"task:{t['ID']}:{label}:{date_str} {hm}", at.timestamp() - 60 * REMIND_LEAD_MIN,
+                        f"⏰ {hm} {label} ({REMIND_LEAD_MIN}분 전) [{t['카테고리']}] {t['할일_Main']}"))
+    return out
+
+def goal_reminders(goals, today):
+    """목표별 REMIND_GOAL_DAYS 날 아침 D-day 알림 [(키, 시각, 문구)]"""
+    out = []
+    for g in goals:
+        try: due = datetime.datetime.strptime(g['date'], '%Y-%m-%d').date()
+        except ValueError: continue
+        for d in REMIND_GOAL_DAYS:
+            day = due - datetime.timedelta(days=d)
+            if day < today: continue
+            at = datetime.datetime.combine(day, datetime.time(REMIND_GOAL_HOUR))
+            out.append((f"goal:{g['id']}:{g['date']}:{d}", at.timestamp(), f"🎯 {g['name']} {f'D-{d}' if d else 'D-day'} ({g['date']})"))
+    return out
+
+def schedule_reminders(date_str, tasks, goals):
+    """세션의 날짜·목표 알림을 스케줄러에 반영 (telegram_id 와 봇 토큰이 있을 때만, 전송을 기다리지 않음)"""
+    chat_id = str(st.session_state.get("telegram_id") or "").strip()
+    sched = _reminders() if chat_id else None
+    if not sched: return
+    sched.replace(chat_id, f"day:{date_str}", task_reminders(tasks, date_str))
+    sched.replace(chat_id, "goals", goal_reminders(goals, datetime.date.today()))
+
+# --- Startup ---
+@st.cache_resource
+def get_startup_pool():
+    return concurrent.futures.ThreadPoolExecutor(max_workers=STARTUP_WORKERS, thread_name_prefix="arkan-warm")
+
+def _warm_day(date_str):
+    store = _local() # 로컬 저널은 최초 sync 만 끝나면 나머지는 로컬 읽기
+    pool = None if store else _pool()
+    if not pool: return
+    get_day_cache().ensure_range(pool, date_str, date_str)
+    get_timer_log().ensure(pool)
+
+def _warm_templates():
+    store = _local()
+    if store: get_template_store().get_local(store)
+    elif (pool := _pool()): get_template_store().get(pool.worksheet("Templates"), pool.gateway)
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    try: fn(*args); err = None
+    except Exception as e: err = str(e)
+    return time.perf_counter() - t0, err
+
+def warm_start(target_date):
+    """새 세션 첫 화면에 필요한 데이터(설정·목표·첫 날짜·템플릿)를 스레드 풀에서 동시에 받아 프로세스 캐시를 채움 → {이름: Future}
+    작업은 세션 상태와 st.* 를 건드리지 않음. 실패해도 평소 경로(refresh_session_settings 등)가 다시 받으며 오류를 보여 줌"""
+    jobs = {"settings": (_settings_store,), "goals": (_item_backend, "goals"),
+            "day": (_warm_day, target_date.strftime("%Y-%m-%d")), "templates": (_warm_templates,)}
+    ex = get_startup_pool()
+    return {name: ex.submit(_timed, *job) for name, job in jobs.items()}
+
+def finish_warm(futures, paint, timeout=STARTUP_WAIT_SEC):
+    """warm_start 를 최대 timeout 초 기다려 시작 보고를 남김
+    (paint: 스크립트 시작부터 메뉴·자리표시까지 초, wait: 가장 늦은 작업이 끝나기까지 초)"""
+    concurrent.futures.wait(futures.values(), timeout=timeout)
+    jobs = {k: f.result() if f.done() else (STARTUP_WAIT_SEC, "시간 초과") for k, f in futures.items()}
+    report = {"ts": round(time.time(), 3), "paint": paint, "wait": max(sec for sec, _ in jobs.values()), "jobs": jobs, "pandas": "pandas" in sys.modules}
+    get_perf_log().record_startup(report)
+    return report
+
+def warm_pending():
+    """새 세션의 warm_start 가 아직 도는 중인지 (기다리지 않음).
+    다 끝났거나 STARTUP_WAIT_SEC 를 넘기면 시작 보고를 남기고 False — 그 뒤로는 평소 경로가 받음"""
+    warm = st.session_state.warm
+    if not warm: return False
+    futures = warm["futures"]
+    if time.perf_counter() - warm["started"] < STARTUP_WAIT_SEC and not all(f.done() for f in futures.values()): return True
+    st.session_state.startup = finish_warm(futures, warm["paint"] if warm["paint"] is not None else get_perf_log().elapsed(), timeout=0)
+    st.session_state.warm = None
+    return False
@@ -0,0 +1,70 @@
+"""전체 기록 백업: Daily_Master / Task_Details / Templates / Settings 를 페이지 단위로 CSV·Parquet 에 내보내고 다시 가져옴
+
+    python backup.py export --out backup/                  # 표마다 backup/<표>.csv
+    python backup.py export --format parquet --out backup/
+    python backup.py import backup/*.csv                   # 파일 이름(확장자 뺀)이 표 이름
+
+앱의 데이터 계층(arkan_core)을 그대로 import 하므로
+연결 설정(.streamlit/secrets.toml, ARKAN_LOCAL_DB, ARKAN_FAKE_SHEETS)은 앱과 같습니다.
+가져오기에서 검증에 걸린 행이 있으면 종료 코드 1.
+"""
+import argparse
+import os
+import sys
+import time
+
+import arkan_core as core
+
+
+def export(out_dir, fmt):
+    os.makedirs(out_dir, exist_ok=True)
+    for name in core.BACKUP_TABLES:
+        path = os.path.join(out_dir, f"{name}.{fmt}")
+        t0 = time.perf_counter()
+        if fmt == "csv":
+            with open(path, "w", encoding="utf-8-sig", newline="") as fp: n = core.export_table(name, fp, fmt)
+        else: n = core.export_table(name, path, fmt)
+        print(f"{name}: {n}행 → {path} ({time.perf_counter() - t0:.1f}s)")
+
+
+def import_files(paths):
+    failed = 0
+    for path in paths:
+        name, ext = os.path.splitext(os.path.basename(path))
+        ext = ext.lstrip(".")
+        if name not in core.BACKUP_TABLES or ext not in ("csv", "parquet"):
+            print(f"{path}: 건너뜀 (파일 이름은 {', '.join(core.BACKUP_TABLES)} 중 하나, 확장자는 csv/parquet)")
+            failed += 1
+            continue
+        t0 = time.perf_counter()
+        if ext == "csv":
+            with open(path, encoding="utf-8-sig", newline="") as fp: rep = core.import_table(name, *core.read_pages(fp, ext))
+        else: rep = core.import_table(name, *core.read_pages(path, ext))
+        print(f"{name}: {rep['added']}건 추가, {rep['skipped']}건 이미 있음, {len(rep['errors'])}건 오류 ({time.perf_counter() - t0:.1f}s)")
+        for line, msg in rep["errors"][:20]: print(f"  {line}행: {msg}")
+        failed += bool(rep["errors"])
+    return failed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export")
+    ex.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    ex.add_argument("--out", default="backup")
+    im = sub.add_parser("import")
+    im.add_argument("files", nargs="+")
+    args = ap.parse_args(argv)
+    if args.cmd == "export":
+        export(args.out, args.format)
+        return 0
+    failed = import_files(args.files)
+    sync = core.get_sync_engine() if core.get_local_store() else None
+    if sync: # 로컬 저널에 쓴 것을 종료 전에 시트로 올림
+        sync.sync()
+        if sync.last_error: print(f"시트 동기화 실패 (다음 앱 실행 때 다시 올림): {sync.last_error}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
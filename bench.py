@@ -0,0 +1,201 @@
+"""오프라인 벤치마크: 앱의 데이터 함수(arkan_core)를 fake_gspread 위에서 돌려 시간·메모리·API 호출 수를 잼
+
+    python bench.py                      # 1k / 10k / 100k 할 일 행, Sheets 직접 모드
+    python bench.py --sizes 1000 --local # 로컬 저널(SQLite) 모드
+    python bench.py --out bench_output.txt
+
+화면 없이 데이터 계층(arkan_core)만 bare 모드로 불러옵니다.
+한 경우라도 CALL_BUDGETS 를 넘으면 종료 코드 1.
+"""
+import argparse
+import datetime
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+import fake_gspread
+
+CATEGORIES = ["CTA 공부", "업무/사업", "건강/운동", "기타/생활"]
+TASKS_PER_DAY = 8
+
+# 경우별 허용 API 호출 수 (행 수와 무관해야 함)
+CALL_BUDGETS = {
+    "load_day_data (cold)": 2,
+    "load_day_data (warm)": 0,
+    "load_range (month)": 2,
+    "autosave flush (first)": 10, # 핸들 조회 + Context 시트 생성·구축 포함
+    "autosave flush": 2,
+    "sync push (first)": 10, # 로컬 저널 모드: 핸들·헤더 조회 + Context 시트 생성·구축 포함
+    "sync push": 2,
+    "get_templates (cold)": 1,
+    "get_templates (warm)": 0,
+    "suggest_subtasks (cold)": 2,
+    "suggest_subtasks (warm)": 0,
+    "get_last_work_context (cold)": 2,
+    "get_last_work_context (warm)": 0,
+    "settings (cold)": 1,
+    "settings (warm)": 0,
+    "dashboard read_frame": 2,
+    "dashboard rollups (cold)": 2,
+    "dashboard rollups (after save)": 2,
+    "inbox page": 2,
+    "timer event append": 1,
+    "timer_events (warm)": 0,
+    "startup warm_start": 7, # 설정·목표·첫 날짜·템플릿 (연결 핸들 조회 포함)
+}
+
+
+def make_history(n_tasks):
+    """n_tasks 개의 할 일을 오늘부터 거슬러 하루 TASKS_PER_DAY 개씩 채운 스프레드시트"""
+    client = fake_gspread.FakeClient()
+    doc = client.create("CTA_Study_Data")
+    rnd = random.Random(n_tasks)
+    today = datetime.date.today()
+    days = max(n_tasks // TASKS_PER_DAY, 1)
+    tasks, masters = [fake_gspread.SHEET_HEADERS["Task_Details"]], [fake_gspread.SHEET_HEADERS["Daily_Master"]]
+    for d in range(days, 0, -1):
+        date_str = (today - datetime.timedelta(days=d)).strftime("%Y-%m-%d")
+        masters.append([date_str, rnd.choice(["TRUE", "FALSE"]), rnd.randint(0, 40000), ""])
+        for k in range(TASKS_PER_DAY):
+            if len(tasks) > n_tasks: break
+            tasks.append([str(uuid.UUID(int=rnd.getrandbits(128))), date_str, f"{7 + k:02d}:00", rnd.choice(CATEGORIES),
+                          f"할 일 {len(tasks)}", "세부", "완료", rnd.randint(0, 7200), ""])
+    doc.seed("Task_Details", tasks)
+    doc.seed("Daily_Master", masters)
+    doc.seed("Settings", [["Key", "Value"], ["telegram_id", '"123"']])
+    doc.seed("Templates", [fake_gspread.SHEET_HEADERS["Templates"]]
+             + [[f"루틴{i % 5}", f"{8 + i % 10:02d}:00", CATEGORIES[i % 4], f"템플릿 {i}", ""] for i in range(40)])
+    doc.seed("Inbox", [["ID", "카테고리", "할일", "생성일시"]] + [[str(uuid.uuid4()), "기타/생활", f"메모 {i}", ""] for i in range(500)])
+    doc.seed("Goals", [["ID", "카테고리", "목표명", "날짜"], [str(uuid.uuid4()), "CTA 공부", "1차 시험", "2027-04-25"]])
+    return client
+
+
+def load_app(client, local_db):
+    """arkan_core 를 새 모듈로 불러온 네임스페이스 (부를 때마다 따로라 환경 변수·바꾼 상수가 섞이지 않음, get_client 는 client 를 돌려주도록 바꿈)"""
+    os.environ["ARKAN_LOCAL_DB"] = local_db
+    spec = importlib.util.find_spec("arkan_core")
+    core = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(core)
+    ns = vars(core)
+    ns["st"].cache_resource.clear()
+    ns["get_client"] = lambda: client
+    ns["SYNC_INTERVAL_SEC"] = 3600 # 백그라운드 sync 는 끄고 부르는 쪽이 직접 (잰 호출 수에 섞이지 않게)
+    ns["SHEETS_QUOTA_PER_MIN"], ns["SHEETS_BURST"] = 10 ** 9, 10 ** 9 # 벤치마크에선 스로틀 없음
+    return ns
+
+
+def save(app, date_str, tasks):
+    """저장 버튼과 같은 경로: 자동 저장 큐에 넣고 flush (Sheets 직접 모드는 _sheets_sink, 로컬은 저널)"""
+    saver = app["get_autosaver"]()
+    for t in tasks: saver.submit_task(t["ID"], date_str, app["task_to_row"](t, date_str))
+    if not saver.flush(wait=True): raise RuntimeError(saver.last_error)
+
+
+def measure(client, name, fn):
+    client.calls.clear()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    wall = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    calls = sum(client.calls.values())
+    budget = CALL_BUDGETS.get(name)
+    return {"case": name, "wall_ms": wall * 1000, "peak_kb": peak / 1024, "calls": calls, "budget": budget,
+            "detail": dict(client.calls), "ok": budget is None or calls <= budget}
+
+
+def run_size(n_tasks, local):
+    client = make_history(n_tasks)
+    db = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name if local else ""
+    app = load_app(client, db)
+    today = datetime.date.today()
+    other = today - datetime.timedelta(days=1)
+    results = []
+    if local: results.append(measure(client, "initial sync (local)", lambda: app["_local"]()))
+    results.append(measure(client, "load_day_data (cold)", lambda: app["load_day_data"](other)))
+    results.append(measure(client, "load_day_data (warm)", lambda: app["load_day_data"](other)))
+    results.append(measure(client, "load_range (month)", lambda: app["load_range"](today - datetime.timedelta(days=30), today)))
+    data = app["load_day_data"](today)
+    tasks = data["tasks"] + [{"ID": str(uuid.uuid4()), "시간": "09:30", "카테고리": "업무/사업", "할일_Main": "벤치마크",
+                              "할일_Sub": "", "상태": "예정", "참고자료": "", "accumulated": 0, "is_running": False}]
+    results.append(measure(client, "autosave flush (first)", lambda: save(app, str(today), tasks)))
+    tasks[-1]["상태"] = "완료"
+    if local: results.append(measure(client, "sync push (first)", app["get_sync_engine"]().push))
+    results.append(measure(client, "autosave flush", lambda: save(app, str(today), tasks[-1:])))
+    if local: results.append(measure(client, "sync push", app["get_sync_engine"]().push))
+    results.append(measure(client, "get_templates (cold)", lambda: app["get_templates"]()))
+    results.append(measure(client, "get_templates (warm)", lambda: app["get_templates"]()))
+    results.append(measure(client, "suggest_subtasks (cold)", lambda: app["suggest_subtasks"]("CTA 공부", "할 일")))
+    results.append(measure(client, "suggest_subtasks (warm)", lambda: app["suggest_subtasks"]("CTA 공부", "할")))
+    # 인덱스를 메모리에서 버려 저장된 Context 시트 / meta 에서 다시 읽게 함
+    app["_pool"]().context = None
+    if local: app["get_local_store"]().context = None
+    results.append(measure(client, "get_last_work_context (cold)", lambda: app["get_last_work_context"]()))
+    results.append(measure(client, "get_last_work_context (warm)", lambda: app["get_last_work_context"]()))
+    results.append(measure(client, "settings (cold)", lambda: app["_settings_store"]().changed({})))
+    results.append(measure(client, "settings (warm)", lambda: app["_settings_store"]().changed({})))
+    results.append(measure(client, "dashboard read_frame", lambda: app["read_frame"]("masters", ["날짜", "총집중시간(초)"])))
+    refresh_rollups = lambda: app["get_rollups"]().refresh(app["_change_log"](), app["read_columns"])
+    results.append(measure(client, "dashboard rollups (cold)", refresh_rollups))
+    tasks[-1]["상태"] = "예정"
+    save(app, str(today), tasks[-1:])
+    results.append(measure(client, "dashboard rollups (after save)", refresh_rollups))
+    results.append(measure(client, "inbox page", lambda: app["item_page"]("inbox", 100, 20)))
+    def append_event():
+        row = [str(uuid.uuid4()), tasks[-1]["ID"], str(today), "start", time.time(), 0]
+        if local: app["_local"]().add_timer_events([row])
+        else: app["get_timer_log"]().append(app["_pool"](), [row])
+    append_event() # 첫 추가는 TimerEvents 시트 생성 포함
+    app["timer_events"](str(today), str(today))
+    results.append(measure(client, "timer event append", append_event))
+    results.append(measure(client, "timer_events (warm)", lambda: app["timer_events"](str(today), str(today))))
+    # 새 프로세스처럼 캐시를 비우고 새 세션 첫 실행의 동시 로드를 잼
+    app["st"].cache_resource.clear()
+    results.append(measure(client, "startup warm_start", lambda: app["finish_warm"](app["warm_start"](today), 0.0)))
+    if db:
+        app["get_local_store"]().db.close()
+        for suf in ("", "-wal", "-shm"):
+            if os.path.exists(db + suf): os.remove(db + suf)
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--local", action="store_true", help="로컬 저널(SQLite) 모드로 실행")
+    ap.add_argument("--out", help="결과 표를 이 파일에도 씀")
+    args = ap.parse_args(argv)
+
+    lines, failed = [], []
+    mode = "local" if args.local else "sheets"
+    t0 = time.perf_counter()
+    load_app(fake_gspread.demo_client(), "")
+    lines.append(f"arkan_core 불러오기 {1000 * (time.perf_counter() - t0):.0f}ms (pandas {'불러옴' if 'pandas' in sys.modules else '안 불러옴'})")
+    lines.append("")
+    for n in args.sizes:
+        lines.append(f"## {n:,} task rows ({mode})")
+        lines.append(f"{'case':32} {'wall(ms)':>10} {'peak(KB)':>10} {'calls':>6} {'budget':>6}  detail")
+        for r in run_size(n, args.local):
+            budget = "-" if r["budget"] is None else str(r["budget"])
+            lines.append(f"{r['case']:32} {r['wall_ms']:10.1f} {r['peak_kb']:10.0f} {r['calls']:6} {budget:>6}  "
+                         f"{'' if r['ok'] else 'OVER BUDGET '}{r['detail']}")
+            if not r["ok"]: failed.append(f"{n}: {r['case']} ({r['calls']} > {r['budget']})")
+        lines.append("")
+    report = "\n".join(lines)
+    print(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f: f.write(report + "\n")
+    if failed:
+        print("API 호출 예산 초과:\n  " + "\n  ".join(failed), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
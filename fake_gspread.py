@@ -0,0 +1,303 @@
+"""gspread Client / Spreadsheet / Worksheet 의 인메모리 대역 (오프라인 실행·동기화 점검용)
+
+app.py 가 쓰는 메서드만 흉내 냅니다. 모든 API 호출은 `client.calls` 에 메서드명으로 집계되고,
+`client.failures` 에 상태 코드를 넣으면 다음 호출들이 차례로 그 코드의 APIError 를 냅니다.
+
+    ARKAN_FAKE_SHEETS=1 streamlit run app.py
+"""
+import re
+import threading
+import time
+from collections import Counter
+
+import gspread
+
+
+class FakeAPIError(Exception):
+    """gspread.exceptions.APIError 처럼 response.status_code 를 가진 예외"""
+    def __init__(self, code, message=""):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.response = type("Resp", (), {"status_code": code})()
+
+
+class Cell:
+    def __init__(self, row, col, value):
+        self.row, self.col, self.value = row, col, value
+
+
+def _col_idx(letters):
+    n = 0
+    for ch in letters: n = n * 26 + (ord(ch.upper()) - 64)
+    return n
+
+
+def _parse_a1(a1):
+    """'A2:C' -> (row0, col0, row1, col1) 1-based, None 은 끝까지"""
+    def one(part):
+        m = re.fullmatch(r"([A-Za-z]*)(\d*)", part)
+        col = _col_idx(m.group(1)) if m.group(1) else None
+        row = int(m.group(2)) if m.group(2) else None
+        return row, col
+    if ":" in a1: a, b = a1.split(":", 1)
+    else: a = b = a1
+    r0, c0 = one(a)
+    r1, c1 = one(b)
+    return r0 or 1, c0 or 1, r1, c1
+
+
+def _split_range(rng):
+    if "!" not in rng: return rng.strip("'"), None
+    title, a1 = rng.rsplit("!", 1)
+    return title.strip("'"), a1
+
+
+class FakeWorksheet:
+    def __init__(self, doc, title, sheet_id, rows=None, cols=26):
+        self.spreadsheet, self.title, self.id = doc, title, sheet_id
+        self._rows = [list(r) for r in (rows or [])]
+        self.col_count = cols # 격자 폭: 이보다 오른쪽 열을 범위로 읽거나 쓰면 실제 API 처럼 400
+
+    # --- 내부 ---
+    def _hit(self, name):
+        self.spreadsheet.client._hit(name)
+
+    def _trim(self):
+        while self._rows and not any(v != "" for v in self._rows[-1]): self._rows.pop()
+
+    def _check_cols(self, last_col, what):
+        if last_col > self.col_count:
+            raise FakeAPIError(400, f"{what} exceeds grid limits. Max columns: {self.col_count}")
+
+    def _slice(self, a1):
+        r0, c0, r1, c1 = _parse_a1(a1) if a1 else (1, 1, None, None)
+        if c1: self._check_cols(c1, f"Range ('{self.title}'!{a1})")
+        rows = self._rows[r0 - 1:r1]
+        out = []
+        for r in rows:
+            cells = r[c0 - 1:c1]
+            while cells and cells[-1] == "": cells.pop()
+            out.append(cells)
+        while out and not out[-1]: out.pop()
+        return out
+
+    @property
+    def row_count(self): return max(len(self._rows), 1000)
+
+    # --- 읽기 ---
+    def get_all_values(self, **kw):
+        self._hit("get_all_values")
+        return [list(map(str, r)) for r in self._rows]
+
+    def get_all_records(self, **kw):
+        self._hit("get_all_records")
+        if not self._rows: return []
+        head = [str(h) for h in self._rows[0]]
+        return [{h: (r[i] if i < len(r) else "") for i, h in enumerate(head)} for r in self._rows[1:]]
+
+    def col_values(self, col, **kw):
+        self._hit("col_values")
+        return [str(r[col - 1]) if len(r) >= col else "" for r in self._rows]
+
+    def batch_get(self, ranges, **kw):
+        self._hit("batch_get")
+        return [self._slice(a1) for a1 in ranges]
+
+    def get(self, a1=None, **kw):
+        self._hit("get")
+        return self._slice(a1)
+
+    def find(self, query, **kw):
+        self._hit("find")
+        for ri, r in enumerate(self._rows):
+            for ci, v in enumerate(r):
+                if str(v) == str(query): return Cell(ri + 1, ci + 1, v)
+        return None
+
+    # --- 쓰기 ---
+    def append_row(self, values, **kw):
+        self._hit("append_row")
+        self._trim(); self._rows.append(list(values))
+
+    def append_rows(self, values, **kw):
+        self._hit("append_rows")
+        self._trim(); self._rows.extend(list(v) for v in values)
+
+    def insert_row(self, values, index=1, **kw):
+        self._hit("insert_row")
+        self._rows.insert(index - 1, list(values))
+
+    def update_cell(self, row, col, value):
+        self._hit("update_cell")
+        self._set(row, col, value)
+
+    def update(self, values=None, range_name=None, **kw):
+        self._hit("update")
+        r0, c0, _, _ = _parse_a1(range_name or "A1")
+        for i, row in enumerate(values):
+            for j, v in enumerate(row): self._set(r0 + i, c0 + j, v)
+
+    def batch_update(self, data, **kw):
+        self._hit("batch_update")
+        for d in data:
+            r0, c0, _, _ = _parse_a1(d["range"])
+            for i, row in enumerate(d["values"]):
+                for j, v in enumerate(row): self._set(r0 + i, c0 + j, v)
+
+    def delete_rows(self, start, end=None):
+        self._hit("delete_rows")
+        del self._rows[start - 1:(end or start)]
+
+    def clear(self):
+        self._hit("clear")
+        self._rows = []
+
+    def _set(self, row, col, value):
+        while len(self._rows) < row: self._rows.append([])
+        r = self._rows[row - 1]
+        while len(r) < col: r.append("")
+        r[col - 1] = value
+
+
+class FakeSpreadsheet:
+    def __init__(self, client, title, key):
+        self.client, self.title, self.id = client, title, key
+        self._sheets = {}
+        self._next_id = 0
+
+    def _hit(self, name):
+        self.client._hit(name)
+
+    def _by_id(self, sheet_id):
+        return next(ws for ws in self._sheets.values() if ws.id == sheet_id)
+
+    def seed(self, title, rows, cols=26):
+        """호출 카운트 없이 시트를 채움 (테스트 준비용). cols 는 격자 폭 (손으로 만든 시트의 기본값 26)"""
+        ws = self._sheets.get(title) or self._make(title, cols)
+        ws._rows, ws.col_count = [list(r) for r in rows], cols
+        return ws
+
+    def _make(self, title, cols=26):
+        self._next_id += 1
+        ws = self._sheets[title] = FakeWorksheet(self, title, self._next_id, cols=cols)
+        return ws
+
+    def worksheet(self, title):
+        self._hit("worksheet")
+        if title not in self._sheets: raise gspread.exceptions.WorksheetNotFound(title)
+        return self._sheets[title]
+
+    def worksheets(self, **kw):
+        self._hit("worksheets")
+        return list(self._sheets.values())
+
+    def add_worksheet(self, title, rows=1000, cols=26, index=None):
+        self._hit("add_worksheet")
+        if title in self._sheets: raise FakeAPIError(400, f"A sheet with the name \"{title}\" already exists.")
+        return self._make(title, cols)
+
+    def del_worksheet(self, ws):
+        self._hit("del_worksheet")
+        self._sheets.pop(ws.title, None)
+
+    def values_batch_get(self, ranges, params=None):
+        self._hit("values_batch_get")
+        out = []
+        for rng in ranges:
+            title, a1 = _split_range(rng)
+            if title not in self._sheets: raise FakeAPIError(400, f"Unable to parse range: {rng}")
+            out.append({"range": rng, "values": self._sheets[title]._slice(a1)})
+        return {"valueRanges": out}
+
+    def values_batch_update(self, body):
+        self._hit("values_batch_update")
+        for d in body.get("data", []):
+            title, a1 = _split_range(d["range"])
+            ws = self._sheets[title]
+            r0, c0, _, _ = _parse_a1(a1)
+            for i, row in enumerate(d["values"]):
+                for j, v in enumerate(row): ws._set(r0 + i, c0 + j, v)
+        return {}
+
+    def values_append(self, rng, params, body):
+        self._hit("values_append")
+        title, _ = _split_range(rng)
+        ws = self._sheets[title]
+        ws._trim(); ws._rows.extend(list(v) for v in body["values"])
+        return {}
+
+    def batch_update(self, body):
+        self._hit("batch_update")
+        for req in body.get("requests", []):
+            (kind, spec), = req.items()
+            if kind == "updateCells":
+                st = spec["start"]; ws = self._by_id(st["sheetId"])
+                ws._check_cols(st.get("columnIndex", 0) + max((len(r["values"]) for r in spec["rows"]), default=0), "updateCells")
+                for i, row in enumerate(spec["rows"]):
+                    for j, cell in enumerate(row["values"]):
+                        ws._set(st["rowIndex"] + i + 1, st.get("columnIndex", 0) + j + 1, _cell_value(cell))
+            elif kind == "appendCells":
+                ws = self._by_id(spec["sheetId"]); ws._trim()
+                ws._check_cols(max((len(r["values"]) for r in spec["rows"]), default=0), "appendCells")
+                ws._rows.extend([_cell_value(c) for c in row["values"]] for row in spec["rows"])
+            elif kind == "appendDimension" and spec["dimension"] == "COLUMNS":
+                self._by_id(spec["sheetId"]).col_count += spec["length"]
+            elif kind == "deleteDimension":
+                rg = spec["range"]; ws = self._by_id(rg["sheetId"])
+                del ws._rows[rg["startIndex"]:rg["endIndex"]]
+            else: raise FakeAPIError(400, f"unsupported request {kind}")
+        return {"replies": []}
+
+
+def _cell_value(cell):
+    v = cell.get("userEnteredValue", {})
+    if "numberValue" in v: return v["numberValue"]
+    if "boolValue" in v: return "TRUE" if v["boolValue"] else "FALSE"
+    return v.get("stringValue", "")
+
+
+class FakeClient:
+    def __init__(self, latency=0.0):
+        self.latency = latency # 호출마다 넣을 지연(초), 네트워크 왕복 흉내
+        self.calls = Counter()
+        self.failures = [] # 다음 호출들에서 차례로 던질 HTTP 상태 코드 (429/503 재현용)
+        self._docs = {}
+        self._lock = threading.Lock()
+
+    def _hit(self, name):
+        with self._lock:
+            self.calls[name] += 1
+            code = self.failures.pop(0) if self.failures else None
+        if code: raise FakeAPIError(code, "injected")
+        if self.latency: time.sleep(self.latency)
+
+    def create(self, title):
+        key = f"fake-{len(self._docs) + 1}"
+        doc = self._docs[key] = FakeSpreadsheet(self, title, key)
+        return doc
+
+    def open(self, title, **kw):
+        self._hit("open")
+        for d in self._docs.values():
+            if d.title == title: return d
+        raise gspread.exceptions.SpreadsheetNotFound(title)
+
+    def open_by_key(self, key):
+        self._hit("open_by_key")
+        return self._docs[key]
+
+
+SHEET_HEADERS = {
+    "Settings": ["Key", "Value"],
+    "Daily_Master": ["날짜", "기상성공", "총집중시간(초)", "한줄평", "수정시각"],
+    "Task_Details": ["ID", "날짜", "시간", "카테고리", "할일_Main", "할일_Sub", "상태", "소요시간(초)", "참고자료", "마감시간", "중요도", "수정시각"],
+    "Templates": ["템플릿명", "시간", "카테고리", "할일_Main", "할일_Sub"],
+}
+
+
+def demo_client(title="CTA_Study_Data", latency=0.0):
+    """헤더만 있는 빈 CTA_Study_Data 를 가진 클라이언트"""
+    client = FakeClient(latency=latency)
+    doc = client.create(title)
+    for name, header in SHEET_HEADERS.items(): doc.seed(name, [header])
+    return client
@@ -0,0 +1,61 @@
+"""fake_gspread 위에서 데이터 계층(arkan_core)을 불러오는 공용 fixture (bench.py 와 같은 bare 모드)"""
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import bench  # noqa: E402
+import fake_gspread  # noqa: E402
+
+DAY = "2026-03-02"
+
+
+def task_row(tid, main="할 일", status="예정", sec=0, date=DAY, time_str="09:00"):
+    return [tid, date, time_str, "CTA 공부", main, "", status, sec, ""]
+
+
+@pytest.fixture
+def sheets():
+    """(client, doc): 헤더와 할 일 두 개(a, b)가 있는 가짜 스프레드시트"""
+    client = fake_gspread.FakeClient()
+    doc = client.create("CTA_Study_Data")
+    for name, header in fake_gspread.SHEET_HEADERS.items(): doc.seed(name, [header])
+    doc.seed("Task_Details", [fake_gspread.SHEET_HEADERS["Task_Details"], task_row("a", "원래 a"), task_row("b", "원래 b")])
+    doc.seed("Daily_Master", [fake_gspread.SHEET_HEADERS["Daily_Master"], [DAY, "FALSE", 0, ""]])
+    return client, doc
+
+
+@pytest.fixture
+def local_app(sheets, tmp_path):
+    """로컬 저널 모드 앱 (최초 pull 까지 끝난 상태)"""
+    app = bench.load_app(sheets[0], str(tmp_path / "journal.db")) # 백그라운드 sync 는 꺼 두고 테스트가 직접 부름
+    app["_local"]()
+    yield app
+    app["get_local_store"]().db.close()
+
+
+@pytest.fixture
+def sheets_app(sheets):
+    """Sheets 직접 모드 앱"""
+    return bench.load_app(sheets[0], "")
+
+
+def sheet_rows(doc, title="Task_Details"):
+    """시트의 데이터 행 (호출 수에 안 셈)"""
+    return [list(r) for r in doc._sheets[title]._rows[1:]]
+
+
+def save_tasks(app, day, tasks):
+    """화면의 저장 버튼처럼: 자동 저장 큐에 넣고 바로 flush 한 결과"""
+    date_str = str(day)
+    saver = app["get_autosaver"]()
+    for t in tasks: saver.submit_task(str(t["ID"]), date_str, app["task_to_row"](t, date_str))
+    return saver.flush(wait=True)
+
+
+def local_rows(store):
+    return {tid: json.loads(row) for tid, row in store._q("SELECT id, row FROM tasks WHERE deleted=0")}
@@ -0,0 +1,44 @@
+"""Sheets 직접 모드의 자동 저장 (AutoSaver → _sheets_sink)"""
+from conftest import DAY, sheet_rows, task_row
+from fake_gspread import FakeAPIError
+
+
+def _saver(app):
+    pool = app["_pool"]()
+    return app["AutoSaver"](app["_sheets_sink"](pool, app["get_day_cache"]()), 3600)
+
+
+def test_write_applied_then_5xx_is_not_sent_twice(sheets_app, sheets):
+    """batch_update 는 반영됐는데 503 이 돌아온 경우: 게이트웨이가 다시 보내지 않고, 다음 flush 가 ID 위치를 새로 읽어 마무리"""
+    _, doc = sheets
+    doc._sheets["Task_Details"]._rows.append(task_row("c", "원래 c"))
+    real, hits = doc.batch_update, []
+    def applied_then_503(body):
+        hits.append(body)
+        real(body)
+        if len(hits) == 1: raise FakeAPIError(503, "backend error")
+    doc.batch_update = applied_then_503
+    saver = _saver(sheets_app)
+    saver.submit_task("b", DAY, None)
+    saver.submit_task("new", DAY, task_row("new", "새 할 일"))
+    assert not saver.flush(wait=True) # 저장 버튼은 실패를 그대로 보여 줌
+    assert saver.last_error and saver.pending() == 2
+    assert [r[0] for r in sheet_rows(doc)] == ["a", "c", "new"]
+    assert saver.flush(wait=True)
+    assert saver.last_error is None and saver.pending() == 0
+    assert [r[0] for r in sheet_rows(doc)] == ["a", "c", "new"]
+
+
+def test_throttled_append_is_retried(sheets_app, sheets):
+    """429 는 요청이 거절된 것이라 행 추가도 게이트웨이가 다시 보냄"""
+    _, doc = sheets
+    real, hits = doc.batch_update, []
+    def throttled_once(body): # 게이트웨이는 같은 함수를 다시 부름
+        hits.append(body)
+        if len(hits) == 1: raise FakeAPIError(429, "rate limit")
+        return real(body)
+    doc.batch_update = throttled_once
+    saver = _saver(sheets_app)
+    saver.submit_task("new", DAY, task_row("new", "새 할 일"))
+    assert saver.flush(wait=True) and len(hits) == 2
+    assert [r[0] for r in sheet_rows(doc)] == ["a", "b", "new"]
@@ -0,0 +1,42 @@
+"""카테고리별 지난번 할 일 인덱스 (ContextIndex)"""
+import datetime
+
+from conftest import DAY, save_tasks
+
+
+def _plan(app, day, main):
+    """day 에 CTA 공부 할 일 하나를 저장"""
+    t = {"ID": f"{day}-{main}", "시간": "10:00", "카테고리": "CTA 공부", "할일_Main": main, "할일_Sub": "",
+         "상태": "예정", "참고자료": "", "accumulated": 0, "is_running": False}
+    assert save_tasks(app, day, [t])
+
+
+def test_today_and_tomorrow_plans_do_not_force_a_scan(sheets_app, sheets):
+    client, _ = sheets
+    today = datetime.date.today()
+    _plan(sheets_app, today, "오늘")
+    _plan(sheets_app, today + datetime.timedelta(days=1), "내일")
+    client.calls.clear()
+    for _ in range(3):
+        assert sheets_app["get_last_context"]("CTA 공부")["날짜"] == DAY
+    assert sum(client.calls.values()) == 0
+
+
+def test_deleted_indexed_row_rebuilds_once(local_app):
+    store = local_app["get_local_store"]()
+    store.write_changes({"a": (DAY, None), "b": (DAY, None)}, {})
+    assert store.last_task("CTA 공부", "2099-01-01") is None
+    assert "CTA 공부" not in store.context.stale
+    yesterday = (datetime.date.fromisoformat(DAY) - datetime.timedelta(days=1))
+    _plan(local_app, yesterday, "전날")
+    assert store.last_task("CTA 공부", "2099-01-01")[4] == "전날"
+
+
+def test_history_is_bounded_per_category(local_app):
+    keep = local_app["CONTEXT_KEEP"]
+    start = datetime.date.fromisoformat(DAY)
+    for i in range(1, keep + 5): _plan(local_app, start + datetime.timedelta(days=i), f"{i}일째")
+    ctx = local_app["get_local_store"]().context
+    assert len(ctx.days["CTA 공부"]) == keep
+    # floor 아래 날짜는 모르므로 다시 만들어 답함
+    assert local_app["get_local_store"]().last_task("CTA 공부", (start + datetime.timedelta(days=1)).isoformat())[0] in ("a", "b")
@@ -0,0 +1,38 @@
+"""Sheets 직접 모드의 DayCache"""
+import threading
+
+from conftest import DAY
+
+
+def test_cached_range_does_not_wait_for_another_fetch(sheets_app):
+    cache, pool = sheets_app["get_day_cache"](), sheets_app["_pool"]()
+    cache.ensure_range(pool, DAY, DAY)
+    done = threading.Event()
+    with cache.fetch_lock: # 다른 구간을 받는 중인 스레드 흉내
+        threading.Thread(target=lambda: (cache.ensure_range(pool, DAY, DAY), done.set()), daemon=True).start()
+        assert done.wait(2)
+
+
+def test_concurrent_first_fetch_reads_once(sheets_app, sheets):
+    client, _ = sheets
+    cache, pool = sheets_app["get_day_cache"](), sheets_app["_pool"]()
+    pool.titles()
+    client.calls.clear()
+    ts = [threading.Thread(target=cache.ensure_range, args=(pool, DAY, DAY)) for _ in range(4)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    assert client.calls["values_batch_get"] == 1
+    assert [d["ID"] for d in cache.tasks[DAY]] == ["a", "b"]
+
+
+def test_concurrent_handle_lookups_list_sheets_once(sheets_app, sheets):
+    """warm_start 의 작업들이 동시에 핸들을 찾아도 시트 목록 조회는 한 번, 개별 조회는 없음"""
+    client, _ = sheets
+    pool = sheets_app["_pool"]()
+    pool.invalidate()
+    client.calls.clear()
+    jobs = [lambda: pool.worksheet("Templates"), pool.titles, lambda: pool.worksheet("Task_Details"), pool.titles]
+    ts = [threading.Thread(target=job) for job in jobs]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    assert client.calls["worksheets"] == 1 and client.calls["worksheet"] == 0
@@ -0,0 +1,52 @@
+"""Inbox / Goals: 다른 기기가 행을 바꾼 뒤의 삭제, 예전 Settings 목록 이전"""
+import json
+
+import bench
+from conftest import sheet_rows
+
+
+def _seed_inbox(doc, ids):
+    doc.seed("Inbox", [["ID", "카테고리", "할일", "생성일시"]] + [[i, "기타/생활", f"메모 {i}", ""] for i in ids])
+
+
+def test_remove_rechecks_position_after_remote_insert(sheets_app, sheets):
+    _, doc = sheets
+    _seed_inbox(doc, ["x", "y", "z"])
+    assert [it["id"] for it in sheets_app["item_page"]("inbox")] == ["x", "y", "z"]
+    doc._sheets["Inbox"]._rows.insert(1, ["w", "기타/생활", "다른 기기", ""]) # 캐시된 위치가 한 칸씩 밀림
+    sheets_app["delete_item"]("inbox", "y")
+    assert [r[0] for r in sheet_rows(doc, "Inbox")] == ["w", "x", "z"]
+    assert [it["id"] for it in sheets_app["item_page"]("inbox")] == ["w", "x", "z"]
+
+
+def test_remove_of_row_already_deleted_remotely_deletes_nothing(sheets_app, sheets):
+    _, doc = sheets
+    _seed_inbox(doc, ["x", "y", "z"])
+    sheets_app["item_count"]("inbox")
+    del doc._sheets["Inbox"]._rows[2] # 다른 기기가 y 를 먼저 지움
+    sheets_app["delete_item"]("inbox", "y")
+    assert [r[0] for r in sheet_rows(doc, "Inbox")] == ["x", "z"]
+    assert sheets_app["item_count"]("inbox") == 2
+
+
+def test_fresh_journal_does_not_resurrect_migrated_items(sheets, tmp_path):
+    """다른 기기가 이미 옮기고 다 지운 뒤, 새 저널로 시작한 기기가 예전 Settings 목록을 다시 옮기지 않음"""
+    client, doc = sheets
+    doc.seed("Settings", [["Key", "Value"], ["inbox_items", json.dumps([{"category": "기타/생활", "task": "지운 메모"}], ensure_ascii=False)]])
+    doc.seed("Inbox", [["ID", "카테고리", "할일", "생성일시"]])
+    doc.seed("Goals", [["ID", "카테고리", "목표명", "날짜"]])
+    app = bench.load_app(client, str(tmp_path / "new_device.db"))
+    assert app["item_count"]("inbox") == 0 and app["item_count"]("goals") == 0
+    sync = app["get_sync_engine"]()
+    sync.sync()
+    assert sync.last_error is None
+    assert sheet_rows(doc, "Inbox") == [] and sheet_rows(doc, "Goals") == []
+    app["get_local_store"]().db.close()
+
+
+def test_journal_migrates_when_sheet_is_missing(local_app, sheets):
+    _, doc = sheets
+    assert local_app["item_count"]("goals") == 1 # 기본 목표
+    sync = local_app["get_sync_engine"]()
+    sync.sync()
+    assert [r[2] for r in sheet_rows(doc, "Goals")] == ["1차 시험"]
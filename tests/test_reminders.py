@@ -0,0 +1,85 @@
+"""알림 스케줄러: ARKAN_TELEGRAM_API 자리에 세운 로컬 스텁 Bot API 로 전송 시각·묶음·재시도 확인"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+@pytest.fixture
+def stub():
+    """sendMessage 를 받아 두는 로컬 서버. codes 에 넣은 상태 코드를 차례로 돌려주고, 다 쓰면 200"""
+    got, codes = [], []
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            code = codes.pop(0) if codes else 200
+            if code == 200: got.append((time.time(), self.path, body))
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps({"ok": code == 200}).encode())
+        def log_message(self, *args): pass
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", got, codes
+    server.shutdown()
+
+
+@pytest.fixture
+def scheduler(sheets_app, stub):
+    sheets_app["REMIND_RETRY_SEC"] = 0.2
+    return sheets_app["ReminderScheduler"](sheets_app["TelegramSender"](stub[0], "TOKEN"))
+
+
+def _wait(cond, sec=5):
+    end = time.time() + sec
+    while time.time() < end:
+        if cond(): return True
+        time.sleep(0.05)
+    return False
+
+
+def test_due_reminders_go_out_together_and_not_early(scheduler, stub):
+    _, got, _ = stub
+    at = time.time() + 0.5
+    scheduler.replace("42", "day:x", [("a", at, "⏰ a"), ("b", at, "⏰ b"), ("later", at + 30, "⏰ 나중")])
+    assert _wait(lambda: got)
+    sent_at, path, body = got[0]
+    assert sent_at >= at and path == "/botTOKEN/sendMessage"
+    assert body == {"chat_id": "42", "text": "⏰ a\n⏰ b"}
+    time.sleep(0.3)
+    assert len(got) == 1 and scheduler.pending() == 1 # 30초 뒤 알림은 그때까지 기다림
+
+
+def test_failed_send_is_requeued_and_sent_once(scheduler, stub):
+    _, got, codes = stub
+    codes.append(400) # TelegramSender 가 곧바로 포기하는 오류
+    scheduler.replace("42", "goals", [("g", time.time() + 0.1, "🎯 D-day")])
+    assert _wait(lambda: got)
+    assert [b["text"] for _, _, b in got] == ["🎯 D-day"]
+    assert scheduler.sent_n == 1 and scheduler.pending() == 0 and not scheduler.retries
+    # 리런이 같은 목록을 다시 넣어도 지난 알림이라 다시 보내지 않고, 다 보낸 범위는 남기지 않음
+    scheduler.replace("42", "goals", [("g", time.time() - 1, "🎯 D-day")])
+    time.sleep(0.3)
+    assert len(got) == 1 and scheduler.scopes == {}
+
+
+def test_rerun_keeps_due_reminder_that_is_being_retried(scheduler, stub):
+    _, got, codes = stub
+    codes.extend([400, 400])
+    scheduler.replace("42", "day:x", [("a", time.time() + 0.1, "⏰ a")])
+    assert _wait(lambda: scheduler.retries)
+    scheduler.replace("42", "day:x", []) # 그사이 리런: 지난 알림은 목록에서 빠짐
+    assert _wait(lambda: got)
+    assert [b["text"] for _, _, b in got] == ["⏰ a"] and scheduler.scopes == {}
+
+
+def test_gives_up_after_max_retries(scheduler, stub, sheets_app):
+    _, got, codes = stub
+    sheets_app["REMIND_RETRY_SEC"] = 0.05
+    codes.extend([400] * (sheets_app["REMIND_MAX_RETRIES"] + 1))
+    scheduler.replace("42", "day:x", [("a", time.time() + 0.1, "⏰ a")])
+    assert _wait(lambda: scheduler.dropped_n == 1)
+    assert not got and scheduler.pending() == 0 and scheduler.scopes == {}
@@ -0,0 +1,54 @@
+"""일정 구간 인덱스 (ScheduleIndex): 겹침·다음 빈 시간·추가/삭제"""
+import random
+
+import pytest
+
+
+@pytest.fixture
+def app(sheets_app):
+    return sheets_app
+
+
+def _t(app, start, due=""):
+    return {"시간": app["_hm"](start), "마감시간": app["_hm"](due) if due != "" else "", "할일_Main": f"{start}"}
+
+
+def test_overlaps_match_brute_force(app):
+    rnd = random.Random(7)
+    tasks = [_t(app, 0, 23 * 60)] # 앞쪽의 긴 구간 (예전 구현의 최악 경우)
+    for _ in range(200):
+        a = rnd.randrange(0, 23 * 60)
+        tasks.append(_t(app, a, rnd.choice(["", min(a + rnd.randrange(1, 240), 24 * 60 - 1)])))
+    index = app["ScheduleIndex"](tasks[:100])
+    for t in tasks[100:]: index.add(t)
+    for t in tasks[50:80]: index.remove(t)
+    live = tasks[:50] + tasks[80:]
+    span = app["task_span"]
+    for _ in range(300):
+        s = rnd.randrange(0, 24 * 60 - 1); e = s + rnd.randrange(1, 120)
+        want = sorted((k for k in live if span(k)[0] < e and span(k)[1] > s), key=lambda k: span(k))
+        assert [id(k) for k in index.overlaps(s, e)] == [id(k) for k in want]
+
+
+def test_next_free_and_conflict_message(app):
+    index = app["ScheduleIndex"]([_t(app, 9 * 60, 10 * 60), _t(app, 10 * 60, 11 * 60)])
+    assert index.next_free(9 * 60 + 30, 30) == 11 * 60
+    msg = app["conflict_message"](index, _t(app, 9 * 60 + 30, 10 * 60 + 30))
+    assert "09:00~10:00" in msg and "10:00~11:00" in msg and "11:00" in msg.split("→")[1]
+    assert app["conflict_message"](index, _t(app, 11 * 60)) is None
+
+
+def test_tasks_without_due_time_clash_only_at_the_same_start(app):
+    index = app["ScheduleIndex"]([_t(app, 9 * 60)])
+    assert app["conflict_message"](index, _t(app, 9 * 60 + 15)) is None
+    assert "[09:00 540]" in app["conflict_message"](index, _t(app, 9 * 60))
+    assert app["conflict_message"](index, _t(app, 8 * 60 + 30, 9 * 60 + 30)) # 마감시간이 있는 구간은 그 안의 시작과 겹침
+
+
+def test_apply_template_updates_given_index(app):
+    tasks, index = [], app["ScheduleIndex"]([_t(app, 8 * 60, 9 * 60)])
+    items = [{"시간": "09:00", "카테고리": "CTA 공부", "할일_Main": "a"}, {"시간": "09:10", "카테고리": "CTA 공부", "할일_Main": "b"},
+             {"시간": "09:00", "카테고리": "CTA 공부", "할일_Main": "c"}, {"시간": "08:30", "카테고리": "CTA 공부", "할일_Main": "d"}]
+    added, conflicts = app["apply_template"](tasks, items, index)
+    assert added == 2 and len(conflicts) == 2
+    assert [t["할일_Main"] for t in index.overlaps(9 * 60, 24 * 60)] == ["a", "b"]
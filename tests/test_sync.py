@@ -0,0 +1,131 @@
+"""LocalStore ↔ Sheets 동기화: 충돌(수정시각 기준 last-writer-wins), 삭제, 중간에 끊긴 push"""
+import time
+
+from conftest import DAY, local_rows, sheet_rows, task_row
+
+
+def _edit_sheet(doc, tid, main, at=None):
+    """다른 기기가 시트의 할 일을 고친 것처럼 (at: 그 기기가 적은 수정시각, 없으면 예전 행처럼 비움)"""
+    for r in doc._sheets["Task_Details"]._rows:
+        if r[0] == tid:
+            r[4] = main
+            if at is not None: r[:] = r + [""] * (12 - len(r)); r[11] = at
+
+
+def test_initial_pull_fills_journal(local_app):
+    assert {t: r[4] for t, r in local_rows(local_app["get_local_store"]()).items()} == {"a": "원래 a", "b": "원래 b"}
+
+
+def test_dirty_local_edit_wins_over_remote_edit(local_app, sheets):
+    _, doc = sheets
+    store, sync = local_app["get_local_store"](), local_app["get_sync_engine"]()
+    store.write_changes({"a": (DAY, task_row("a", "로컬 a"))}, {})
+    _edit_sheet(doc, "a", "시트 a")
+    _edit_sheet(doc, "b", "시트 b")
+    sync.sync(full=True)
+    assert sync.last_error is None
+    assert {r[0]: r[4] for r in sheet_rows(doc)} == {"a": "로컬 a", "b": "시트 b"}
+    assert {t: r[4] for t, r in local_rows(store).items()} == {"a": "로컬 a", "b": "시트 b"}
+    assert store.pending_count() == 0
+
+
+def test_newer_remote_edit_wins_over_stale_local_edit(local_app, sheets):
+    _, doc = sheets
+    store, sync = local_app["get_local_store"](), local_app["get_sync_engine"]()
+    store.write_changes({"a": (DAY, task_row("a", "오프라인 a"))}, {})
+    _edit_sheet(doc, "a", "다른 기기 a", at=time.time() + 60)
+    sync.sync() # pull 주기 전이어도 push 가 덮어쓰지 않고 바로 받아 옴
+    assert sync.last_error is None
+    assert {r[0]: r[4] for r in sheet_rows(doc)}["a"] == "다른 기기 a"
+    assert local_rows(store)["a"][4] == "다른 기기 a"
+    assert store.pending_count() == 0
+
+
+def test_pushed_rows_carry_local_edit_time(local_app, sheets):
+    _, doc = sheets
+    store, sync = local_app["get_local_store"](), local_app["get_sync_engine"]()
+    store.write_changes({"a": (DAY, task_row("a", "로컬 a"))}, {DAY: [DAY, "TRUE", 0, ""]})
+    (ts,), = store._q("SELECT updated_at FROM tasks WHERE id='a'")
+    sync.sync()
+    assert {r[0]: r for r in sheet_rows(doc)}["a"][11] == ts
+    assert sheet_rows(doc, "Daily_Master")[0][4] >= ts
+
+
+def test_remote_delete_removes_clean_local_row(local_app, sheets):
+    _, doc = sheets
+    store, sync = local_app["get_local_store"](), local_app["get_sync_engine"]()
+    doc._sheets["Task_Details"]._rows = [r for r in doc._sheets["Task_Details"]._rows if r[0] != "b"]
+    sync.sync(full=True)
+    assert set(local_rows(store)) == {"a"}
+
+
+def test_remote_delete_of_dirty_row_is_written_back(local_app, sheets):
+    _, doc = sheets
+    store, sync = local_app["get_local_store"](), local_app["get_sync_engine"]()
+    store.write_changes({"b": (DAY, task_row("b", "로컬 b"))}, {})
+    doc._sheets["Task_Details"]._rows = [r for r in doc._sheets["Task_Details"]._rows if r[0] != "b"]
+    sync.sync(full=True)
+    assert {r[0]: r[4] for r in sheet_rows(doc)} == {"a": "원래 a", "b": "로컬 b"}
+    assert set(local_rows(store)) == {"a", "b"}
+
+
+def test_local_delete_is_pushed(local_app, sheets):
+    _, doc = sheets
+    store, sync = local_app["get_local_store"](), local_app["get_sync_engine"]()
+    store.write_changes({"a": (DAY, None)}, {})
+    sync.sync(full=True)
+    assert [r[0] for r in sheet_rows(doc)] == ["b"]
+    assert set(local_rows(store)) == {"b"}
+
+
+def test_failed_push_keeps_rows_dirty_and_retries(local_app, sheets):
+    client, doc = sheets
+    store, sync = local_app["get_local_store"](), local_app["get_sync_engine"]()
+    store.write_changes({"c": (DAY, task_row("c", "새 c"))}, {})
+    real = doc.batch_update
+    def fail_once(body):
+        doc.batch_update = real
+        raise local_app["SheetsTimeout"]("끊김")
+    doc.batch_update = fail_once
+    sync.sync()
+    assert sync.last_error and store.pending_count() == 1
+    assert "c" not in [r[0] for r in sheet_rows(doc)]
+    sync.sync()
+    assert sync.last_error is None and store.pending_count() == 0
+    assert [r[0] for r in sheet_rows(doc)].count("c") == 1
+
+
+def test_push_written_but_not_marked_clean_does_not_duplicate(local_app, sheets):
+    _, doc = sheets
+    store, sync = local_app["get_local_store"](), local_app["get_sync_engine"]()
+    store.write_changes({"c": (DAY, task_row("c", "새 c"))}, {})
+    real = store.mark_clean
+    def crash_once(stamps):
+        store.mark_clean = real
+        raise RuntimeError("push 직후 중단")
+    store.mark_clean = crash_once
+    sync.sync()
+    assert sync.last_error and store.pending_count() == 1
+    sync.sync()
+    assert store.pending_count() == 0
+    assert [r[0] for r in sheet_rows(doc)].count("c") == 1
+
+
+def test_dirty_master_wins_over_remote(local_app, sheets):
+    _, doc = sheets
+    store, sync = local_app["get_local_store"](), local_app["get_sync_engine"]()
+    store.write_changes({}, {DAY: [DAY, "TRUE", 60, "로컬"]})
+    doc._sheets["Daily_Master"]._rows[1][3] = "시트"
+    sync.sync(full=True)
+    assert sheet_rows(doc, "Daily_Master")[0][3] == "로컬"
+    assert store.master_rows()[0][3] == "로컬"
+
+
+def test_newer_remote_master_wins(local_app, sheets):
+    _, doc = sheets
+    store, sync = local_app["get_local_store"](), local_app["get_sync_engine"]()
+    store.write_changes({}, {DAY: [DAY, "TRUE", 60, "오프라인"]})
+    doc._sheets["Daily_Master"]._rows[1] = [DAY, "FALSE", 0, "다른 기기", time.time() + 60]
+    sync.sync(full=True)
+    assert sheet_rows(doc, "Daily_Master")[0][3] == "다른 기기"
+    assert store.master_rows()[0][3] == "다른 기기" and store.pending_count() == 0
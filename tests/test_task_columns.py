@@ -0,0 +1,85 @@
+"""마감시간·중요도 열: 저장·다시 읽기, 예전 시트/저널/백업 이전"""
+import datetime
+import io
+import json
+import sqlite3
+
+import pytest
+
+import bench
+from conftest import DAY, save_tasks, sheet_rows, task_row
+
+OLD_HEADER = ["ID", "날짜", "시간", "카테고리", "할일_Main", "할일_Sub", "상태", "소요시간(초)", "참고자료"]
+
+
+@pytest.fixture
+def old_sheet(sheets):
+    """마감시간·중요도 열이 생기기 전 앱이 만든 시트 (헤더 9열, 격자도 9열)"""
+    _, doc = sheets
+    doc.seed("Task_Details", [OLD_HEADER, task_row("a", "원래 a"), task_row("b", "원래 b")], cols=len(OLD_HEADER))
+    return doc
+
+
+def _save_with_due(app):
+    day = datetime.date.fromisoformat(DAY)
+    data = app["load_day_data"](day)
+    t = next(t for t in data["tasks"] if t["ID"] == "a")
+    t["마감시간"], t["중요도"] = "18:00", "🔥 높음"
+    assert save_tasks(app, day, [t])
+
+
+def test_sheets_mode_migrates_header_and_persists(sheets_app, sheets, old_sheet):
+    client, _ = sheets
+    _save_with_due(sheets_app)
+    ws = old_sheet._sheets["Task_Details"]
+    assert ws._rows[0] == sheets_app["TASK_SHEET_HEADER"] and ws.col_count == len(sheets_app["TASK_SHEET_HEADER"])
+    assert {r[0]: r[9:11] for r in sheet_rows(old_sheet)} == {"a": ["18:00", "🔥 높음"], "b": []}
+    fresh = bench.load_app(client, "")
+    t = next(t for t in fresh["load_day_data"](datetime.date.fromisoformat(DAY))["tasks"] if t["ID"] == "a")
+    assert (t["마감시간"], t["중요도"]) == ("18:00", "🔥 높음")
+
+
+def test_local_mode_pushes_new_columns_to_old_sheet(old_sheet, local_app):
+    _save_with_due(local_app)
+    sync = local_app["get_sync_engine"]()
+    sync.sync(full=True)
+    assert sync.last_error is None
+    assert old_sheet._sheets["Task_Details"]._rows[0] == local_app["TASK_SHEET_HEADER"]
+    assert {r[0]: r[9:11] for r in sheet_rows(old_sheet)}["a"] == ["18:00", "🔥 높음"]
+
+
+def test_journal_rows_are_widened(tmp_path, sheets):
+    db = str(tmp_path / "old.db")
+    app = bench.load_app(sheets[0], db)
+    store = app["LocalStore"](db)
+    store._q("INSERT INTO tasks (id, date, row, updated_at) VALUES ('z', ?, ?, 0)", (DAY, json.dumps(task_row("z"))))
+    store._q("DELETE FROM meta WHERE key='task_width'")
+    store.db.close()
+    store = app["LocalStore"](db)
+    row, = store._q("SELECT row FROM tasks WHERE id='z'")
+    assert json.loads(row[0]) == task_row("z") + ["", ""]
+    store.db.close()
+    assert sqlite3.connect(db).execute("SELECT dirty FROM tasks WHERE id='z'").fetchone() == (0,)
+
+
+def test_import_accepts_legacy_backup_and_validates_new_columns(local_app):
+    header = ",".join(OLD_HEADER)
+    csv_old = f"{header}\nc,{DAY},10:00,CTA 공부,옛 백업,,예정,0,\n"
+    rep = local_app["import_table"]("Task_Details", *local_app["read_pages"](io.StringIO(csv_old)))
+    assert rep["added"] == 1 and not rep["errors"]
+    header = ",".join(local_app["TASK_HEADER"])
+    csv_new = (f"{header}\nd,{DAY},11:00,업무/사업,새 백업,,예정,0,,9:30,⚡ 보통\n"
+               f"e,{DAY},12:00,업무/사업,잘못된 마감,,예정,0,,저녁,\n"
+               f"f,{DAY},13:00,업무/사업,잘못된 중요도,,예정,0,,,급함\n")
+    rep = local_app["import_table"]("Task_Details", *local_app["read_pages"](io.StringIO(csv_new)))
+    assert rep["added"] == 1 and [line for line, _ in rep["errors"]] == [3, 4]
+    tasks = local_app["get_local_store"]().range(DAY, DAY)[1][DAY]
+    d = next(t for t in tasks if t["ID"] == "d")
+    assert (d["마감시간"], d["중요도"]) == ("09:30", "⚡ 보통")
+
+
+def test_import_accepts_every_status_the_app_writes(local_app):
+    header = ",".join(local_app["TASK_HEADER"])
+    rows = "".join(f"s{i},{DAY},1{i}:00,기타/생활,상태 {st},,{st},0,,,\n" for i, st in enumerate(local_app["TASK_STATUSES"]))
+    rep = local_app["import_table"]("Task_Details", *local_app["read_pages"](io.StringIO(f"{header}\n{rows}")))
+    assert rep["added"] == len(local_app["TASK_STATUSES"]) and not rep["errors"]
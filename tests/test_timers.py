@@ -0,0 +1,47 @@
+"""타이머 이벤트로 실행 상태 복원"""
+import time
+
+import pytest
+
+
+@pytest.fixture
+def restore(sheets_app):
+    return sheets_app["restore_timers"]
+
+
+def _task(saved):
+    return {"ID": "a", "상태": "진행중", "accumulated": float(saved), "is_running": False, "last_start": None}
+
+
+def test_running_timer_is_not_double_counted_after_autosave(restore):
+    now = time.time()
+    started = now - 600 # 100초 쌓인 상태에서 10분 전 시작, 시작 5분 뒤 자동 저장(400초)
+    t = _task(400)
+    restore([t], [["e1", "a", "2026-03-02", "start", started, 100]])
+    assert t["is_running"] and t["last_start"] == started
+    assert t["accumulated"] + (now - t["last_start"]) == pytest.approx(700)
+
+
+def test_stop_event_keeps_larger_saved_value(restore):
+    t = _task(500)
+    restore([t], [["e1", "a", "2026-03-02", "start", 1000, 100], ["e2", "a", "2026-03-02", "stop", 1300, 400]])
+    assert not t["is_running"] and t["accumulated"] == 500
+    t = _task(50)
+    restore([t], [["e1", "a", "2026-03-02", "start", 1000, 100], ["e2", "a", "2026-03-02", "stop", 1300, 400]])
+    assert t["accumulated"] == 400
+
+
+def test_done_task_does_not_resume(restore):
+    t = dict(_task(400), 상태="완료")
+    restore([t], [["e1", "a", "2026-03-02", "start", time.time() - 600, 100]])
+    assert not t["is_running"] and t["accumulated"] == 400
+
+
+def test_timer_left_running_on_past_day_stops_at_midnight(restore):
+    t = _task(400)
+    started, midnight = 1000.0, 1600.0
+    assert restore([t], [["e1", "a", "2026-03-02", "start", started, 100]], until=midnight) == [t]
+    assert not t["is_running"] and t["accumulated"] == 700 # 100 + (자정 - 시작)
+    t = _task(5000) # 자정이 지나도록 켜 둔 채 자동 저장된 값
+    restore([t], [["e1", "a", "2026-03-02", "start", started, 100]], until=midnight)
+    assert t["accumulated"] == 700